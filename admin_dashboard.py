@@ -4,12 +4,17 @@ Simple admin dashboard to view user profiles through web browser
 Run this script and visit http://localhost:8001/admin
 """
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from typing import Optional
+from fastapi import FastAPI, Request, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from app.db.database import SessionLocal
+from app.core.executor import db_executor
+from app.db.database import SessionLocal, ReadSessionLocal
 from app.models.user import User, Profile, Expectation, Photo
+from app.services.admin_users import (
+    PAGE_SIZE, MAX_PAGE_SIZE, MAX_JSON_LIMIT, STATUS_PATTERN, dashboard_context, stream_users_json
+)
 import uvicorn
 import os
 from datetime import datetime
@@ -21,68 +26,42 @@ templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard(request: Request):
-    """Admin dashboard to view all user profiles"""
+async def admin_dashboard(
+    request: Request,
+    before: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = Query(None, pattern=STATUS_PATTERN),
+    has_photos: Optional[bool] = None
+):
+    """Admin dashboard to view user profiles, one page of newest users at a time"""
     
-    db = SessionLocal()
+    def load_page():
+        db = ReadSessionLocal()
+        try:
+            return dashboard_context(db, request, before, limit, status, has_photos)
+        finally:
+            db.close()
     
     try:
-        # Get all users with their data
-        users = db.query(User).all()
-        
-        user_data = []
-        for user in users:
-            # Get profile info
-            profile_desc = ""
-            photo_count = 0
-            photo_urls = []
-            
-            if hasattr(user, 'profile') and user.profile:
-                profile_desc = user.profile.description
-                photo_count = len(user.profile.photos)
-                photo_urls = [f"/{photo.file_path}" for photo in user.profile.photos]
-            
-            # Get expectations
-            expectations_desc = ""
-            if hasattr(user, 'expectations') and user.expectations:
-                expectations_desc = user.expectations.description
-            
-            # Check completeness
-            has_profile = bool(profile_desc)
-            has_expectations = bool(expectations_desc)
-            has_photo = photo_count > 0
-            is_complete = has_profile and has_expectations and has_photo
-            
-            user_data.append({
-                'id': user.id,
-                'email': user.email,
-                'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_active': user.is_active,
-                'profile_description': profile_desc,
-                'expectations_description': expectations_desc,
-                'photo_count': photo_count,
-                'photo_urls': photo_urls,
-                'has_profile': has_profile,
-                'has_expectations': has_expectations,
-                'has_photo': has_photo,
-                'is_complete': is_complete
-            })
-        
-        # Sort by creation date (newest first)
-        user_data.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        return templates.TemplateResponse("admin_dashboard.html", {
-            "request": request,
-            "users": user_data,
-            "total_users": len(user_data),
-            "complete_profiles": sum(1 for u in user_data if u['is_complete'])
-        })
-    
+        context = await db_executor.run(load_page)
     except Exception as e:
         return HTMLResponse(f"<h1>Error</h1><p>{str(e)}</p>")
     
-    finally:
-        db.close()
+    template = templates.get_template("admin_dashboard.html")
+    return StreamingResponse(template.generate(context), media_type="text/html")
+
+@app.get("/admin/users.json")
+async def admin_users_json(
+    before: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_JSON_LIMIT),
+    status: Optional[str] = Query(None, pattern=STATUS_PATTERN),
+    has_photos: Optional[bool] = None
+):
+    """Dashboard rows as streamed JSON; pass next_before as before to continue"""
+    return StreamingResponse(
+        stream_users_json(ReadSessionLocal, before, limit, status, has_photos),
+        media_type="application/json"
+    )
 
 @app.get("/admin/user/{user_id}", response_class=HTMLResponse)
 async def view_user_detail(request: Request, user_id: int):
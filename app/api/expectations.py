@@ -1,8 +1,6 @@
 """
 Expectations/preferences API endpoints
 """
-import os
-import uuid
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
@@ -12,27 +10,17 @@ from app.core.config import settings
 from app.db.database import get_db
 from app.models.user import User, Expectation, ExampleImage, IdealPartnerPhoto
 from app.schemas.user import ExpectationCreate, ExpectationResponse, ExpectationUpdate
+from app.services.blob_store import register_blobs, write_blob
+from app.services.candidate_store import record_user_change
+from app.services.image_ingest import InvalidImageError
+from app.services.image_variants import schedule_variants
+from app.services.score_cache import invalidate_user_scores
+from app.services.token_index import index_expectation
+from app.services.uploads import UploadTooLargeError
 
 router = APIRouter(prefix="/expectations", tags=["expectations"])
 
 
-def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
-    """Save uploaded file and return the file path"""
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-
-    # Create full path
-    file_path = os.path.join(settings.upload_dir, subfolder, unique_filename)
-
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = file.file.read()
-        buffer.write(content)
-
-    return file_path
-
-
 @router.post("/", response_model=ExpectationResponse)
 async def create_expectations(
     description: str = Form(...),
@@ -61,6 +49,23 @@ async def create_expectations(
         if image.filename and not any(image.filename.lower().endswith(ext) for ext in settings.allowed_image_extensions):
             raise HTTPException(status_code=400, detail=f"Invalid image format: {image.filename}")
 
+    # Store the files first, so an oversized upload leaves no expectations behind;
+    # they go to the content-addressed store (unreferenced blobs are collected)
+    try:
+        example_image_blobs = []
+        for image in example_images or []:
+            if image.filename:  # Check if file was actually uploaded
+                example_image_blobs.append(await write_blob(image))
+
+        ideal_photo_blobs = []
+        for i, photo in enumerate(ideal_partner_photos or []):
+            if photo.filename:  # Check if file was actually uploaded
+                ideal_photo_blobs.append((i, await write_blob(photo)))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Create expectations
     db_expectation = Expectation(
         user_id=current_user.id,
@@ -68,34 +73,33 @@ async def create_expectations(
     )
 
     db.add(db_expectation)
+    index_expectation(db, current_user.id, description)
     db.commit()
     db.refresh(db_expectation)
 
+    blob_paths = register_blobs(db, example_image_blobs + [stored for _, stored in ideal_photo_blobs])
+
     # Save example images
-    if example_images:
-        for image in example_images:
-            if image.filename:  # Check if file was actually uploaded
-                image_path = save_uploaded_file(image, "expectations")
-                db_image = ExampleImage(
-                    expectation_id=db_expectation.id,
-                    file_path=image_path
-                )
-                db.add(db_image)
+    for stored in example_image_blobs:
+        db_image = ExampleImage(
+            expectation_id=db_expectation.id,
+            file_path=blob_paths[stored.path]
+        )
+        db.add(db_image)
 
     # Save ideal partner photos
-    if ideal_partner_photos:
-        for i, photo in enumerate(ideal_partner_photos):
-            if photo.filename:  # Check if file was actually uploaded
-                photo_path = save_uploaded_file(photo, "ideal_partners")
-                db_photo = IdealPartnerPhoto(
-                    expectation_id=db_expectation.id,
-                    file_path=photo_path,
-                    order_index=i
-                )
-                db.add(db_photo)
-
+    for i, stored in ideal_photo_blobs:
+        db_photo = IdealPartnerPhoto(
+            expectation_id=db_expectation.id,
+            file_path=blob_paths[stored.path],
+            order_index=i
+        )
+        db.add(db_photo)
+
+    record_user_change(db, current_user.id)
     db.commit()
     db.refresh(db_expectation)
+    schedule_variants(blob_paths.values())
 
     return db_expectation
 
@@ -126,6 +130,9 @@ def update_my_expectations(
 
     if expectation_update.description is not None:
         expectations.description = expectation_update.description
+        index_expectation(db, current_user.id, expectations.description)
+        invalidate_user_scores(db, current_user.id)
+        record_user_change(db, current_user.id)
 
     db.commit()
     db.refresh(expectations)
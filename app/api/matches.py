@@ -3,13 +3,18 @@ Matching API endpoints
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.auth import get_current_active_user
-from app.db.database import get_db
-from app.models.user import User, Match, Profile
+from app.core.executor import matching_executor
+from app.db.database import get_db, get_read_db
+from app.models.user import User, Match, Profile, Expectation
 from app.schemas.user import MatchResponse
 from app.services.ai_matching import ai_matching_service
+from app.services.candidate_store import current_candidates
+from app.services.match_generation import build_match_row, has_matches_for_day, save_matches
+from app.services.match_stats import get_match_stats as load_match_stats, record_match_viewed
 
 router = APIRouter(prefix="/matches", tags=["matches"])
 
@@ -17,7 +22,8 @@ router = APIRouter(prefix="/matches", tags=["matches"])
 @router.post("/generate-daily-matches")
 async def generate_daily_matches(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
 ):
     """Generate daily matches for the current user"""
     # Check if user has profile and expectations
@@ -27,55 +33,27 @@ async def generate_daily_matches(
     if not current_user.expectations:
         raise HTTPException(status_code=400, detail="Please set your expectations first")
 
+    # Matches precomputed today by the nightly job (generate_daily_matches.py) are read as-is
+    if has_matches_for_day(db, current_user.id):
+        return {"message": "Generated 0 new matches (today's matches are ready)"}
+
     # Get all other users with complete profiles and expectations
-    candidate_users = db.query(User).options(
-        joinedload(User.profile).joinedload(Profile.photos),
-        joinedload(User.expectations).joinedload(User.expectations.example_images)
-    ).filter(
-        User.id != current_user.id,
-        User.profile.isnot(None),
-        User.expectations.isnot(None)
-    ).all()
+    candidate_users = await matching_executor.run(current_candidates, read_db, current_user.id)
 
     if not candidate_users:
         raise HTTPException(status_code=404, detail="No potential matches found")
 
-    # Generate matches using AI with enhanced analysis
-    matches_data = await ai_matching_service.find_daily_matches(
-        current_user, candidate_users, limit=5, include_reasoning=False
+    # Generate matches using AI with enhanced analysis (off the event loop)
+    matches_data = await matching_executor.run(
+        ai_matching_service.match_candidates,
+        current_user, candidate_users, limit=5, include_reasoning=False, db=db
     )
 
-    # Save matches to database
-    saved_matches = []
-    for match_data in matches_data:
-        # Check if match already exists today
-        existing_match = db.query(Match).filter(
-            Match.user_id == current_user.id,
-            Match.matched_user_id == match_data["user_id"]
-        ).first()
-
-        if not existing_match:
-            db_match = Match(
-                user_id=current_user.id,
-                matched_user_id=match_data["user_id"],
-                compatibility_score=match_data["compatibility_score"],
-                text_similarity_score=match_data["text_similarity"],
-                visual_similarity_score=match_data["visual_similarity"],
-                basic_text_similarity=match_data["basic_text_similarity"],
-                llm_text_score=match_data["llm_text_score"],
-                personality_score=match_data["personality_score"],
-                lifestyle_score=match_data["lifestyle_score"],
-                emotional_score=match_data["emotional_score"],
-                longterm_score=match_data["longterm_score"],
-                ideal_partner_score=match_data.get("ideal_partner_score", 0.0),
-                expectation_visual_score=match_data.get("expectation_visual_score", 0.0)
-            )
-            db.add(db_match)
-            saved_matches.append(db_match)
-
+    # Save matches to database (existing pairs are skipped)
+    saved_ids = save_matches(db, [build_match_row(current_user.id, match_data) for match_data in matches_data])
     db.commit()
 
-    return {"message": f"Generated {len(saved_matches)} new matches"}
+    return {"message": f"Generated {len(saved_ids)} new matches"}
 
 
 @router.get("/detailed/{match_id}")
@@ -97,7 +75,7 @@ async def get_detailed_match_analysis(
     # Get the matched user with profile and expectations
     matched_user = db.query(User).options(
         joinedload(User.profile).joinedload(Profile.photos),
-        joinedload(User.expectations).joinedload(User.expectations.example_images)
+        joinedload(User.expectations).joinedload(Expectation.example_images)
     ).filter(User.id == match.matched_user_id).first()
 
     if not matched_user or not matched_user.profile or not matched_user.expectations:
@@ -170,15 +148,16 @@ def mark_match_as_viewed(
     db: Session = Depends(get_db)
 ):
     """Mark a match as viewed"""
-    match = db.query(Match).filter(
-        Match.id == match_id,
-        Match.user_id == current_user.id
-    ).first()
-
-    if not match:
+    # Conditional UPDATE: of two concurrent requests only one flips the flag and counts the view
+    result = db.execute(
+        update(Match)
+        .where(Match.id == match_id, Match.user_id == current_user.id, Match.is_viewed == False)
+        .values(is_viewed=True)
+    )
+    if result.rowcount == 1:
+        record_match_viewed(db, current_user.id)
+    elif not db.query(Match.id).filter(Match.id == match_id, Match.user_id == current_user.id).first():
         raise HTTPException(status_code=404, detail="Match not found")
-
-    match.is_viewed = True
     db.commit()
 
     return {"message": "Match marked as viewed"}
@@ -190,23 +169,6 @@ def get_match_stats(
     db: Session = Depends(get_db)
 ):
     """Get matching statistics for the current user"""
-    total_matches = db.query(Match).filter(Match.user_id == current_user.id).count()
-    viewed_matches = db.query(Match).filter(
-        Match.user_id == current_user.id,
-        Match.is_viewed == True
-    ).count()
-
-    avg_compatibility = db.query(Match).filter(
-        Match.user_id == current_user.id
-    ).with_entities(Match.compatibility_score).all()
-
-    avg_score = 0.0
-    if avg_compatibility:
-        avg_score = sum(score[0] for score in avg_compatibility) / len(avg_compatibility)
-
-    return {
-        "total_matches": total_matches,
-        "viewed_matches": viewed_matches,
-        "unviewed_matches": total_matches - viewed_matches,
-        "average_compatibility_score": round(avg_score, 3)
-    }
+    stats = load_match_stats(db, current_user.id)
+    db.commit()  # persists the rollup row when it was just seeded
+    return stats
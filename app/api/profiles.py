@@ -12,12 +12,19 @@ from app.core.config import settings
 from app.db.database import get_db
 from app.models.user import User, Profile, Photo
 from app.schemas.user import ProfileCreate, ProfileResponse, ProfileUpdate
+from app.services.blob_store import register_blobs, write_blob
+from app.services.candidate_store import record_user_change
+from app.services.image_ingest import InvalidImageError
+from app.services.image_variants import schedule_variants
+from app.services.score_cache import invalidate_user_scores
+from app.services.token_index import index_profile
+from app.services.uploads import UploadTooLargeError, remove_uploads, stream_upload
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
 
-def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
-    """Save uploaded file and return the file path"""
+async def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
+    """Stream uploaded file to disk and return the file path"""
     # Generate unique filename
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
@@ -25,12 +32,9 @@ def save_uploaded_file(file: UploadFile, subfolder: str) -> str:
     # Create full path
     file_path = os.path.join(settings.upload_dir, subfolder, unique_filename)
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = file.file.read()
-        buffer.write(content)
-    
-    return file_path
+    # Save file (chunked, size-limited, atomic)
+    stored = await stream_upload(file, file_path)
+    return stored.path
 
 
 @router.post("/", response_model=ProfileResponse)
@@ -55,36 +59,55 @@ async def create_profile(
         if not any(photo.filename.lower().endswith(ext) for ext in settings.allowed_image_extensions):
             raise HTTPException(status_code=400, detail=f"Invalid image format: {photo.filename}")
     
+    has_audio = bool(audio_clip and audio_clip.filename)
+    if has_audio and not any(audio_clip.filename.lower().endswith(ext) for ext in settings.allowed_audio_extensions):
+        raise HTTPException(status_code=400, detail=f"Invalid audio format: {audio_clip.filename}")
+    
+    # Store the files first, so an oversized upload leaves no profile behind
+    saved_paths = []
+    try:
+        audio_path = None
+        if has_audio:
+            audio_path = await save_uploaded_file(audio_clip, "audio")
+            saved_paths.append(audio_path)
+        
+        # Photos go to the content-addressed store (unreferenced blobs are collected)
+        photo_blobs = []
+        for photo in photos:
+            photo_blobs.append(await write_blob(photo))
+    except UploadTooLargeError as e:
+        remove_uploads(saved_paths)
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        remove_uploads(saved_paths)
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # Create profile
     db_profile = Profile(
         user_id=current_user.id,
-        description=description
+        description=description,
+        audio_clip_path=audio_path
     )
     
-    # Handle audio clip if provided
-    if audio_clip and audio_clip.filename:
-        if not any(audio_clip.filename.lower().endswith(ext) for ext in settings.allowed_audio_extensions):
-            raise HTTPException(status_code=400, detail=f"Invalid audio format: {audio_clip.filename}")
-        
-        audio_path = save_uploaded_file(audio_clip, "audio")
-        db_profile.audio_clip_path = audio_path
-    
     db.add(db_profile)
+    index_profile(db, current_user.id, description)
     db.commit()
     db.refresh(db_profile)
     
     # Save photos
-    for i, photo in enumerate(photos):
-        photo_path = save_uploaded_file(photo, "profiles")
+    blob_paths = register_blobs(db, photo_blobs)
+    for i, stored in enumerate(photo_blobs):
         db_photo = Photo(
             profile_id=db_profile.id,
-            file_path=photo_path,
+            file_path=blob_paths[stored.path],
             order_index=i
         )
         db.add(db_photo)
     
+    record_user_change(db, current_user.id)
     db.commit()
     db.refresh(db_profile)
+    schedule_variants(blob_paths.values())
     
     return db_profile
 
@@ -115,6 +138,9 @@ def update_my_profile(
     
     if profile_update.description is not None:
         profile.description = profile_update.description
+        index_profile(db, current_user.id, profile.description)
+        invalidate_user_scores(db, current_user.id)
+        record_user_change(db, current_user.id)
     
     db.commit()
     db.refresh(profile)
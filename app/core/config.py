@@ -6,6 +6,17 @@ from typing import Optional
 from pydantic_settings import BaseSettings
 
 
+def async_url_for(database_url: str) -> str:
+    """The same database addressed through its async driver"""
+    scheme, _, rest = database_url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if driver == "postgresql":
+        return f"postgresql+asyncpg://{rest}"
+    return database_url
+
+
 class Settings(BaseSettings):
     # App Configuration
     app_name: str = "theOne"
@@ -15,15 +26,43 @@ class Settings(BaseSettings):
     database_path: str = "./theone_production.db"
     database_url: str = "sqlite:///./theone_production.db"
 
+    # Async driver URL; derived from database_url (asyncpg / aiosqlite) when not set
+    async_database_url: Optional[str] = None
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # Override database_url if database_path is set via environment
-        if os.getenv("DATABASE_PATH"):
+        # Managed Postgres hands out postgres:// URLs, which SQLAlchemy 2 rejects
+        if self.database_url.startswith("postgres://"):
+            self.database_url = "postgresql://" + self.database_url[len("postgres://"):]
+
+        # Override a SQLite database_url if database_path is set via environment
+        # (an explicit PostgreSQL DATABASE_URL wins)
+        if os.getenv("DATABASE_PATH") and self.database_url.startswith("sqlite"):
             self.database_path = os.getenv("DATABASE_PATH")
             self.database_url = f"sqlite:///{self.database_path}"
             # Ensure database directory exists
             os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
 
+        if not self.async_database_url:
+            self.async_database_url = async_url_for(self.database_url)
+
+    # Connection pool (file-based SQLite and server databases)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+
+    # Separate read-only pool for matching queries (candidate loading)
+    read_only_engine: bool = True
+    read_pool_size: int = 8
+    read_database_url: Optional[str] = None  # e.g. a replica; defaults to database_url
+
+    # SQLite performance profile: "performance" (WAL + pragmas below) or "default"
+    sqlite_profile: str = "performance"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456  # 256MB
+    sqlite_cache_size: int = -65536  # negative = KiB, i.e. 64MB per connection
+    sqlite_busy_timeout_ms: int = 5000  # wait on locks instead of failing with "database is locked"
+
     # Authentication
     secret_key: str = "your-secret-key-change-this-in-production"
     algorithm: str = "HS256"
@@ -41,6 +80,16 @@ class Settings(BaseSettings):
     allowed_image_extensions: set = {".jpg", ".jpeg", ".png", ".webp"}
     allowed_audio_extensions: set = {".mp3", ".wav", ".m4a"}
 
+    # Uploaded photos are stored upright, without metadata and at most this large (see app.services.image_ingest)
+    image_ingest_max_dimension: int = 2048  # longer side, in pixels
+    image_ingest_quality: int = 85
+
+    # Resized photo variants served instead of the originals (see app.services.image_variants)
+    image_variant_format: str = "webp"  # or "jpeg"
+    image_variant_quality: int = 80
+    image_cache_dir: str = "./image_cache"  # photos resized on demand by /images (disposable)
+    image_cache_max_mb: int = 512  # least recently used entries are evicted beyond this
+
     def get_upload_dir(self):
         """Get upload directory, checking environment variable first"""
         # Force production path if not in debug mode and production directory exists
@@ -54,6 +103,21 @@ class Settings(BaseSettings):
     port: int = 8000
     workers: int = 2
 
+    # Concurrency limits for blocking work offloaded from async endpoints
+    blocking_pool_size: int = 8  # threads for database access
+    matching_concurrency: int = 2  # match computations running at once per worker
+    match_job_queue_size: int = 100  # queued/running background match jobs before returning 503
+    match_job_ttl_seconds: int = 900  # how long finished job results stay available
+    image_workers: int = 2  # threads generating photo variants in the background
+    image_resize_workers: int = 2  # threads resizing /images requests on a cache miss
+    image_ingest_processes: int = 2  # processes normalizing uploaded photos
+
+    # Serve /matches/stats from the per-user rollup table instead of aggregating matches
+    match_stats_rollup: bool = True
+
+    # Days of candidate_changes kept by the nightly job (workers further behind reload everything)
+    candidate_change_retention_days: int = 7
+
     # CORS Configuration
     cors_origins: str = "*"
 
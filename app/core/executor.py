@@ -0,0 +1,59 @@
+"""
+Bounded execution layer for blocking work called from async endpoints
+Synchronous SQLAlchemy access and CPU-bound scoring run in thread pools so
+they never stall the event loop; the pool sizes are the concurrency limits
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from app.core.config import settings
+
+
+class BlockingExecutor:
+    """Runs blocking callables on a fixed-size thread pool and awaits the result"""
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) executed on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs) on the pool without waiting for it"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ProcessExecutor(BlockingExecutor):
+    """
+    BlockingExecutor on worker processes, for CPU-bound work that holds the GIL;
+    the callable must be importable and its arguments and result picklable
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # Workers are spawned (on first use) rather than forked from the threaded server
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+# Short database reads/writes
+db_executor = BlockingExecutor(settings.blocking_pool_size, "theone-db")
+
+# CPU-bound candidate loading and scoring; at most `matching_concurrency` run at once
+matching_executor = BlockingExecutor(settings.matching_concurrency, "theone-matching")
+
+# Background image processing (photo variants), kept off the matching pool
+image_executor = BlockingExecutor(settings.image_workers, "theone-images")
+
+# On-demand /images resizing, so a request never queues behind background variants
+image_resize_executor = BlockingExecutor(settings.image_resize_workers, "theone-resize")
+
+# Decoding and re-encoding uploaded photos, which would otherwise hold the GIL
+image_ingest_executor = ProcessExecutor(settings.image_ingest_processes)
@@ -0,0 +1,74 @@
+"""
+Per-worker startup for the web app
+Runs from the FastAPI lifespan rather than at import of main.py, so processes
+that only import the app's modules (the spawned ingest workers re-import
+__main__) never backfill, load the candidate pool or reconcile counters
+"""
+
+
+def check_schema():
+    """Warn when the database is behind; migrate.py migrates once per deploy, before the workers start"""
+    try:
+        from app.db.database import engine
+        from app.db.migrations import schema_is_current
+        with engine.connect() as connection:
+            if not schema_is_current(connection):
+                print("⚠️ Database schema is not up to date; run python3 migrate.py")
+    except Exception as e:
+        print(f"⚠️ Database schema check failed: {e}")
+
+
+def load_candidates():
+    """
+    Index word sets for users saved before the token index existed,
+    then build the in-memory candidate pool and retrieval index
+    """
+    from app.services.candidate_index import candidate_index
+    try:
+        from app.db.database import SessionLocal
+        from app.services.token_index import backfill_token_index
+        from app.services.candidate_store import candidate_store
+        db = SessionLocal()
+        try:
+            indexed = backfill_token_index(db)
+            if indexed:
+                print(f"🔤 Indexed {indexed} profile/expectation word sets")
+            # Matching features of every complete user, kept in memory
+            candidate_store.load(db)
+            # Word -> user postings for candidate retrieval; only candidate_store.refresh
+            # keeps them current, so they are loaded only once the store is
+            candidate_index.load(db)
+            print(f"👥 Candidate pool loaded: {len(candidate_store)} users (version {candidate_store.version})")
+        finally:
+            db.close()
+    except Exception as e:
+        # Stale postings would hide new users from every shortlist: match against the full pool instead
+        candidate_index.reset()
+        print(f"⚠️ Token index initialization failed: {e}")
+
+
+def reconcile_counters():
+    """Seed the /api/stats counters, or correct them after writes made outside the ORM"""
+    try:
+        from app.db.database import SessionLocal
+        from app.services.site_counters import reconcile_site_counters
+        db = SessionLocal()
+        try:
+            drift = reconcile_site_counters(db)
+            db.commit()
+            for name, (stored, actual) in drift.items():
+                if stored is None:
+                    print(f"📊 Stats counter {name} seeded: {actual}")
+                else:
+                    print(f"📊 Stats counter {name} drifted: {stored} -> {actual}")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"⚠️ Stats counter reconciliation failed: {e}")
+
+
+def prepare_worker():
+    """Everything a web worker needs before serving its first request"""
+    check_schema()
+    load_candidates()
+    reconcile_counters()
@@ -0,0 +1,50 @@
+"""
+Dialect-aware bulk inserts that skip rows violating a unique key
+Uses INSERT ... ON CONFLICT DO NOTHING on SQLite and PostgreSQL, so a batch
+is written in one statement per chunk instead of a SELECT per row
+"""
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Rows per INSERT, well below SQLite's bound-parameter limit for our tables
+BATCH_SIZE = 500
+
+
+def insert_ignoring_conflicts_statement(db: Session, model, conflict_columns: Optional[Sequence[str]] = None):
+    """INSERT for model that does nothing on conflict, for the session's dialect (e.g. for .from_select)"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        return dialect_insert(model).on_conflict_do_nothing(index_elements=conflict_columns)
+    return insert(model)
+
+
+def insert_ignoring_conflicts(db: Session, model, rows: List[Dict],
+                              conflict_columns: Optional[Sequence[str]] = None,
+                              returning=None) -> List:
+    """
+    Insert rows, silently skipping those that conflict with existing ones
+    (on `conflict_columns` if given, otherwise any unique key).
+
+    With `returning` (a column, e.g. Model.id, or a tuple of columns) the values
+    of the rows actually inserted are returned (tuples for several columns);
+    conflicting rows contribute nothing.
+    """
+    statement = insert_ignoring_conflicts_statement(db, model, conflict_columns)
+    several_columns = isinstance(returning, (tuple, list))
+    if several_columns:
+        statement = statement.returning(*returning)
+    elif returning is not None:
+        statement = statement.returning(returning)
+
+    inserted = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        result = db.execute(statement, rows[start:start + BATCH_SIZE])
+        if several_columns:
+            inserted.extend(tuple(row) for row in result.all())
+        elif returning is not None:
+            inserted.extend(result.scalars().all())
+    return inserted
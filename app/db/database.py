@@ -1,19 +1,127 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = url.partition("://")[2]
+    return _is_sqlite(url) and (database in ("", "/:memory:") or "mode=memory" in database)
+
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """PRAGMA statements run on every new SQLite connection for the configured profile"""
+    pragmas = [f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}"]
+    if settings.sqlite_profile == "performance":
+        if not read_only:
+            # Readers no longer block the writer (and vice versa); persistent once set
+            pragmas.append("PRAGMA journal_mode=WAL")
+        pragmas.extend([
+            f"PRAGMA synchronous={settings.sqlite_synchronous}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        ])
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _engine_kwargs(url: str, pool_size: int) -> dict:
+    kwargs = {}
+    if _is_sqlite(url):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_sqlite_memory(url):
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_pre_ping=not _is_sqlite(url),
+        )
+    return kwargs
+
+
+def _apply_sqlite_pragmas(sync_engine, read_only: bool):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def build_engine(url: str, pool_size: int, read_only: bool = False):
+    """Engine with the configured pool sizing and, for SQLite, per-connection pragmas"""
+    new_engine = create_engine(url, **_engine_kwargs(url, pool_size))
+    if _is_sqlite(url):
+        _apply_sqlite_pragmas(new_engine, read_only)
+    return new_engine
+
+
+def build_async_engine(url: str, pool_size: int):
+    """Async engine (asyncpg / aiosqlite) with the same pooling and pragmas as build_engine"""
+    kwargs = _engine_kwargs(url, pool_size)
+    # aiosqlite runs each connection on its own thread already
+    kwargs.pop("connect_args", None)
+    if _is_sqlite(url) and not _is_sqlite_memory(url):
+        # aiosqlite defaults to NullPool; pool file connections like the sync engine
+        kwargs["poolclass"] = AsyncAdaptedQueuePool
+    new_engine = create_async_engine(url, **kwargs)
+    if _is_sqlite(url):
+        _apply_sqlite_pragmas(new_engine.sync_engine, read_only=False)
+    return new_engine
+
+
 # Create database engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+engine = build_engine(settings.database_url, settings.db_pool_size)
 
-# Create session factory
+# Read-only engine for matching queries, so candidate loading never queues behind writes
+if settings.read_only_engine and not _is_sqlite_memory(settings.database_url):
+    read_engine = build_engine(
+        settings.read_database_url or settings.database_url, settings.read_pool_size, read_only=True
+    )
+else:
+    read_engine = engine
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engine, created on first use so the async driver stays optional
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Shared async engine for settings.async_database_url"""
+    global _async_engine
+    if _async_engine is None:
+        try:
+            _async_engine = build_async_engine(settings.async_database_url, settings.db_pool_size)
+        except ImportError as e:
+            raise RuntimeError(
+                f"Async database driver missing for {settings.async_database_url.split('://')[0]} "
+                f"(pip install asyncpg / aiosqlite): {e}"
+            )
+    return _async_engine
+
+
+def new_async_session() -> AsyncSession:
+    """New AsyncSession on the shared async engine"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_session_factory()
 
 # Create base class for models
 Base = declarative_base()
@@ -28,6 +136,15 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency to get a read-only database session"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
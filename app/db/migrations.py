@@ -0,0 +1,49 @@
+"""
+Programmatic Alembic runner
+The schema is owned by the revisions in migrations/, starting from the 0000
+baseline. upgrade_database() is run once per deploy by migrate.py, before the
+workers start; workers only check that the schema is current
+"""
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from app.db.database import engine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def alembic_config(database_url: Optional[str] = None, connection=None) -> Config:
+    """Alembic config for this project, optionally for another database or an open connection"""
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "migrations"))
+    config.attributes["from_app"] = True
+    if database_url:
+        config.attributes["database_url"] = database_url
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_database(database_url: Optional[str] = None, connection=None):
+    """Apply every pending migration (alembic upgrade head)"""
+    command.upgrade(alembic_config(database_url, connection), "head")
+
+
+def schema_is_current(connection) -> bool:
+    """Whether the database is at the latest revision; reads alembic_version only"""
+    heads = ScriptDirectory.from_config(alembic_config()).get_heads()
+    return set(MigrationContext.configure(connection).get_current_heads()) == set(heads)
+
+
+def require_current_schema() -> bool:
+    """For scripts: whether the app database is migrated, printing what to run when it is not"""
+    with engine.connect() as connection:
+        if schema_is_current(connection):
+            return True
+    print("❌ Database schema is not up to date; run python3 migrate.py first")
+    return False
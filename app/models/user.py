@@ -1,8 +1,13 @@
 """
 User and profile related database models
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey, Index, UniqueConstraint
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, object_session, relationship
+from sqlalchemy.orm.attributes import get_history
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -14,7 +19,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
@@ -22,6 +27,7 @@ class User(Base):
     expectations = relationship("Expectation", back_populates="user", uselist=False)
     sent_matches = relationship("Match", foreign_keys="Match.user_id", back_populates="user")
     received_matches = relationship("Match", foreign_keys="Match.matched_user_id", back_populates="matched_user")
+    token_index = relationship("UserTokenIndex", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
 
 class Profile(Base):
@@ -41,6 +47,8 @@ class Profile(Base):
 
 class Photo(Base):
     __tablename__ = "photos"
+    # Covers "first photo of a profile" lookups (see migration 0001)
+    __table_args__ = (Index("ix_photos_profile_first", "profile_id", "id", "file_path"),)
 
     id = Column(Integer, primary_key=True, index=True)
     profile_id = Column(Integer, ForeignKey("profiles.id"), nullable=False)
@@ -69,6 +77,7 @@ class Expectation(Base):
 
 class ExampleImage(Base):
     __tablename__ = "example_images"
+    __table_args__ = (Index("ix_example_images_expectation_id", "expectation_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     expectation_id = Column(Integer, ForeignKey("expectations.id"), nullable=False)
@@ -81,6 +90,7 @@ class ExampleImage(Base):
 
 class IdealPartnerPhoto(Base):
     __tablename__ = "ideal_partner_photos"
+    __table_args__ = (Index("ix_ideal_partner_photos_expectation_first", "expectation_id", "id", "file_path"),)
 
     id = Column(Integer, primary_key=True, index=True)
     expectation_id = Column(Integer, ForeignKey("expectations.id"), nullable=False)
@@ -92,8 +102,37 @@ class IdealPartnerPhoto(Base):
     expectation = relationship("Expectation", back_populates="ideal_partner_photos")
 
 
+class UserTokenIndex(Base):
+    __tablename__ = "user_token_index"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+
+    # Space-separated lowercase word sets used by dating_match_score, with the
+    # SHA-1 of the description they were computed from
+    profile_tokens = Column(Text, nullable=True)
+    profile_hash = Column(String(40), nullable=True)
+    expectation_tokens = Column(Text, nullable=True)
+    expectation_hash = Column(String(40), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    user = relationship("User", back_populates="token_index")
+
+
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        # One match row per (user, matched user) pair; also serves pair lookups
+        Index("uq_matches_user_pair", "user_id", "matched_user_id", unique=True),
+        # A user's matches best-first without a sort step
+        Index("ix_matches_user_score", "user_id", "compatibility_score"),
+        # "Already generated today?" checks
+        Index("ix_matches_user_created", "user_id", "created_at"),
+        Index("ix_matches_matched_user_id", "matched_user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -121,3 +160,194 @@ class Match(Base):
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="sent_matches")
     matched_user = relationship("User", foreign_keys=[matched_user_id], back_populates="received_matches")
+
+
+class MatchStats(Base):
+    """Per-user rollup of Match rows, updated as matches are inserted or viewed"""
+    __tablename__ = "user_match_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    total_matches = Column(Integer, nullable=False, default=0)
+    viewed_matches = Column(Integer, nullable=False, default=0)
+    compatibility_score_sum = Column(Float, nullable=False, default=0.0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class MatchScoreCache(Base):
+    """
+    dating_match_score results stored once per unordered pair of users
+
+    Rows are canonical: user_low_id < user_high_id, and every score column is
+    for the low -> high direction; the other direction is derived by swapping.
+    """
+    __tablename__ = "pair_score_cache"
+    __table_args__ = (UniqueConstraint("user_low_id", "user_high_id", name="uq_pair_score_cache_pair"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    # Versions (SHA-1 of the profile / expectation description) the score was computed from
+    low_profile_version = Column(String(40), nullable=True)
+    low_expectation_version = Column(String(40), nullable=True)
+    high_profile_version = Column(String(40), nullable=True)
+    high_expectation_version = Column(String(40), nullable=True)
+
+    # dating_match_score(low, high) and its directional components
+    compatibility_score = Column(Float, nullable=False)
+    text_score_a_to_b = Column(Float, nullable=False)
+    text_score_b_to_a = Column(Float, nullable=False)
+    image_score_a_to_b = Column(Float, nullable=False)
+    image_score_b_to_a = Column(Float, nullable=False)
+
+    # JSON of dating_match_score(low, high, return_details=True), filled on first request
+    details = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class MatchGenerationRun(Base):
+    __tablename__ = "match_generation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_date = Column(Date, unique=True, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running / completed
+
+    # Users are processed in id order; an interrupted run resumes after this id
+    last_user_id = Column(Integer, nullable=False, default=0)
+    users_processed = Column(Integer, nullable=False, default=0)
+    matches_created = Column(Integer, nullable=False, default=0)
+
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class MatchJob(Base):
+    """A background /api/find-matches job, shared by every worker process"""
+    __tablename__ = "match_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued / running / completed / failed
+    result = Column(Text, nullable=True)  # JSON list of matches once completed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True, index=True)
+
+
+class CandidateChange(Base):
+    __tablename__ = "candidate_changes"
+
+    # Monotonic id doubles as the candidate pool version; workers reload users changed after theirs
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SiteCounter(Base):
+    """Site-wide row counts served by /api/stats, kept current on every flush"""
+    __tablename__ = "site_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# Counter adjusted when a row of the model is inserted (+1) or deleted (-1)
+COUNTED_MODELS = {
+    User: "total_users",
+    Profile: "users_with_profiles",
+    Expectation: "users_with_expectations",
+    Photo: "total_photos",
+}
+
+
+def _count_row(delta):
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        session.info.setdefault("site_counter_deltas", Counter())[COUNTED_MODELS[mapper.class_]] += delta
+    return listener
+
+
+# Mapper events see every row the flush writes, including cascaded and orphan deletes
+for _model in COUNTED_MODELS:
+    event.listen(_model, "after_insert", _count_row(1))
+    event.listen(_model, "after_delete", _count_row(-1))
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_site_counter_deltas(session, flush_context):
+    """Apply the flush's inserts/deletes to site_counters in the same transaction"""
+    deltas = session.info.pop("site_counter_deltas", None)
+    if not deltas:
+        return
+
+    # Missing counters are seeded by the reconciliation in app.services.site_counters
+    connection = session.connection()
+    for name, delta in deltas.items():
+        if delta:
+            connection.execute(
+                update(SiteCounter).where(SiteCounter.name == name).values(value=SiteCounter.value + delta)
+            )
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_site_counter_deltas(session, previous_transaction):
+    # Rows counted by a flush that then failed were never written
+    session.info.pop("site_counter_deltas", None)
+
+
+class Blob(Base):
+    """
+    An uploaded file stored once under its SHA-256
+    ref_count is the number of Photo / ExampleImage / IdealPartnerPhoto rows
+    whose file_path is this blob's, maintained on every flush
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Last upload of this content (naive UTC); garbage collection spares recently used blobs
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+# Rows that reference a blob through file_path (paths outside the blob store match nothing)
+BLOB_REFERENCING_MODELS = (Photo, ExampleImage, IdealPartnerPhoto)
+
+
+def _adjust_blob_refs(connection, file_path, delta):
+    if file_path:
+        connection.execute(
+            update(Blob).where(Blob.file_path == file_path).values(ref_count=Blob.ref_count + delta)
+        )
+
+
+def _committed_file_path(target):
+    history = get_history(target, "file_path")
+    return history.deleted[0] if history.deleted else target.file_path
+
+
+def _blob_ref_inserted(mapper, connection, target):
+    _adjust_blob_refs(connection, target.file_path, 1)
+
+
+def _blob_ref_deleted(mapper, connection, target):
+    _adjust_blob_refs(connection, _committed_file_path(target), -1)
+
+
+def _blob_ref_updated(mapper, connection, target):
+    old_path = _committed_file_path(target)
+    if old_path != target.file_path:
+        _adjust_blob_refs(connection, old_path, -1)
+        _adjust_blob_refs(connection, target.file_path, 1)
+
+
+for _model in BLOB_REFERENCING_MODELS:
+    event.listen(_model, "after_insert", _blob_ref_inserted)
+    event.listen(_model, "after_delete", _blob_ref_deleted)
+    event.listen(_model, "after_update", _blob_ref_updated)
@@ -0,0 +1,211 @@
+"""
+User listing for the admin dashboards
+Users are read a page at a time, newest first, with keyset pagination on the
+user id (ids follow creation order), and completeness is filtered in SQL.
+A page costs three queries however many relationships its users have
+"""
+import json
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from sqlalchemy import and_, case, exists, func, not_, select
+from sqlalchemy.orm import Session
+
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Most users one JSON request may stream
+MAX_JSON_LIMIT = 5000
+
+# Users per query when streaming a long listing
+STREAM_BATCH_SIZE = 200
+
+# Characters of each description the dashboard shows (one more to know it was cut)
+PREVIEW_LENGTH = 100
+
+# Accepted values of the status filter
+STATUS_PATTERN = "^(complete|incomplete)$"
+
+_has_profile = and_(Profile.id.isnot(None), Profile.description != "")
+_has_expectations = and_(Expectation.id.isnot(None), Expectation.description != "")
+_has_photo = exists(select(Photo.id).where(Photo.profile_id == Profile.id))
+_is_complete = and_(_has_profile, _has_expectations, _has_photo)
+
+
+def _with_relations(statement):
+    return statement.outerjoin(Profile, Profile.user_id == User.id) \
+                    .outerjoin(Expectation, Expectation.user_id == User.id)
+
+
+def _filtered(statement, status: Optional[str], has_photos: Optional[bool]):
+    if status == "complete":
+        statement = statement.where(_is_complete)
+    elif status == "incomplete":
+        statement = statement.where(not_(_is_complete))
+    if has_photos is not None:
+        statement = statement.where(_has_photo if has_photos else not_(_has_photo))
+    return statement
+
+
+def admin_users_statement(before_id: Optional[int] = None, limit: int = PAGE_SIZE,
+                          status: Optional[str] = None, has_photos: Optional[bool] = None):
+    """Newest users older than before_id (all if None), with description previews"""
+    statement = _with_relations(select(
+        User.id, User.email, User.created_at, User.is_active,
+        Profile.id.label("profile_id"),
+        func.substr(Profile.description, 1, PREVIEW_LENGTH + 1).label("profile_description"),
+        Expectation.id.label("expectation_id"),
+        func.substr(Expectation.description, 1, PREVIEW_LENGTH + 1).label("expectations_description"),
+    ))
+    if before_id is not None:
+        statement = statement.where(User.id < before_id)
+    return _filtered(statement, status, has_photos).order_by(User.id.desc()).limit(limit)
+
+
+def count_admin_users(db: Session, status: Optional[str] = None,
+                      has_photos: Optional[bool] = None) -> Tuple[int, int]:
+    """(users, complete users) matching the filters, in one SELECT"""
+    statement = _with_relations(select(
+        func.count(User.id),
+        func.coalesce(func.sum(case((_is_complete, 1), else_=0)), 0),
+    ))
+    total, complete = db.execute(_filtered(statement, status, has_photos)).one()
+    return total, complete
+
+
+def _photo_paths(db: Session, model, key_column, keys: List[int]) -> Dict[int, List[str]]:
+    """file_path of every photo per owner id, in upload order"""
+    paths = defaultdict(list)
+    if keys:
+        rows = db.execute(select(key_column, model.file_path).where(key_column.in_(keys)).order_by(key_column, model.id))
+        for key, path in rows:
+            paths[key].append(path)
+    return paths
+
+
+def _photo_urls(paths: List[str], photo_url: Callable[[str], Optional[str]]) -> List[str]:
+    return [url for url in (photo_url(path) for path in paths) if url]
+
+
+def load_admin_page(db: Session, before_id: Optional[int] = None, limit: int = PAGE_SIZE,
+                    status: Optional[str] = None, has_photos: Optional[bool] = None,
+                    photo_url: Callable[[str], Optional[str]] = lambda path: f"/{path}") -> Tuple[List[Dict], Optional[int]]:
+    """
+    One page of dashboard rows, newest first, and the before_id of the next
+    page (None on the last page)
+    """
+    rows = db.execute(admin_users_statement(before_id, limit + 1, status, has_photos)).all()
+    next_before = rows[limit - 1].id if len(rows) > limit else None
+    rows = rows[:limit]
+
+    photos = _photo_paths(db, Photo, Photo.profile_id,
+                          [row.profile_id for row in rows if row.profile_id])
+    ideal_photos = _photo_paths(db, IdealPartnerPhoto, IdealPartnerPhoto.expectation_id,
+                                [row.expectation_id for row in rows if row.expectation_id])
+
+    users = []
+    for row in rows:
+        profile_desc = row.profile_description or ""
+        expectations_desc = row.expectations_description or ""
+        photo_paths = photos.get(row.profile_id, [])
+        ideal_partner_photos = _photo_urls(ideal_photos.get(row.expectation_id, []), photo_url)
+
+        has_profile = bool(profile_desc)
+        has_expectations = bool(expectations_desc)
+        has_photo = len(photo_paths) > 0
+        users.append({
+            'id': row.id,
+            'email': row.email,
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else '',
+            'is_active': row.is_active,
+            'profile_description': profile_desc,
+            'expectations_description': expectations_desc,
+            'photo_count': len(photo_paths),
+            'photo_urls': _photo_urls(photo_paths, photo_url),
+            'ideal_partner_photos': ideal_partner_photos,
+            'ideal_partner_count': len(ideal_partner_photos),
+            'has_profile': has_profile,
+            'has_expectations': has_expectations,
+            'has_photo': has_photo,
+            'has_ideal_photos': len(ideal_partner_photos) > 0,
+            'is_complete': has_profile and has_expectations and has_photo
+        })
+    return users, next_before
+
+
+def iter_admin_pages(db: Session, before_id: Optional[int] = None, limit: Optional[int] = None,
+                     status: Optional[str] = None, has_photos: Optional[bool] = None,
+                     photo_url: Callable[[str], Optional[str]] = lambda path: f"/{path}") -> Iterator[Tuple[List[Dict], Optional[int]]]:
+    """
+    load_admin_page results of up to STREAM_BATCH_SIZE users each, for streaming
+    up to limit users (all if None); the last before_id continues the listing
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch_size = STREAM_BATCH_SIZE if remaining is None else min(STREAM_BATCH_SIZE, remaining)
+        users, before_id = load_admin_page(db, before_id, batch_size, status, has_photos, photo_url)
+        yield users, before_id
+        if remaining is not None:
+            remaining -= len(users)
+        if before_id is None:
+            return
+
+
+def page_url(path: str, before_id: Optional[int] = None, limit: int = PAGE_SIZE,
+             status: Optional[str] = None, has_photos: Optional[bool] = None) -> str:
+    """Dashboard URL for a page with the given filters"""
+    params = {"before": before_id, "limit": limit if limit != PAGE_SIZE else None,
+              "status": status, "has_photos": None if has_photos is None else str(has_photos).lower()}
+    query = urlencode({name: value for name, value in params.items() if value is not None})
+    return f"{path}?{query}" if query else path
+
+
+def dashboard_context(db: Session, request, before_id: Optional[int] = None, limit: int = PAGE_SIZE,
+                      status: Optional[str] = None, has_photos: Optional[bool] = None,
+                      photo_url: Callable[[str], Optional[str]] = lambda path: f"/{path}") -> Dict:
+    """Template context of admin_dashboard.html for one page"""
+    users, next_before = load_admin_page(db, before_id, limit, status, has_photos, photo_url)
+    total_users, complete_profiles = count_admin_users(db)
+
+    path = request.url.path
+    return {
+        "request": request,
+        "users": users,
+        "total_users": total_users,
+        "complete_profiles": complete_profiles,
+        "status": status,
+        "has_photos": has_photos,
+        "filter_urls": {
+            "all": page_url(path, limit=limit),
+            "complete": page_url(path, limit=limit, status="complete"),
+            "incomplete": page_url(path, limit=limit, status="incomplete"),
+            "with_photos": page_url(path, limit=limit, has_photos=True),
+            "without_photos": page_url(path, limit=limit, has_photos=False),
+        },
+        "first_url": page_url(path, None, limit, status, has_photos) if before_id is not None else None,
+        "next_url": page_url(path, next_before, limit, status, has_photos) if next_before is not None else None,
+    }
+
+
+def stream_users_json(session_factory, before_id: Optional[int] = None, limit: int = PAGE_SIZE,
+                      status: Optional[str] = None, has_photos: Optional[bool] = None,
+                      photo_url: Callable[[str], Optional[str]] = lambda path: f"/{path}") -> Iterator[str]:
+    """
+    {"users": [...], "next_before": id or null} written user by user, reading
+    STREAM_BATCH_SIZE users per query
+    """
+    db = session_factory()
+    try:
+        yield '{"users": ['
+        separator = ""
+        next_before = None
+        for users, next_before in iter_admin_pages(db, before_id, limit, status, has_photos, photo_url):
+            for user in users:
+                yield separator + json.dumps(user)
+                separator = ", "
+        yield f'], "next_before": {json.dumps(next_before)}}}'
+    finally:
+        db.close()
@@ -2,16 +2,32 @@
 AI-powered dating matching service using GPT-4 Vision
 Simple and effective compatibility scoring
 """
+import heapq
 import openai
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
+
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.user import User, Profile, Expectation
+from app.services.batch_scoring import CandidatePool
+from app.services.candidate_index import candidate_index
+from app.services.candidate_queries import CandidateSnapshot
+from app.services.candidate_store import candidate_store
+from app.services.score_cache import load_cached_scores, store_scores, load_pair_details, store_pair_details
 
 # Set OpenAI API key
 openai.api_key = settings.openai_api_key
 
 
+def _word_set(person, text_key, tokens_key):
+    """Use the precomputed word set when present, otherwise split the raw text"""
+    tokens = person.get(tokens_key)
+    if tokens is not None:
+        return tokens
+    return set(person[text_key].lower().split())
+
+
 def dating_match_score(person_a, person_b, return_details=False):
     """
     person_a and person_b should be dicts with keys:
@@ -20,6 +36,9 @@ def dating_match_score(person_a, person_b, return_details=False):
     - 'self_image_url'
     - 'ideal_partner_image_url'
 
+    Optional 'profile_tokens' / 'expectation_tokens' hold precomputed word sets
+    (see app.services.token_index) and are used instead of re-splitting the text.
+
     If return_details=True, returns (score, details) where details contains mismatch info
     """
 
@@ -27,11 +46,11 @@ def dating_match_score(person_a, person_b, return_details=False):
         try:
             # For now, use simple text-based scoring since OpenAI API is not available
             # This maintains the same structure but with fallback logic
-            profile_text = person1['profile_text'].lower()
-            expectation_text = person2['expectation_text'].lower()
+            profile_words = _word_set(person1, 'profile_text', 'profile_tokens')
+            expectation_words = _word_set(person2, 'expectation_text', 'expectation_tokens')
 
             # Simple keyword matching
-            common_words = set(profile_text.split()).intersection(set(expectation_text.split()))
+            common_words = set(profile_words).intersection(expectation_words)
             score = min(len(common_words) / 20.0, 1.0)  # Normalize to 0-1
             score = max(score, 0.1)  # Minimum score
 
@@ -61,8 +80,8 @@ def dating_match_score(person_a, person_b, return_details=False):
         """Analyze what's not perfectly matched"""
         mismatches = []
 
-        profile_words = set(person1['profile_text'].lower().split())
-        expectation_words = set(person2['expectation_text'].lower().split())
+        profile_words = _word_set(person1, 'profile_text', 'profile_tokens')
+        expectation_words = _word_set(person2, 'expectation_text', 'expectation_tokens')
 
         # Check for key interests that don't match
         interests = ['travel', 'music', 'sports', 'reading', 'movies', 'cooking', 'hiking', 'gaming', 'art', 'dancing']
@@ -137,6 +156,19 @@ def dating_match_score(person_a, person_b, return_details=False):
         return 0.5  # Default score
 
 
+def is_complete(user: Union[User, CandidateSnapshot]) -> bool:
+    """Whether a user can be matched (snapshots are only loaded for complete users)"""
+    return isinstance(user, CandidateSnapshot) or bool(user.profile and user.expectations)
+
+
+def similarity_scores(components: Dict) -> Dict:
+    """Average the directional text and image terms into the stored Match similarity columns"""
+    return {
+        "text_similarity": round((components["text_score_a_to_b"] + components["text_score_b_to_a"]) / 2, 3),
+        "visual_similarity": round((components["image_score_a_to_b"] + components["image_score_b_to_a"]) / 2, 3),
+    }
+
+
 class AIMatchingService:
     def __init__(self):
         pass
@@ -154,61 +186,115 @@ class AIMatchingService:
         else:
             return f"http://localhost:8000/uploads/{file_path}"
 
+    def build_person(self, user: Union[User, CandidateSnapshot]) -> Dict:
+        """Prepare the dating_match_score input for a user with profile and expectations"""
+        if isinstance(user, CandidateSnapshot):
+            return {
+                'profile_text': user.profile_description,
+                'expectation_text': user.expectation_description,
+                'profile_tokens': user.profile_tokens,
+                'expectation_tokens': user.expectation_tokens,
+                'self_image_url': self.get_photo_url(user.photo_path),
+                'ideal_partner_image_url': self.get_photo_url(user.ideal_photo_path)
+            }
+
+        profile_tokens, expectation_tokens = candidate_store.word_sets(user)
+        person = {
+            'profile_text': user.profile.description,
+            'expectation_text': user.expectations.description,
+            'profile_tokens': profile_tokens,
+            'expectation_tokens': expectation_tokens,
+            'self_image_url': None,
+            'ideal_partner_image_url': None
+        }
 
+        # Get user's photo
+        if user.profile.photos:
+            person['self_image_url'] = self.get_photo_url(user.profile.photos[0].file_path)
 
-    async def find_daily_matches(self, user: User, candidate_users: List[User], limit: int = 5, include_reasoning: bool = False) -> List[Dict]:
+        # Get user's ideal partner photo
+        if user.expectations.ideal_partner_photos:
+            person['ideal_partner_image_url'] = self.get_photo_url(user.expectations.ideal_partner_photos[0].file_path)
+
+        return person
+
+    def shortlist_candidates(self, person: Dict, candidate_users: List[User], limit: int,
+                             exclude_id: Optional[int] = None) -> List[User]:
+        """
+        Keep only candidates sharing a meaningful word with this person (via the
+        inverted index, see InvertedTokenIndex.shortlist, which the nightly job
+        uses too). Falls back to every candidate when the index is not loaded or
+        the shortlist, without the person's own exclude_id, cannot fill the
+        requested limit.
+        """
+        shortlisted = candidate_index.shortlist(
+            person['profile_tokens'], person['expectation_tokens'],
+            {candidate.id for candidate in candidate_users}, limit, exclude_id=exclude_id
+        )
+        if shortlisted is None:
+            return candidate_users
+        return [candidate for candidate in candidate_users if candidate.id in shortlisted]
+
+    async def find_daily_matches(self, user: User, candidate_users: List[Union[User, CandidateSnapshot]], limit: int = 5, include_reasoning: bool = False,
+                                 db: Optional[Session] = None) -> List[Dict]:
         """
         Find matches using the dating_match_score function
+        Runs inline; async endpoints should offload match_candidates through
+        app.core.executor.matching_executor instead of awaiting this
+        """
+        return self.match_candidates(user, candidate_users, limit, include_reasoning, db)
+
+    def match_candidates(self, user: User, candidate_users: List[Union[User, CandidateSnapshot]], limit: int = 5, include_reasoning: bool = False,
+                         db: Optional[Session] = None) -> List[Dict]:
+        """
+        Find matches using the dating_match_score function (blocking)
         Returns all profiles in database except yourself
+
+        When a db session is given, pair scores and reasoning details are read from
+        and written to the pair-canonical score store, so (A, B) and (B, A) share
+        one computation (the caller commits). Candidates may be ORM users or
+        CandidateSnapshot rows from load_candidate_snapshots.
         """
-        if not user.profile or not user.expectations:
+        if not is_complete(user):
             return []
 
         matches = []
 
-        for candidate in candidate_users:
-            if (candidate.id == user.id or
-                not candidate.profile or
-                not candidate.expectations):
-                continue
-
-            # Prepare person_a data (current user)
-            person_a = {
-                'profile_text': user.profile.description,
-                'expectation_text': user.expectations.description,
-                'self_image_url': None,
-                'ideal_partner_image_url': None
-            }
+        # Prepare person_a data (current user) once for all candidates
+        person_a = self.build_person(user)
 
-            # Get user's photo
-            if user.profile.photos:
-                person_a['self_image_url'] = self.get_photo_url(user.profile.photos[0].file_path)
+        candidate_users = self.shortlist_candidates(person_a, candidate_users, limit, exclude_id=user.id)
 
-            # Get user's ideal partner photo
-            if user.expectations.ideal_partner_photos:
-                person_a['ideal_partner_image_url'] = self.get_photo_url(user.expectations.ideal_partner_photos[0].file_path)
+        candidates = [
+            candidate for candidate in candidate_users
+            if candidate.id != user.id and is_complete(candidate)
+        ]
 
-            # Prepare person_b data (candidate)
-            person_b = {
-                'profile_text': candidate.profile.description,
-                'expectation_text': candidate.expectations.description,
-                'self_image_url': None,
-                'ideal_partner_image_url': None
-            }
+        # Reuse cached pair scores whose profile/expectation versions are unchanged
+        cached_scores, stale_ids = {}, []
+        if db is not None:
+            cached_scores, stale_ids = load_cached_scores(db, user, candidates)
+        misses = [candidate for candidate in candidates if candidate.id not in cached_scores]
 
-            # Get candidate's photo
-            if candidate.profile.photos:
-                person_b['self_image_url'] = self.get_photo_url(candidate.profile.photos[0].file_path)
+        # Score the rest in one vectorized call, on rows the candidate store already encoded when it can
+        pool = candidate_store.encoded_pool(misses) if misses else None
+        if pool is None:
+            pool = CandidatePool([self.build_person(candidate) for candidate in misses])
+        miss_scores, miss_components = pool.score_with_components(person_a)
+        if db is not None and misses:
+            store_scores(db, user, misses, miss_scores, miss_components, stale_ids)
 
-            # Get candidate's ideal partner photo
-            if candidate.expectations.ideal_partner_photos:
-                person_b['ideal_partner_image_url'] = self.get_photo_url(candidate.expectations.ideal_partner_photos[0].file_path)
+        scored = dict(cached_scores)
+        for row, candidate in enumerate(misses):
+            scored[candidate.id] = (miss_scores[row], {key: values[row] for key, values in miss_components.items()})
+        scores = [scored[candidate.id][0] for candidate in candidates]
 
-            # Calculate compatibility using dating_match_score with details
-            if include_reasoning:
-                score, details = dating_match_score(person_a, person_b, return_details=True)
-            else:
-                score = dating_match_score(person_a, person_b, return_details=False)
+        # Keep only the best `limit` candidates (ties keep candidate order, like a stable sort)
+        top_rows = heapq.nlargest(limit, range(len(candidates)), key=scores.__getitem__)
+
+        # Match payloads (and expensive reasoning) are built for the survivors only
+        for row in top_rows:
+            candidate, score = candidates[row], scores[row]
 
             # Include all matches (no filtering) - just return everyone except yourself
             match_data = {
@@ -217,9 +303,17 @@ class AIMatchingService:
                 "overall_score": score,
                 "mutual_compatibility": score
             }
+            match_data.update(similarity_scores(scored[candidate.id][1]))
 
             # Add detailed reasoning if requested
-            if include_reasoning and 'details' in locals():
+            if include_reasoning:
+                details = load_pair_details(db, user, candidate) if db is not None else None
+                if details is None:
+                    person_b = self.build_person(candidate)
+                    _, details = dating_match_score(person_a, person_b, return_details=True)
+                    if db is not None:
+                        store_pair_details(db, user, candidate, details)
+
                 # Generate mismatch message
                 mismatch_messages = []
 
@@ -240,11 +334,8 @@ class AIMatchingService:
 
             matches.append(match_data)
 
-        # Sort by compatibility score (highest first)
-        matches.sort(key=lambda x: x["compatibility_score"], reverse=True)
-
-        # Return up to the limit
-        return matches[:limit]
+        # Already ordered by compatibility score (highest first)
+        return matches
 
 
 # Global instance
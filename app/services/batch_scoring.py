@@ -0,0 +1,342 @@
+"""
+Vectorized NumPy batch scorer for dating_match_score
+Encodes every candidate's word sets once as sparse rows so one user can be
+scored against the whole pool in a single call, with exactly the same
+results as calling dating_match_score pair by pair
+"""
+import heapq
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.token_index import tokenize
+
+# Must mirror match_query / image_match_query in dating_match_score
+TEXT_NORMALIZER = 20.0
+MIN_TEXT_SCORE = 0.1
+IMAGE_SCORE_AVAILABLE = 0.6
+IMAGE_SCORE_MISSING = 0.5
+
+# Two raw scores that round to the same 3-decimal value are less than this apart
+ROUNDING_SLACK = 0.001
+
+
+def _person_tokens(person: Dict, text_key: str, tokens_key: str):
+    tokens = person.get(tokens_key)
+    if tokens is None:
+        tokens = tokenize(person[text_key])
+    return tokens
+
+
+def encode_tokens(tokens: Iterable[str], vocabulary: Dict[str, int]) -> np.ndarray:
+    """Vocabulary ids of a word set, adding unseen words to the vocabulary"""
+    token_ids = []
+    for token in tokens:
+        token_id = vocabulary.get(token)
+        if token_id is None:
+            token_id = vocabulary[token] = len(vocabulary)
+        token_ids.append(token_id)
+    return np.asarray(token_ids, dtype=np.int32)
+
+
+class SparseTokenMatrix:
+    """CSR-style rows of vocabulary ids, one row per candidate"""
+
+    def __init__(self, rows: List[Iterable[str]], vocabulary: Dict[str, int]):
+        lengths = np.zeros(len(rows), dtype=np.int64)
+        indices = []
+        for row_number, tokens in enumerate(rows):
+            for token in tokens:
+                token_id = vocabulary.get(token)
+                if token_id is None:
+                    token_id = vocabulary[token] = len(vocabulary)
+                indices.append(token_id)
+            lengths[row_number] = len(tokens)
+
+        self._set_arrays(
+            np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            np.asarray(indices, dtype=np.int32),
+            # Row number of every stored word, so overlaps reduce with one bincount
+            np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+        )
+
+    def _set_arrays(self, indptr: np.ndarray, indices: np.ndarray, row_ids: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.row_ids = row_ids
+        self.n_rows = len(indptr) - 1
+
+    @classmethod
+    def from_arrays(cls, indptr: np.ndarray, indices: np.ndarray, row_ids: np.ndarray) -> "SparseTokenMatrix":
+        """Rebuild a matrix around existing (e.g. memory-mapped) arrays without copying"""
+        matrix = cls.__new__(cls)
+        matrix._set_arrays(indptr, indices, row_ids)
+        return matrix
+
+    @classmethod
+    def from_rows(cls, rows: List[np.ndarray]) -> "SparseTokenMatrix":
+        """Stack rows that are already encoded (see encode_tokens)"""
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        return cls.from_arrays(
+            np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            np.concatenate(rows).astype(np.int32, copy=False) if rows else np.zeros(0, dtype=np.int32),
+            np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+        )
+
+    def take(self, row_numbers: Iterable[int]) -> "SparseTokenMatrix":
+        """A new matrix of just these rows, in the given order"""
+        return self.from_rows([self.row(row_number) for row_number in row_numbers])
+
+    def row(self, row_number: int) -> np.ndarray:
+        """Vocabulary ids stored in one row"""
+        return self.indices[self.indptr[row_number]:self.indptr[row_number + 1]]
+
+    def overlap_counts(self, query_hits: np.ndarray) -> np.ndarray:
+        """Number of words each row shares with the query (given as a vocabulary mask)"""
+        if not self.n_rows:
+            return np.zeros(0, dtype=np.int64)
+        mask = query_hits[self.indices]
+        return np.bincount(self.row_ids[mask], minlength=self.n_rows)
+
+
+class CandidatePool:
+    """
+    All candidates encoded for batch scoring
+
+    `people` are dating_match_score inputs (see AIMatchingService.build_person);
+    `ids` are returned alongside scores so callers can map rows back to users.
+    """
+
+    # Arrays that fully describe a pool for scoring its own rows (see save_arrays)
+    ARRAY_NAMES = (
+        "ids", "profile_indptr", "profile_indices", "profile_row_ids",
+        "expectation_indptr", "expectation_indices", "expectation_row_ids",
+        "has_self_image", "has_ideal_image",
+    )
+
+    def __init__(self, people: List[Dict], ids: Optional[List[int]] = None):
+        self.ids = list(ids) if ids is not None else list(range(len(people)))
+        self.vocabulary: Dict[str, int] = {}
+
+        self.profiles = SparseTokenMatrix(
+            [_person_tokens(p, 'profile_text', 'profile_tokens') for p in people], self.vocabulary
+        )
+        self.expectations = SparseTokenMatrix(
+            [_person_tokens(p, 'expectation_text', 'expectation_tokens') for p in people], self.vocabulary
+        )
+        self.vocabulary_size = len(self.vocabulary)
+        self.has_self_image = np.array([bool(p['self_image_url']) for p in people], dtype=bool)
+        self.has_ideal_image = np.array([bool(p['ideal_partner_image_url']) for p in people], dtype=bool)
+
+    @classmethod
+    def from_encoded(cls, ids: List[int], vocabulary: Dict[str, int],
+                     profile_rows: List[np.ndarray], expectation_rows: List[np.ndarray],
+                     has_self_image: List[bool], has_ideal_image: List[bool]) -> "CandidatePool":
+        """
+        Pool over rows already encoded against `vocabulary` (see encode_tokens)
+        The vocabulary may keep growing afterwards; words added later match no row
+        """
+        pool = cls.__new__(cls)
+        pool.ids = list(ids)
+        pool.vocabulary = vocabulary
+        pool.vocabulary_size = len(vocabulary)
+        pool.profiles = SparseTokenMatrix.from_rows(profile_rows)
+        pool.expectations = SparseTokenMatrix.from_rows(expectation_rows)
+        pool.has_self_image = np.asarray(has_self_image, dtype=bool)
+        pool.has_ideal_image = np.asarray(has_ideal_image, dtype=bool)
+        return pool
+
+    def take(self, rows: List[int]) -> "CandidatePool":
+        """A pool of just these rows, in the given order, sharing the vocabulary"""
+        pool = self.__class__.__new__(self.__class__)
+        pool.ids = [self.ids[row] for row in rows]
+        pool.vocabulary = self.vocabulary
+        pool.vocabulary_size = self.vocabulary_size
+        pool.profiles = self.profiles.take(rows)
+        pool.expectations = self.expectations.take(rows)
+        pool.has_self_image = self.has_self_image[rows]
+        pool.has_ideal_image = self.has_ideal_image[rows]
+        return pool
+
+    def __len__(self):
+        return len(self.ids)
+
+    def save_arrays(self, directory: str):
+        """Write the pool's arrays as .npy files so worker processes can memory-map them"""
+        arrays = {
+            "ids": np.asarray(self.ids, dtype=np.int64),
+            "profile_indptr": self.profiles.indptr,
+            "profile_indices": self.profiles.indices,
+            "profile_row_ids": self.profiles.row_ids,
+            "expectation_indptr": self.expectations.indptr,
+            "expectation_indices": self.expectations.indices,
+            "expectation_row_ids": self.expectations.row_ids,
+            "has_self_image": self.has_self_image,
+            "has_ideal_image": self.has_ideal_image,
+        }
+        for name in self.ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), arrays[name])
+        np.save(os.path.join(directory, "vocabulary_size.npy"), np.asarray(self.vocabulary_size))
+
+    @classmethod
+    def load_arrays(cls, directory: str) -> "CandidatePool":
+        """
+        Read-only pool backed by memory-mapped arrays written by save_arrays
+        It can score its own rows (components_for_row) but has no vocabulary.
+        """
+        arrays = {}
+        for name in cls.ARRAY_NAMES:
+            arrays[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        pool = cls.__new__(cls)
+        pool.ids = arrays["ids"]
+        pool.vocabulary = {}
+        pool.vocabulary_size = int(np.load(os.path.join(directory, "vocabulary_size.npy")))
+        pool.profiles = SparseTokenMatrix.from_arrays(
+            arrays["profile_indptr"], arrays["profile_indices"], arrays["profile_row_ids"]
+        )
+        pool.expectations = SparseTokenMatrix.from_arrays(
+            arrays["expectation_indptr"], arrays["expectation_indices"], arrays["expectation_row_ids"]
+        )
+        pool.has_self_image = arrays["has_self_image"]
+        pool.has_ideal_image = arrays["has_ideal_image"]
+        return pool
+
+    def _query_mask(self, tokens) -> np.ndarray:
+        token_ids = [self.vocabulary[token] for token in tokens
+                     if self.vocabulary.get(token, self.vocabulary_size) < self.vocabulary_size]
+        return self._ids_mask(token_ids)
+
+    def _ids_mask(self, token_ids) -> np.ndarray:
+        hits = np.zeros(self.vocabulary_size + 1, dtype=bool)
+        if len(token_ids):
+            hits[token_ids] = True
+        return hits
+
+    @staticmethod
+    def _text_scores(counts: np.ndarray) -> np.ndarray:
+        scores = np.minimum(counts / TEXT_NORMALIZER, 1.0)
+        return np.maximum(scores, MIN_TEXT_SCORE)
+
+    def components(self, person: Dict) -> Dict[str, np.ndarray]:
+        """Directional text and image scores of `person` (A) against every candidate (B)"""
+        return self._components(
+            self._query_mask(_person_tokens(person, 'profile_text', 'profile_tokens')),
+            self._query_mask(_person_tokens(person, 'expectation_text', 'expectation_tokens')),
+            bool(person['self_image_url']),
+            bool(person['ideal_partner_image_url'])
+        )
+
+    def components_for_row(self, row: int, candidate_rows: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+        """
+        Like components(), for a person who is already encoded in the pool,
+        against every row or only candidate_rows (in that order)
+        """
+        targets = self if candidate_rows is None else self.take(candidate_rows)
+        return targets._components(
+            self._ids_mask(self.profiles.row(row)),
+            self._ids_mask(self.expectations.row(row)),
+            bool(self.has_self_image[row]),
+            bool(self.has_ideal_image[row])
+        )
+
+    def _components(self, profile_hits: np.ndarray, expectation_hits: np.ndarray,
+                    has_self_image: bool, has_ideal_image: bool) -> Dict[str, np.ndarray]:
+        # A profile vs B expectation, B profile vs A expectation
+        text_a_to_b = self._text_scores(self.expectations.overlap_counts(profile_hits))
+        text_b_to_a = self._text_scores(self.profiles.overlap_counts(expectation_hits))
+
+        # A looks like B wants, B looks like A wants
+        if has_self_image:
+            image_a_to_b = np.where(self.has_ideal_image, IMAGE_SCORE_AVAILABLE, IMAGE_SCORE_MISSING)
+        else:
+            image_a_to_b = np.full(len(self), IMAGE_SCORE_MISSING)
+        if has_ideal_image:
+            image_b_to_a = np.where(self.has_self_image, IMAGE_SCORE_AVAILABLE, IMAGE_SCORE_MISSING)
+        else:
+            image_b_to_a = np.full(len(self), IMAGE_SCORE_MISSING)
+
+        return {
+            "text_score_a_to_b": text_a_to_b,
+            "text_score_b_to_a": text_b_to_a,
+            "image_score_a_to_b": image_a_to_b,
+            "image_score_b_to_a": image_b_to_a,
+        }
+
+    @staticmethod
+    def _combine(parts: Dict[str, np.ndarray]) -> np.ndarray:
+        return (0.25 * parts["text_score_a_to_b"] + 0.25 * parts["text_score_b_to_a"] +
+                0.25 * parts["image_score_a_to_b"] + 0.25 * parts["image_score_b_to_a"])
+
+    def raw_scores(self, person: Dict) -> np.ndarray:
+        """Unrounded combined scores, evaluated in the same order as dating_match_score"""
+        return self._combine(self.components(person))
+
+    def raw_scores_with_components(self, person: Dict) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Unrounded combined scores plus the directional component arrays"""
+        parts = self.components(person)
+        return self._combine(parts), parts
+
+    def raw_scores_for_row(self, row: int, candidate_rows: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """raw_scores_with_components for a person who is already encoded in the pool"""
+        parts = self.components_for_row(row, candidate_rows)
+        return self._combine(parts), parts
+
+    def score(self, person: Dict) -> List[float]:
+        """Final scores for every candidate, identical to dating_match_score(person, candidate)"""
+        # Python's round() (not np.round) so ties on the third decimal match exactly
+        return [round(value, 3) for value in self.raw_scores(person).tolist()]
+
+    def score_with_components(self, person: Dict) -> Tuple[List[float], Dict[str, List[float]]]:
+        """Final scores plus the directional components as plain Python floats"""
+        parts = self.components(person)
+        scores = [round(value, 3) for value in self._combine(parts).tolist()]
+        return scores, {key: values.tolist() for key, values in parts.items()}
+
+
+def top_k_rows(raw_scores: np.ndarray, k: int, exclude_row: Optional[int] = None) -> List[Tuple[int, float]]:
+    """
+    (row, rounded score) of the k best rows, ordered exactly like a stable
+    descending sort of the rounded scores
+
+    Rounding is monotonic, so only rows within ROUNDING_SLACK of the k-th largest
+    raw score can make the cut; just those are rounded in Python.
+    """
+    if exclude_row is not None:
+        raw_scores = raw_scores.copy()
+        raw_scores[exclude_row] = -np.inf
+
+    n = len(raw_scores)
+    if k <= 0 or n == 0:
+        return []
+
+    kth_largest = np.partition(raw_scores, n - k)[n - k] if k < n else raw_scores.min()
+    rows = np.flatnonzero(raw_scores >= kth_largest - ROUNDING_SLACK)
+    rows = rows[np.isfinite(raw_scores[rows])]
+
+    rounded = [round(value, 3) for value in raw_scores[rows].tolist()]
+    best = heapq.nlargest(k, range(len(rows)), key=rounded.__getitem__)
+    return [(int(rows[position]), rounded[position]) for position in best]
+
+
+def rank_rows(pool: CandidatePool, rows: Iterable[int], limit: int,
+              shortlists: Optional[Sequence[Optional[Sequence[int]]]] = None) -> List[Tuple[int, List[Tuple[int, float, Dict[str, float]]]]]:
+    """
+    Top `limit` candidates for each of the pool's own `rows` (excluding itself)
+    shortlists[i], when given and not None, restricts rows[i] to those candidate
+    rows (ascending, without rows[i]); None scores it against the whole pool.
+    Returns [(row, [(candidate_row, score, components), ...]), ...]
+    """
+    results = []
+    for position, row in enumerate(rows):
+        candidate_rows = shortlists[position] if shortlists is not None else None
+        raw_scores, parts = pool.raw_scores_for_row(row, candidate_rows)
+        ranked = []
+        exclude_row = row if candidate_rows is None else None
+        for scored_row, score in top_k_rows(raw_scores, limit, exclude_row=exclude_row):
+            components = {key: float(values[scored_row]) for key, values in parts.items()}
+            candidate_row = scored_row if candidate_rows is None else int(candidate_rows[scored_row])
+            ranked.append((candidate_row, score, components))
+        results.append((row, ranked))
+    return results
@@ -0,0 +1,197 @@
+"""
+Content-addressed store for uploaded photos
+Each distinct file is kept once, at blobs/<sha[:2]>/<sha256><ext> under the
+upload directory, with a Blob row whose ref_count follows the Photo,
+ExampleImage and IdealPartnerPhoto rows pointing at it (see app.models.user).
+Re-uploading a photo reuses the stored file; collect_garbage deletes blobs
+nothing has referenced for a while
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.bulk import BATCH_SIZE, insert_ignoring_conflicts
+from app.models.user import Blob, BLOB_REFERENCING_MODELS
+from app.services.image_ingest import normalize_upload
+from app.services.image_variants import remove_variants
+from app.services.uploads import StoredUpload, stream_upload
+
+# Orphaned blobs (and abandoned incoming files) younger than this are kept, so
+# an upload whose referencing rows are not committed yet is never collected
+GC_GRACE = timedelta(hours=1)
+
+
+def blob_root() -> str:
+    # Normalized so stored paths look like the other upload paths (static/uploads/...)
+    return os.path.normpath(os.path.join(settings.get_upload_dir(), "blobs"))
+
+
+def _incoming_dir() -> str:
+    return os.path.join(blob_root(), "incoming")
+
+
+async def write_blob(upload: UploadFile, max_size: Optional[int] = None) -> StoredUpload:
+    """
+    Stream an upload into the store, normalized (see app.services.image_ingest),
+    and return it under its content path; if the same content is stored
+    already the new copy is dropped. Raises UploadTooLargeError or InvalidImageError
+    """
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    incoming_dir = _incoming_dir()
+    await asyncio.to_thread(os.makedirs, incoming_dir, exist_ok=True)
+    stored = await stream_upload(upload, os.path.join(incoming_dir, f"{uuid.uuid4().hex}{extension}"), max_size)
+    # The content address is that of the normalized bytes
+    stored = await normalize_upload(stored, upload.filename)
+    # Directory listing and renames block; they run off the event loop, but not
+    # behind the image decodes queued on image_executor
+    return await asyncio.to_thread(_store_normalized, stored)
+
+
+def _store_normalized(stored: StoredUpload) -> StoredUpload:
+    """Move a normalized upload to its content path, or drop it if that content is stored already"""
+    extension = os.path.splitext(stored.path)[1]
+    shard = os.path.join(blob_root(), stored.sha256[:2])
+    os.makedirs(shard, exist_ok=True)
+    existing = sorted(name for name in os.listdir(shard) if name.startswith(stored.sha256))
+    if existing:
+        os.remove(stored.path)
+        path = os.path.join(shard, existing[0])
+        # Fresh mtime: garbage collection leaves recently written files alone
+        os.utime(path)
+    else:
+        path = os.path.join(shard, f"{stored.sha256}{extension}")
+        os.replace(stored.path, path)
+    return StoredUpload(path, stored.size, stored.sha256)
+
+
+def register_blob(db: Session, stored: StoredUpload) -> str:
+    """
+    Record a written blob (or mark an existing one as just used) and return
+    the path rows should reference; commit it together with those rows
+    """
+    now = datetime.utcnow()
+    touched = db.execute(update(Blob).where(Blob.sha256 == stored.sha256).values(last_used_at=now)).rowcount
+    if not touched:
+        insert_ignoring_conflicts(db, Blob, [{
+            "sha256": stored.sha256,
+            "file_path": stored.path,
+            "size": stored.size,
+            "ref_count": 0,
+            "last_used_at": now,
+        }], conflict_columns=("sha256",))
+    return db.execute(select(Blob.file_path).where(Blob.sha256 == stored.sha256)).scalar_one()
+
+
+def register_blobs(db: Session, blobs: Iterable[StoredUpload]) -> Dict[str, str]:
+    """register_blob for several uploads; maps each written path to the path to reference"""
+    return {stored.path: register_blob(db, stored) for stored in blobs}
+
+
+def _reference_count(blob_path_column):
+    counts = [
+        select(func.count()).select_from(model).where(model.file_path == blob_path_column).scalar_subquery()
+        for model in BLOB_REFERENCING_MODELS
+    ]
+    return sum(counts[1:], counts[0])
+
+
+def recount_blob_refs(db: Session) -> int:
+    """Recompute every ref_count from the referencing tables; returns how many were wrong (caller commits)"""
+    actual = _reference_count(Blob.file_path)
+    return db.execute(update(Blob).where(Blob.ref_count != actual).values(ref_count=actual)).rowcount
+
+
+def register_referenced_blobs(db: Session) -> int:
+    """
+    Add rows for stored files that photos reference but no Blob row lists
+    (e.g. after restoring photos from a backup); returns how many (caller commits)
+    """
+    referenced = set()
+    for model in BLOB_REFERENCING_MODELS:
+        referenced.update(db.execute(select(model.file_path).where(model.file_path.like("%blobs%"))).scalars())
+    known = set(db.execute(select(Blob.file_path)).scalars())
+
+    root = blob_root()
+    now = datetime.utcnow()
+    rows = [
+        {"sha256": os.path.basename(path)[:64], "file_path": path, "size": os.path.getsize(path),
+         "ref_count": 0, "last_used_at": now}
+        for path in referenced - known
+        if os.path.dirname(os.path.dirname(path)) == root and os.path.isfile(path)
+    ]
+    insert_ignoring_conflicts(db, Blob, rows, conflict_columns=("sha256",))
+    return len(rows)
+
+
+class GarbageCollection(NamedTuple):
+    registered: int  # rows added for referenced files that had none
+    recounted: int  # ref_count values that had drifted
+    removed: int  # files deleted
+    freed: int  # bytes
+
+
+def _older_than(path: str, cutoff: datetime) -> bool:
+    return datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff
+
+
+def collect_garbage(db: Session, grace: timedelta = GC_GRACE,
+                    now: Optional[datetime] = None) -> GarbageCollection:
+    """
+    Reconcile the Blob rows with the photos, then delete blobs unreferenced and
+    unused for longer than grace (rows first, committed, then files with their
+    variants) and stored files older than grace that no row knows about
+    """
+    registered = register_referenced_blobs(db)
+    recounted = recount_blob_refs(db)
+    db.commit()
+
+    cutoff = (now or datetime.utcnow()) - grace
+    orphaned = (Blob.ref_count <= 0) & (Blob.last_used_at < cutoff)
+    candidates = db.execute(select(Blob.sha256, Blob.file_path).where(orphaned)).all()
+    if candidates:
+        # The condition is re-checked, so a blob re-uploaded meanwhile survives
+        db.execute(delete(Blob).where(orphaned, Blob.sha256.in_([blob.sha256 for blob in candidates])))
+        db.commit()
+
+    # Every stored file, by the hash its name starts with
+    files = {}
+    root = blob_root()
+    if os.path.isdir(root):
+        for shard in os.listdir(root):
+            shard_dir = os.path.join(root, shard)
+            if shard != "incoming" and os.path.isdir(shard_dir):
+                for name in os.listdir(shard_dir):
+                    files[name[:64]] = os.path.join(shard_dir, name)
+
+    # Files without a row: those of the rows just deleted, and uploads never committed.
+    # A file reused since (fresh mtime, see write_blob) is left for its new row
+    unknown = set(files)
+    shas = list(files)
+    for start in range(0, len(shas), BATCH_SIZE):
+        batch = shas[start:start + BATCH_SIZE]
+        unknown -= set(db.execute(select(Blob.sha256).where(Blob.sha256.in_(batch))).scalars())
+
+    removed, freed = 0, 0
+    for sha in unknown:
+        path = files[sha]
+        if _older_than(path, cutoff):
+            freed += os.path.getsize(path)
+            os.remove(path)
+            remove_variants(path)
+            removed += 1
+
+    # Files left in incoming/ by a crash between writing and placing a blob
+    incoming_dir = _incoming_dir()
+    if os.path.isdir(incoming_dir):
+        for name in os.listdir(incoming_dir):
+            path = os.path.join(incoming_dir, name)
+            if os.path.isfile(path) and _older_than(path, cutoff):
+                os.remove(path)
+    return GarbageCollection(registered, recounted, removed, freed)
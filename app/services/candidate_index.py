@@ -0,0 +1,141 @@
+"""
+Inverted index from words to user ids for candidate retrieval
+Lets the matcher score only users who share at least one meaningful word
+instead of the whole user table
+"""
+import threading
+from typing import Collection, Dict, Iterable, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.user import UserTokenIndex
+
+# Words too common to say anything about compatibility
+STOP_WORDS = frozenset({
+    "a", "about", "all", "also", "am", "an", "and", "any", "are", "as", "at",
+    "be", "been", "but", "by", "can", "do", "for", "from", "get", "has", "have",
+    "he", "her", "him", "his", "i", "i'm", "if", "in", "into", "is", "it", "its",
+    "just", "like", "looking", "me", "more", "my", "no", "not", "of", "on", "or",
+    "our", "out", "she", "so", "some", "someone", "that", "the", "their", "them",
+    "there", "they", "this", "to", "up", "us", "was", "we", "what", "when", "who",
+    "will", "with", "would", "you", "your",
+})
+
+
+def meaningful_tokens(tokens: Iterable[str]) -> Set[str]:
+    """Drop stop words from a word set"""
+    return {token for token in tokens if token not in STOP_WORDS}
+
+
+class InvertedTokenIndex:
+    """
+    Word -> user id postings, kept separately for profile and expectation words
+    because matching compares one user's profile with the other's expectations
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profile_postings: Dict[str, Set[int]] = {}
+        self._expectation_postings: Dict[str, Set[int]] = {}
+        self._profile_tokens: Dict[int, Set[str]] = {}
+        self._expectation_tokens: Dict[int, Set[str]] = {}
+        self.is_loaded = False
+
+    @staticmethod
+    def _replace(postings, user_tokens, user_id, tokens):
+        for token in user_tokens.pop(user_id, ()):
+            ids = postings.get(token)
+            if ids:
+                ids.discard(user_id)
+                if not ids:
+                    del postings[token]
+
+        if tokens is None:
+            return
+
+        words = meaningful_tokens(tokens)
+        user_tokens[user_id] = words
+        for token in words:
+            postings.setdefault(token, set()).add(user_id)
+
+    def update_profile(self, user_id: int, tokens: Optional[Iterable[str]]):
+        """Replace a user's profile words (None removes them)"""
+        with self._lock:
+            self._replace(self._profile_postings, self._profile_tokens, user_id, tokens)
+
+    def update_expectation(self, user_id: int, tokens: Optional[Iterable[str]]):
+        """Replace a user's expectation words (None removes them)"""
+        with self._lock:
+            self._replace(self._expectation_postings, self._expectation_tokens, user_id, tokens)
+
+    def remove_user(self, user_id: int):
+        """Drop a user from the index"""
+        self.update_profile(user_id, None)
+        self.update_expectation(user_id, None)
+
+    def candidates_for(self, profile_tokens: Iterable[str], expectation_tokens: Iterable[str]) -> Set[int]:
+        """
+        Users whose profile shares a meaningful word with these expectations,
+        or whose expectations share a meaningful word with this profile
+        """
+        candidates = set()
+        with self._lock:
+            for token in meaningful_tokens(expectation_tokens):
+                candidates.update(self._profile_postings.get(token, ()))
+            for token in meaningful_tokens(profile_tokens):
+                candidates.update(self._expectation_postings.get(token, ()))
+        return candidates
+
+    def shortlist(self, profile_tokens: Iterable[str], expectation_tokens: Iterable[str],
+                  candidate_ids: Collection[int], limit: int, exclude_id: Optional[int] = None) -> Optional[Set[int]]:
+        """
+        The candidate_ids (other than exclude_id, the person's own) sharing a
+        meaningful word with this person, or None to keep every candidate: when
+        the index is not loaded or the shortlist cannot fill the requested limit
+        """
+        if not self.is_loaded:
+            return None
+
+        shortlisted = self.candidates_for(profile_tokens, expectation_tokens)
+        shortlisted.intersection_update(candidate_ids)
+        shortlisted.discard(exclude_id)
+        if len(shortlisted) < limit:
+            return None
+        return shortlisted
+
+    def reset(self):
+        """Drop every posting and mark the index unloaded, so shortlists fall back to all candidates"""
+        with self._lock:
+            self._profile_postings = {}
+            self._expectation_postings = {}
+            self._profile_tokens = {}
+            self._expectation_tokens = {}
+            self.is_loaded = False
+
+    def load(self, db: Session) -> int:
+        """(Re)build the whole index from the persistent token index table"""
+        rows = db.query(
+            UserTokenIndex.user_id,
+            UserTokenIndex.profile_tokens,
+            UserTokenIndex.expectation_tokens
+        ).all()
+
+        with self._lock:
+            self._profile_postings = {}
+            self._expectation_postings = {}
+            self._profile_tokens = {}
+            self._expectation_tokens = {}
+            for user_id, profile_tokens, expectation_tokens in rows:
+                if profile_tokens is not None:
+                    self._replace(self._profile_postings, self._profile_tokens,
+                                  user_id, profile_tokens.split())
+                if expectation_tokens is not None:
+                    self._replace(self._expectation_postings, self._expectation_tokens,
+                                  user_id, expectation_tokens.split())
+            self.is_loaded = True
+
+        return len(rows)
+
+
+# Global instance
+candidate_index = InvertedTokenIndex()
@@ -0,0 +1,133 @@
+"""
+Candidate loading for the matchers
+One query (plus one per photo collection) loads every complete user with
+exactly the columns build_person and the score cache read, instead of lazy
+loading profile, expectations and photos candidate by candidate.
+For large pools, load_candidate_snapshots skips ORM hydration altogether
+"""
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, load_only
+
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto, UserTokenIndex
+from app.services.token_index import indexed_tokens, text_hash
+
+
+class CandidateSnapshot(NamedTuple):
+    """Read-only view of a complete user with just what matching needs"""
+    id: int
+    email: str
+    profile_description: str
+    expectation_description: str
+    profile_version: Optional[str]
+    expectation_version: Optional[str]
+    photo_path: Optional[str]
+    ideal_photo_path: Optional[str]
+    profile_tokens: FrozenSet[str]
+    expectation_tokens: FrozenSet[str]
+
+
+def complete_users_query(db: Session, exclude_user_id: Optional[int] = None):
+    """Users with both a profile and expectations, eager-loaded for scoring, in id order"""
+    query = db.query(User).options(
+        load_only(User.id, User.email),
+        joinedload(User.profile).load_only(
+            Profile.id, Profile.user_id, Profile.description
+        ),
+        joinedload(User.profile).selectinload(Profile.photos).load_only(
+            Photo.id, Photo.profile_id, Photo.file_path, Photo.order_index
+        ),
+        joinedload(User.expectations).load_only(
+            Expectation.id, Expectation.user_id, Expectation.description
+        ),
+        joinedload(User.expectations).selectinload(Expectation.ideal_partner_photos).load_only(
+            IdealPartnerPhoto.id, IdealPartnerPhoto.expectation_id,
+            IdealPartnerPhoto.file_path, IdealPartnerPhoto.order_index
+        ),
+        joinedload(User.token_index).load_only(
+            UserTokenIndex.id, UserTokenIndex.user_id,
+            UserTokenIndex.profile_tokens, UserTokenIndex.profile_hash,
+            UserTokenIndex.expectation_tokens, UserTokenIndex.expectation_hash
+        )
+    ).filter(
+        # Completeness is checked in SQL rather than by touching each relationship
+        User.profile.has(),
+        User.expectations.has()
+    )
+
+    if exclude_user_id is not None:
+        query = query.filter(User.id != exclude_user_id)
+
+    return query.order_by(User.id)
+
+
+def load_candidates(db: Session, exclude_user_id: Optional[int] = None) -> List[User]:
+    """Every complete user other than `exclude_user_id`, ready to score"""
+    return complete_users_query(db, exclude_user_id).all()
+
+
+def _first_photo_path(photo_model, owner_column, owner_id):
+    """Scalar subquery for the path of the first photo in a collection (relationship order)"""
+    return select(photo_model.file_path).where(
+        owner_column == owner_id
+    ).order_by(photo_model.id).limit(1).scalar_subquery()
+
+
+def candidate_snapshots_statement(exclude_user_id: Optional[int] = None, user_ids: Optional[Iterable[int]] = None):
+    """Core SELECT of every column a CandidateSnapshot needs (portable across SQLite and PostgreSQL)"""
+    statement = select(
+        User.id,
+        User.email,
+        Profile.description,
+        Expectation.description,
+        _first_photo_path(Photo, Photo.profile_id, Profile.id),
+        _first_photo_path(IdealPartnerPhoto, IdealPartnerPhoto.expectation_id, Expectation.id),
+        UserTokenIndex.profile_tokens,
+        UserTokenIndex.profile_hash,
+        UserTokenIndex.expectation_tokens,
+        UserTokenIndex.expectation_hash,
+    ).join(
+        Profile, Profile.user_id == User.id
+    ).join(
+        Expectation, Expectation.user_id == User.id
+    ).outerjoin(
+        UserTokenIndex, UserTokenIndex.user_id == User.id
+    ).order_by(User.id)
+
+    if exclude_user_id is not None:
+        statement = statement.where(User.id != exclude_user_id)
+    if user_ids is not None:
+        statement = statement.where(User.id.in_(list(user_ids)))
+    return statement
+
+
+def _to_snapshots(rows) -> List[CandidateSnapshot]:
+    snapshots = []
+    for (user_id, email, profile_text, expectation_text, photo_path, ideal_photo_path,
+         profile_tokens, profile_hash, expectation_tokens, expectation_hash) in rows:
+        # Same versions as score_cache.user_versions computes from ORM rows
+        profile_version, expectation_version = text_hash(profile_text), text_hash(expectation_text)
+        snapshots.append(CandidateSnapshot(
+            id=user_id,
+            email=email,
+            profile_description=profile_text,
+            expectation_description=expectation_text,
+            profile_version=profile_version,
+            expectation_version=expectation_version,
+            photo_path=photo_path,
+            ideal_photo_path=ideal_photo_path,
+            profile_tokens=indexed_tokens(profile_text, profile_tokens, profile_hash, profile_version),
+            expectation_tokens=indexed_tokens(expectation_text, expectation_tokens, expectation_hash,
+                                              expectation_version),
+        ))
+    return snapshots
+
+
+def load_candidate_snapshots(db: Session, exclude_user_id: Optional[int] = None,
+                             user_ids: Optional[Iterable[int]] = None) -> List[CandidateSnapshot]:
+    """
+    Every complete user other than `exclude_user_id` as snapshots, from one Core SELECT
+    Pass `user_ids` to load only those users (incomplete ones are simply absent)
+    """
+    return _to_snapshots(db.execute(candidate_snapshots_statement(exclude_user_id, user_ids)))
@@ -0,0 +1,224 @@
+"""
+Process-wide in-memory pool of matchable users
+Every worker keeps CandidateSnapshot rows for all complete users, so match
+requests read candidates from memory. Writes append to the candidate_changes
+log; its latest id is the pool version, and a worker whose copy is older
+reloads only the users changed since. The snapshots' word sets also serve
+ORM users (see word_sets), and are kept encoded for batch scoring, so a
+request scores its cache misses on a slice of the encoded pool instead of
+encoding them again. The nightly job prunes old log rows
+(prune_candidate_changes); a worker that fell behind the pruned rows
+reloads everything
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import CandidateChange, User
+from app.services.batch_scoring import CandidatePool, encode_tokens
+from app.services.candidate_index import candidate_index
+from app.services.candidate_queries import CandidateSnapshot, load_candidate_snapshots
+from app.services.token_index import get_expectation_tokens, get_profile_tokens
+
+# Users per reload query, below SQLite's bound-parameter limit
+RELOAD_BATCH_SIZE = 500
+
+# On PostgreSQL change ids come from a sequence and may commit out of order, so a
+# refresh also replays this many ids below our version (reloads are idempotent).
+# A change id is drawn when the writer's session flushes at commit (every writer
+# calls record_user_change just before db.commit()), so only changes from
+# transactions that commit within that flush-to-commit span can overtake it:
+# at most one per other open connection, i.e. workers * (pool size + overflow).
+# The window is twice that, and never below 50. On SQLite writes are serialized
+# and ids become visible in order.
+CHANGE_REPLAY_WINDOW = max(50, 2 * settings.workers * (settings.db_pool_size + settings.db_max_overflow))
+
+
+def record_user_change(db: Session, user_id: int):
+    """Log that a user's matching features changed (caller commits)"""
+    db.add(CandidateChange(user_id=user_id))
+
+
+def latest_version(db: Session) -> int:
+    """Current candidate pool version (0 before any change was logged)"""
+    return db.query(func.max(CandidateChange.id)).scalar() or 0
+
+
+def prune_candidate_changes(db: Session, older_than: timedelta, now: Optional[datetime] = None) -> int:
+    """
+    Delete change log rows older than `older_than`; the latest row is always
+    kept, as it carries the pool version (caller commits)
+    """
+    cutoff = (now or datetime.utcnow()) - older_than
+    return db.query(CandidateChange).filter(
+        CandidateChange.created_at < cutoff,
+        CandidateChange.id < latest_version(db)
+    ).delete(synchronize_session=False)
+
+
+# (profile word ids, expectation word ids, has a photo, has an ideal partner photo)
+EncodedCandidate = Tuple[np.ndarray, np.ndarray, bool, bool]
+
+
+class CandidateStore:
+    """Snapshots of all complete users, kept in sync through the change log"""
+
+    def __init__(self):
+        self.version = 0
+        self.is_loaded = False
+        self._snapshots: Dict[int, CandidateSnapshot] = {}
+        self._ordered: Optional[List[CandidateSnapshot]] = None
+        self._vocabulary: Dict[str, int] = {}
+        self._encoded: Dict[int, EncodedCandidate] = {}
+        # Encoded pool of every snapshot in id order, and each user's row in it
+        self._pool: Optional[Tuple[CandidatePool, Dict[int, int]]] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def load(self, db: Session):
+        """Full load of every complete user"""
+        with self._refresh_lock:
+            # Read the version first: changes committed during the load are re-applied later
+            self._load(db, latest_version(db))
+
+    def _load(self, db: Session, version: int):
+        snapshots = load_candidate_snapshots(db)
+        encoded = {snapshot.id: self._encode(snapshot) for snapshot in snapshots}
+
+        with self._lock:
+            self._snapshots = {snapshot.id: snapshot for snapshot in snapshots}
+            self._encoded = encoded
+            self._ordered = None
+            self._pool = None
+            self.version = version
+            self.is_loaded = True
+
+    def refresh(self, db: Session) -> int:
+        """Reload users changed since our version; returns how many were reloaded"""
+        # One refresh at a time, so an older reload never overwrites a newer one
+        with self._refresh_lock:
+            oldest, version = db.query(func.min(CandidateChange.id), func.max(CandidateChange.id)).one()
+            version = version or 0
+            if version <= self.version:
+                return 0
+
+            if oldest > self.version + 1:
+                # Changes we never saw were pruned from the log: start over
+                previous_ids = set(self._snapshots)
+                self._load(db, version)
+                for user_id in previous_ids - set(self._snapshots):
+                    candidate_index.remove_user(user_id)
+                for snapshot in self._snapshots.values():
+                    candidate_index.update_profile(snapshot.id, snapshot.profile_tokens)
+                    candidate_index.update_expectation(snapshot.id, snapshot.expectation_tokens)
+                return len(self._snapshots)
+
+            changed_ids = sorted({user_id for (user_id,) in db.query(CandidateChange.user_id).filter(
+                CandidateChange.id > self.version - CHANGE_REPLAY_WINDOW,
+                CandidateChange.id <= version
+            )})
+
+            reloaded = []
+            for start in range(0, len(changed_ids), RELOAD_BATCH_SIZE):
+                reloaded.extend(load_candidate_snapshots(db, user_ids=changed_ids[start:start + RELOAD_BATCH_SIZE]))
+            reloaded_by_id = {snapshot.id: snapshot for snapshot in reloaded}
+            encoded = {snapshot.id: self._encode(snapshot) for snapshot in reloaded}
+
+            with self._lock:
+                for user_id in changed_ids:
+                    # Users missing from the reload are no longer complete
+                    snapshot = reloaded_by_id.get(user_id)
+                    if snapshot:
+                        self._snapshots[user_id] = snapshot
+                        self._encoded[user_id] = encoded[user_id]
+                        # Word postings follow committed changes only, in every worker alike
+                        candidate_index.update_profile(user_id, snapshot.profile_tokens)
+                        candidate_index.update_expectation(user_id, snapshot.expectation_tokens)
+                    else:
+                        self._snapshots.pop(user_id, None)
+                        self._encoded.pop(user_id, None)
+                self._ordered = None
+                self._pool = None
+                self.version = version
+
+            return len(changed_ids)
+
+    def _encode(self, snapshot: CandidateSnapshot) -> EncodedCandidate:
+        # Only called under the refresh lock, the one writer of the vocabulary
+        return (
+            encode_tokens(snapshot.profile_tokens, self._vocabulary),
+            encode_tokens(snapshot.expectation_tokens, self._vocabulary),
+            bool(snapshot.photo_path),
+            bool(snapshot.ideal_photo_path),
+        )
+
+    def encoded_pool(self, candidates: List[CandidateSnapshot]) -> Optional[CandidatePool]:
+        """
+        Batch scoring pool of these candidates, sliced from the encoded pool
+        Returns None unless every candidate is the snapshot currently stored
+        (e.g. ORM users, or snapshots replaced by a refresh since)
+        """
+        with self._lock:
+            if any(self._snapshots.get(candidate.id) is not candidate for candidate in candidates):
+                return None
+            if self._pool is None:
+                ids = sorted(self._encoded)
+                encoded = [self._encoded[user_id] for user_id in ids]
+                pool = CandidatePool.from_encoded(
+                    ids, self._vocabulary,
+                    [profile for profile, _, _, _ in encoded],
+                    [expectation for _, expectation, _, _ in encoded],
+                    [has_photo for _, _, has_photo, _ in encoded],
+                    [has_ideal_photo for _, _, _, has_ideal_photo in encoded],
+                )
+                self._pool = pool, {user_id: row for row, user_id in enumerate(ids)}
+            pool, rows = self._pool
+
+        return pool.take([rows[candidate.id] for candidate in candidates])
+
+    def word_sets(self, user: User) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        (profile, expectation) word sets of a user with profile and expectations,
+        from the pooled snapshot while its descriptions are the user's current ones
+        """
+        snapshot = self._snapshots.get(user.id)
+        profile_text, expectation_text = user.profile.description, user.expectations.description
+        return (
+            snapshot.profile_tokens if snapshot and snapshot.profile_description == profile_text
+            else get_profile_tokens(user),
+            snapshot.expectation_tokens if snapshot and snapshot.expectation_description == expectation_text
+            else get_expectation_tokens(user),
+        )
+
+    def candidates(self, exclude_user_id: Optional[int] = None) -> List[CandidateSnapshot]:
+        """All pooled users in id order (the order load_candidate_snapshots returns)"""
+        with self._lock:
+            if self._ordered is None:
+                self._ordered = sorted(self._snapshots.values(), key=lambda snapshot: snapshot.id)
+            ordered = self._ordered
+
+        if exclude_user_id is None:
+            return list(ordered)
+        return [snapshot for snapshot in ordered if snapshot.id != exclude_user_id]
+
+    def __len__(self):
+        return len(self._snapshots)
+
+
+def current_candidates(db: Session, exclude_user_id: Optional[int] = None) -> List[CandidateSnapshot]:
+    """Up-to-date candidates from the in-memory pool, or straight from the database if it is not loaded"""
+    if not candidate_store.is_loaded:
+        return load_candidate_snapshots(db, exclude_user_id=exclude_user_id)
+
+    candidate_store.refresh(db)
+    return candidate_store.candidates(exclude_user_id)
+
+
+# Global candidate store instance
+candidate_store = CandidateStore()
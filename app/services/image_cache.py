@@ -0,0 +1,175 @@
+"""
+On-demand resized photos for the /images endpoint
+A photo under the upload directory is resized to the requested width the
+first time it is asked for and kept in a size-bounded disk cache, evicting
+the least recently used entries. Entries are keyed by the source file's
+path, size and mtime plus the output parameters, so a changed source never
+serves a stale copy and the ETag is known without touching the cache
+"""
+import hashlib
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.image_variants import FORMATS, open_upright, resize_to_width, save_image
+
+# Requested widths are rounded up to one of these, so arbitrary widths can't fill the cache
+RESIZE_WIDTHS = (80, 160, 240, 320, 400, 480, 640, 800, 1024, 1280, 1600)
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def snap_width(width: int) -> int:
+    """The smallest cached width at least as large as the requested one"""
+    return RESIZE_WIDTHS[min(bisect_left(RESIZE_WIDTHS, width), len(RESIZE_WIDTHS) - 1)]
+
+
+def resolve_upload(relative_path: str) -> Optional[str]:
+    """The image file a /uploads-relative path names, or None if it is missing or outside the upload directory"""
+    upload_dir = os.path.realpath(settings.get_upload_dir())
+    path = os.path.realpath(os.path.join(upload_dir, relative_path))
+    if not path.startswith(upload_dir + os.sep) or not os.path.isfile(path):
+        return None
+    if os.path.splitext(path)[1].lower() not in settings.allowed_image_extensions:
+        return None
+    return path
+
+
+class CachedImage(NamedTuple):
+    key: str
+    source: str
+    width: int
+    image_format: str
+    last_modified: float  # the source's mtime
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key[:32]}"'
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.image_format]
+
+    def headers(self) -> dict:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "public, max-age=86400",
+        }
+
+    def not_modified(self, request_headers: Mapping[str, str]) -> bool:
+        """Whether a conditional request already has this image (If-None-Match wins over If-Modified-Since)"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or self.etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(self.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class ImageCache:
+    """Disk cache of resized photos with least-recently-used eviction (thread-safe)"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # path -> size, least recent first
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._rendering = {}  # path -> lock held while it is being rendered
+
+    def describe(self, source: str, width: int, image_format: str) -> CachedImage:
+        """Cache key and headers for a resize of source; only stats the source"""
+        stat = os.stat(source)
+        key_text = f"{source}|{stat.st_size}|{stat.st_mtime_ns}|{width}|{image_format}|{settings.image_variant_quality}"
+        key = hashlib.sha256(key_text.encode()).hexdigest()
+        return CachedImage(key, source, width, image_format, stat.st_mtime)
+
+    def path_for(self, image: CachedImage) -> str:
+        return os.path.join(self.directory, image.key[:2], image.key + FORMATS[image.image_format][1])
+
+    def get(self, image: CachedImage) -> str:
+        """Path of the resized image, rendering it on a miss (blocking: run on the image executor)"""
+        path = self.path_for(image)
+        if self._hit(path):
+            return path
+
+        # Concurrent requests for the same image render it once
+        with self._lock:
+            render_lock = self._rendering.setdefault(path, threading.Lock())
+        try:
+            with render_lock:
+                if self._hit(path):
+                    return path
+                resized = resize_to_width(open_upright(image.source, image.width), image.width)
+                save_image(resized, path, image.image_format)
+                self._add(path, os.path.getsize(path))
+        finally:
+            with self._lock:
+                self._rendering.pop(path, None)
+        return path
+
+    def _load(self):
+        """Index the entries already on disk (e.g. from before a restart), oldest use first"""
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if not name.endswith(".part"):
+                        stat = os.stat(os.path.join(root, name))
+                        entries.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+        for _, path, size in sorted(entries):
+            self._entries[path] = size
+            self._total += size
+        self._loaded = True
+
+    def _hit(self, path: str) -> bool:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if not os.path.exists(path):
+                # Evicted by another worker process
+                self._total -= self._entries.pop(path, 0)
+                return False
+            if path in self._entries:
+                self._entries.move_to_end(path)
+            else:
+                # Rendered by another worker process
+                self._entries[path] = os.path.getsize(path)
+                self._total += self._entries[path]
+        # The mtime records recency across restarts
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _add(self, path: str, size: int):
+        with self._lock:
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                evicted, evicted_size = self._entries.popitem(last=False)
+                self._total -= evicted_size
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:
+                    pass
+
+    def size(self) -> int:
+        """Bytes currently cached"""
+        with self._lock:
+            return self._total
+
+
+# Global image cache instance
+image_cache = ImageCache(settings.image_cache_dir, settings.image_cache_max_mb * 1024 * 1024)
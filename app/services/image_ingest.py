@@ -0,0 +1,105 @@
+"""
+Normalization of uploaded photos before they are stored
+Phone photos arrive as multi-megabyte originals with EXIF (orientation, GPS,
+camera data). Each upload is decoded, turned upright, bounded to
+settings.image_ingest_max_dimension and re-encoded without metadata, on the
+ingest process pool; only file paths cross the process boundary. An upload
+that is already clean, within bounds and smaller than its re-encoding is
+kept byte for byte
+"""
+import hashlib
+import os
+import uuid
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.core.executor import image_ingest_executor
+from app.services.uploads import UPLOAD_CHUNK_SIZE, StoredUpload
+
+# Image.info keys that carry metadata rather than pixels (the ICC profile is kept)
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+class InvalidImageError(Exception):
+    """An upload could not be decoded as an image"""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as stored:
+        for chunk in iter(lambda: stored.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_image(path: str, max_dimension: int, quality: int) -> Optional[Tuple[str, int, str]]:
+    """
+    Write a normalized copy of the photo at path next to it and return its
+    (path, size, sha256), or None to keep the original; runs in a worker process
+    """
+    try:
+        with Image.open(path) as image:
+            source_format = image.format
+            within_bounds = max(image.size) <= max_dimension
+            clean = not image.getexif() and not any(key in image.info for key in METADATA_KEYS) \
+                and not getattr(image, "text", None)
+            icc_profile = image.info.get("icc_profile")
+            # JPEGs are decoded at a reduced scale when that still covers max_dimension
+            image.draft("RGB", (max_dimension, max_dimension))
+            upright = ImageOps.exif_transpose(image)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(str(e))
+
+    has_alpha = upright.mode in ("RGBA", "LA", "PA") or (upright.mode == "P" and "transparency" in upright.info)
+    image_format = "WEBP" if source_format == "WEBP" else "PNG" if has_alpha else "JPEG"
+    mode = "RGBA" if has_alpha and image_format != "JPEG" else "RGB"
+    if upright.mode != mode:
+        upright = upright.convert(mode)
+    upright.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    options = {"icc_profile": icc_profile} if icc_profile else {}
+    if image_format == "JPEG":
+        options.update(quality=quality, optimize=True, progressive=True)
+    elif image_format == "WEBP":
+        options.update(quality=quality)
+
+    output = os.path.join(os.path.dirname(path), f"{uuid.uuid4().hex}{_EXTENSIONS[image_format]}")
+    try:
+        upright.save(output, format=image_format, **options)
+        size = os.path.getsize(output)
+        if clean and within_bounds and source_format in _EXTENSIONS and os.path.getsize(path) <= size:
+            # Re-encoding would only cost quality
+            os.remove(output)
+            return None
+        return output, size, _sha256(output)
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+
+
+async def normalize_upload(stored: StoredUpload, filename: Optional[str] = None) -> StoredUpload:
+    """
+    Normalize a streamed upload on the ingest process pool; the original file
+    is replaced by the normalized one (and removed on InvalidImageError)
+    """
+    try:
+        normalized = await image_ingest_executor.run(
+            normalize_image, stored.path, settings.image_ingest_max_dimension, settings.image_ingest_quality
+        )
+    except InvalidImageError as e:
+        os.remove(stored.path)
+        raise InvalidImageError(f"Invalid image: {filename}") from e
+    except BaseException:
+        if os.path.exists(stored.path):
+            os.remove(stored.path)
+        raise
+
+    if normalized is None:
+        return stored
+    os.remove(stored.path)
+    return StoredUpload(*normalized)
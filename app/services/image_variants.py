@@ -0,0 +1,132 @@
+"""
+Resized variants of uploaded photos
+Every photo gets a few width-bounded copies (WebP by default) under
+variants/<variant>/ in the upload directory, mirroring the original's path,
+so views can load an image sized for them instead of the full upload.
+They are generated in the background after an upload and by
+generate_image_variants.py for existing photos; until a variant exists the
+/images endpoint resizes on demand (see app.services.image_cache)
+"""
+import os
+import uuid
+from typing import Iterable, List, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.core.executor import image_executor
+
+# Variant name -> maximum width in pixels
+VARIANT_WIDTHS = {
+    "thumb": 160,  # admin dashboard thumbnails
+    "small": 400,  # match cards, previews, user detail
+    "medium": 800,
+}
+
+# Output format setting -> (Pillow format, file extension)
+FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+
+def _variants_root() -> str:
+    return os.path.join(os.path.normpath(settings.get_upload_dir()), "variants")
+
+
+def variant_path(file_path: str, variant: str) -> Optional[str]:
+    """Where the given variant of a stored photo lives; None for files outside the upload directory"""
+    upload_dir = os.path.abspath(settings.get_upload_dir())
+    relative = os.path.relpath(os.path.abspath(file_path), upload_dir)
+    if relative.startswith(os.pardir) or relative.startswith("variants" + os.sep):
+        return None
+    extension = FORMATS[settings.image_variant_format][1]
+    return os.path.join(_variants_root(), variant, os.path.splitext(relative)[0] + extension)
+
+
+def existing_variant(file_path: str, variant: str) -> Optional[str]:
+    """The variant's path if it has been generated"""
+    path = variant_path(file_path, variant)
+    return path if path and os.path.exists(path) else None
+
+
+def open_upright(file_path: str, largest: int) -> Image.Image:
+    """
+    Decode a photo with its EXIF orientation applied; JPEGs are decoded at a
+    reduced scale when that still covers the largest width needed
+    """
+    with Image.open(file_path) as image:
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    if image.mode == "P":
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    return image
+
+
+def resize_to_width(image: Image.Image, width: int) -> Image.Image:
+    """Scale down to at most width pixels wide, keeping the aspect ratio"""
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def save_image(image: Image.Image, path: str, image_format: str):
+    """Encode in the given format (see FORMATS) next to path and rename, so it is never served half-written"""
+    image_format = FORMATS[image_format][0]
+    mode = "RGBA" if image_format == "WEBP" and image.mode in ("RGBA", "LA", "PA") else "RGB"
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.part")
+    try:
+        image.save(temp_path, format=image_format, quality=settings.image_variant_quality)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def generate_variants(file_path: str, force: bool = False) -> List[str]:
+    """
+    Write the missing variants of a photo (all of them with force) and return
+    their paths; the image is decoded once, at the largest size needed
+    """
+    targets = {variant: variant_path(file_path, variant) for variant in VARIANT_WIDTHS}
+    missing = {variant: path for variant, path in targets.items()
+               if path and (force or not os.path.exists(path))}
+    if not missing:
+        return []
+
+    image = open_upright(file_path, max(VARIANT_WIDTHS[variant] for variant in missing))
+    written = []
+    for variant in sorted(missing, key=VARIANT_WIDTHS.get, reverse=True):
+        # Each smaller variant is resized from the previous one
+        image = resize_to_width(image, VARIANT_WIDTHS[variant])
+        save_image(image, missing[variant], settings.image_variant_format)
+        written.append(missing[variant])
+    return written
+
+
+def remove_variants(file_path: str):
+    """Delete the variants of a photo whose file is being removed"""
+    for variant in VARIANT_WIDTHS:
+        path = variant_path(file_path, variant)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _generate_in_background(file_path: str):
+    try:
+        generate_variants(file_path)
+    except Exception as e:
+        print(f"⚠️ Could not generate variants of {file_path}: {e}")
+
+
+def schedule_variants(file_paths: Iterable[str]):
+    """Generate variants of newly stored photos on the image executor without waiting"""
+    for file_path in set(file_paths):
+        if file_path:
+            image_executor.submit(_generate_in_background, file_path)
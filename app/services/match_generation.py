@@ -0,0 +1,148 @@
+"""
+Offline batch generation of daily matches for every complete user
+Loads the candidate set once, scores users in chunks against the shared
+CandidatePool (optionally across processes), bulk-inserts Match rows and checkpoints progress so an
+interrupted run resumes where it stopped. Each user is scored against the
+same inverted-index shortlist the request path uses
+"""
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.bulk import insert_ignoring_conflicts
+from app.models.user import Match, MatchGenerationRun
+from app.services.ai_matching import ai_matching_service, similarity_scores
+from app.services.batch_scoring import CandidatePool
+from app.services.candidate_index import InvertedTokenIndex, candidate_index
+from app.services.candidate_queries import load_candidate_snapshots
+from app.services.match_stats import record_matches_inserted
+from app.services.parallel_scoring import ParallelScorer
+
+
+def build_match_row(user_id: int, match_data: Dict) -> Dict:
+    """Match column values for one find_daily_matches result"""
+    return {
+        "user_id": user_id,
+        "matched_user_id": match_data["user_id"],
+        "compatibility_score": match_data["compatibility_score"],
+        "text_similarity_score": match_data["text_similarity"],
+        "visual_similarity_score": match_data["visual_similarity"],
+        "ideal_partner_score": match_data.get("ideal_partner_score", 0.0),
+        "expectation_visual_score": match_data.get("expectation_visual_score", 0.0),
+    }
+
+
+def save_matches(db: Session, rows: List[Dict]) -> List[int]:
+    """
+    Bulk-insert Match rows (from build_match_row) in one INSERT ... ON CONFLICT
+    per batch; pairs that already have a Match are skipped. Returns the ids of
+    the inserted rows and updates the match stats rollup (caller commits)
+    """
+    inserted = insert_ignoring_conflicts(
+        db, Match, rows, conflict_columns=("user_id", "matched_user_id"),
+        returning=(Match.id, Match.user_id, Match.compatibility_score)
+    )
+    record_matches_inserted(db, [(user_id, score) for _, user_id, score in inserted])
+    return [match_id for match_id, _, _ in inserted]
+
+
+def has_matches_for_day(db: Session, user_id: int, day: Optional[date] = None) -> bool:
+    """Whether matches were already generated for a user on a given (UTC) day"""
+    day_start = datetime.combine(day or datetime.utcnow().date(), time.min)
+    return db.query(Match.id).filter(
+        Match.user_id == user_id,
+        Match.created_at >= day_start
+    ).first() is not None
+
+
+def shortlist_rows(index: InvertedTokenIndex, pool: CandidatePool, people: List[Dict],
+                   rows: List[int], limit: int) -> List[Optional[List[int]]]:
+    """
+    Candidate rows (ascending, without the user) of each user's index shortlist,
+    or None where the whole pool is scored, exactly as shortlist_candidates
+    filters on the request path
+    """
+    if not index.is_loaded:
+        return [None] * len(rows)
+
+    row_of = {user_id: row for row, user_id in enumerate(pool.ids)}
+    shortlists = []
+    for row in rows:
+        person = people[row]
+        shortlisted = index.shortlist(person['profile_tokens'], person['expectation_tokens'], row_of, limit,
+                                      exclude_id=pool.ids[row])
+        if shortlisted is None:
+            shortlists.append(None)
+        else:
+            shortlists.append(sorted(row_of[user_id] for user_id in shortlisted))
+    return shortlists
+
+
+def _start_run(db: Session, run_date: date, restart: bool) -> MatchGenerationRun:
+    run = db.query(MatchGenerationRun).filter(MatchGenerationRun.run_date == run_date).first()
+    if not run:
+        run = MatchGenerationRun(run_date=run_date, status="running",
+                                 last_user_id=0, users_processed=0, matches_created=0)
+        db.add(run)
+    elif restart:
+        run.status = "running"
+        run.last_user_id = 0
+        run.users_processed = 0
+        run.matches_created = 0
+        run.finished_at = None
+    db.commit()
+    return run
+
+
+def generate_all_daily_matches(db: Session, limit: int = 5, chunk_size: int = 200,
+                               run_date: Optional[date] = None, restart: bool = False,
+                               workers: int = 1, progress=None,
+                               index: InvertedTokenIndex = candidate_index) -> MatchGenerationRun:
+    """
+    Generate the top `limit` matches for every complete user
+
+    Pairs that already have a Match row are skipped, like the on-demand endpoint.
+    Progress is committed after each chunk; calling again for the same run_date
+    resumes after the last finished user unless `restart` is set.
+    With workers > 1 each chunk is scored across that many processes.
+    Candidates are shortlisted through `index` when it is loaded.
+    """
+    run = _start_run(db, run_date or datetime.utcnow().date(), restart)
+    if run.status == "completed":
+        return run
+
+    users = load_candidate_snapshots(db)
+    people = [ai_matching_service.build_person(user) for user in users]
+    pool = CandidatePool(people, ids=[user.id for user in users])
+
+    pending = [row for row, user in enumerate(users) if user.id > run.last_user_id]
+
+    with ParallelScorer(pool, workers=workers) as scorer:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+
+            rows = []
+            shortlists = shortlist_rows(index, pool, people, chunk, limit)
+            for row, ranked in scorer.rank(chunk, limit, shortlists):
+                user_id = users[row].id
+                for candidate_row, score, components in ranked:
+                    match_data = {"user_id": pool.ids[candidate_row], "compatibility_score": score}
+                    match_data.update(similarity_scores(components))
+                    rows.append(build_match_row(user_id, match_data))
+
+            # Pairs that already have a Match are skipped by the upsert
+            inserted_ids = save_matches(db, rows)
+
+            run.last_user_id = users[chunk[-1]].id
+            run.users_processed += len(chunk)
+            run.matches_created += len(inserted_ids)
+            db.commit()
+
+            if progress:
+                progress(run)
+
+    run.status = "completed"
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    return run
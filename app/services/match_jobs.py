@@ -0,0 +1,123 @@
+"""
+Job queue for background match requests
+A submitted job runs on the matching executor and its result is kept for a
+while so clients can poll for it instead of holding the HTTP request open.
+Job state lives in the match_jobs table, so a job submitted on one uvicorn
+worker can be polled on any other, and the bound on unfinished jobs (the
+backpressure at peak times) holds across all workers
+"""
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.executor import BlockingExecutor, matching_executor
+from app.db.database import SessionLocal
+from app.models.user import MatchJob
+
+UNFINISHED = ("queued", "running")
+
+
+class QueueFullError(Exception):
+    """Raised when too many match jobs are already queued or running"""
+
+
+class MatchJobQueue:
+    """Tracks background match jobs: queued -> running -> completed / failed"""
+
+    def __init__(self, executor: BlockingExecutor, session_factory: sessionmaker,
+                 max_pending: int, result_ttl: float):
+        self.executor = executor
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+
+    def _pending_count(self, db) -> int:
+        return db.execute(select(func.count()).select_from(MatchJob).where(MatchJob.status.in_(UNFINISHED))).scalar()
+
+    def _prune(self, db):
+        """Drop expired results; fail jobs left unfinished by a worker that went away"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.result_ttl)
+        db.execute(delete(MatchJob).where(MatchJob.finished_at < cutoff))
+        db.execute(
+            update(MatchJob)
+            .where(MatchJob.status.in_(UNFINISHED), MatchJob.created_at < cutoff)
+            .values(status="failed", error="Match job was lost (worker restarted)", finished_at=datetime.utcnow())
+        )
+
+    def is_full(self) -> bool:
+        """Whether a new job would be rejected right now"""
+        db = self.session_factory()
+        try:
+            return self._pending_count(db) >= self.max_pending
+        finally:
+            db.close()
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        """Queue fn(*args, **kwargs) and return the job id; raises QueueFullError when full"""
+        db = self.session_factory()
+        try:
+            self._prune(db)
+            if self._pending_count(db) >= self.max_pending:
+                db.commit()
+                raise QueueFullError(f"{self.max_pending} match jobs already pending")
+
+            job_id = uuid.uuid4().hex
+            db.add(MatchJob(id=job_id, status="queued"))
+            db.commit()
+        finally:
+            db.close()
+
+        self.executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _update(self, job_id: str, **values):
+        db = self.session_factory()
+        try:
+            db.execute(update(MatchJob).where(MatchJob.id == job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self, job_id: str, fn, args, kwargs):
+        self._update(job_id, status="running")
+
+        try:
+            result, error, status = json.dumps(fn(*args, **kwargs), default=str), None, "completed"
+        except Exception as e:
+            print(f"❌ Match job {job_id} failed: {e}")
+            result, error, status = None, str(e), "failed"
+
+        self._update(job_id, status=status, result=result, error=error, finished_at=datetime.utcnow())
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job, or None if it is unknown or its result expired"""
+        db = self.session_factory()
+        try:
+            self._prune(db)
+            db.commit()
+            job = db.get(MatchJob, job_id)
+            if not job:
+                return None
+            return {
+                "status": job.status,
+                "result": json.loads(job.result) if job.result is not None else None,
+                "error": job.error,
+                "created_at": job.created_at,
+                "finished_at": job.finished_at,
+            }
+        finally:
+            db.close()
+
+
+# Global match job queue instance
+match_job_queue = MatchJobQueue(
+    matching_executor,
+    SessionLocal,
+    max_pending=settings.match_job_queue_size,
+    result_ttl=settings.match_job_ttl_seconds
+)
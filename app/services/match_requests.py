@@ -0,0 +1,174 @@
+"""
+Blocking steps of the /api/find-matches flow
+Each step opens its own session so the endpoint can run it on a worker
+thread (see app.core.executor) instead of on the event loop
+"""
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.auth import get_password_hash
+from app.db.database import SessionLocal, ReadSessionLocal
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto
+from app.services.ai_matching import ai_matching_service
+from app.services.blob_store import register_blobs
+from app.services.candidate_store import current_candidates, record_user_change
+from app.services.score_cache import invalidate_user_scores
+from app.services.token_index import index_profile, index_expectation
+from app.services.uploads import StoredUpload
+
+
+def get_or_create_user_id(email: str) -> int:
+    """Id of the user with this email, creating a passwordless account if needed"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if not user:
+            # Create new user
+            user = User(
+                email=email,
+                hashed_password=get_password_hash(str(uuid.uuid4())),  # Random password
+                is_active=True
+            )
+            db.add(user)
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def save_submission(user_id: int, introduction: str, expectations: str,
+                    photo_path: Optional[str] = None,
+                    ideal_photo_paths: Optional[List[Tuple[int, str]]] = None,
+                    blobs: Sequence[StoredUpload] = ()):
+    """
+    Store the profile, expectations and already-written photo files of a submission
+
+    ideal_photo_paths holds (order_index, file_path) pairs; passing a list (even
+    an empty one) replaces the previous ideal partner photos. Photos written with
+    write_blob are passed in blobs too and registered in the same transaction.
+    """
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+
+        # Reference each blob by its stored path (an identical earlier upload's, if any)
+        blob_paths = register_blobs(db, blobs)
+        photo_path = blob_paths.get(photo_path, photo_path)
+        if ideal_photo_paths is not None:
+            ideal_photo_paths = [(order_index, blob_paths.get(path, path)) for order_index, path in ideal_photo_paths]
+
+        # Update or create profile
+        profile = user.profile
+        if profile:
+            profile.description = introduction
+        else:
+            profile = Profile(user_id=user.id, description=introduction)
+            db.add(profile)
+            db.flush()
+        index_profile(db, user.id, introduction)
+
+        # Add photo to profile if uploaded
+        if photo_path:
+            # Remove old photos
+            for old_photo in profile.photos:
+                db.delete(old_photo)
+            # Add new photo
+            db.add(Photo(profile_id=profile.id, file_path=photo_path, order_index=0))
+
+        # Update or create expectations
+        expectation = user.expectations
+        if expectation:
+            expectation.description = expectations
+        else:
+            expectation = Expectation(user_id=user.id, description=expectations)
+            db.add(expectation)
+            db.flush()
+        index_expectation(db, user.id, expectations)
+
+        # Handle ideal partner photos
+        if ideal_photo_paths is not None:
+            # Remove old ideal partner photos
+            for old_photo in expectation.ideal_partner_photos:
+                db.delete(old_photo)
+
+            # Add new ideal partner photos
+            for order_index, ideal_photo_path in ideal_photo_paths:
+                db.add(IdealPartnerPhoto(
+                    expectation_id=expectation.id,
+                    file_path=ideal_photo_path,
+                    order_index=order_index
+                ))
+
+        # Photo changes (including clearing the ideal partner photos) alter image scores
+        # without changing the description hashes that version cached scores
+        if photo_path or ideal_photo_paths is not None:
+            invalidate_user_scores(db, user.id)
+
+        record_user_change(db, user.id)
+        db.commit()
+
+        print(f"✅ Data saved for user {user.email}: has_photo={bool(photo_path)}, "
+              f"ideal_photo_count={len(ideal_photo_paths or [])}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def find_matches_for_user(user_id: int, photo_url: Callable[[str], Optional[str]], limit: int = 5) -> List[Dict]:
+    """Best matches for a user, formatted for the /api/find-matches response"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+
+        # Find matches among complete users (in-memory pool, refreshed from the change log
+        # over the read-only pool)
+        read_db = ReadSessionLocal()
+        try:
+            complete_users = current_candidates(read_db, exclude_user_id=user.id)
+        finally:
+            read_db.close()
+
+        if not complete_users:
+            return []
+
+        # Get AI matches using dating_match_score function with detailed reasoning
+        # (top-k selection: only the best get reasoning built)
+        high_compatibility_matches = ai_matching_service.match_candidates(
+            user, complete_users, limit=limit, include_reasoning=True, db=db
+        )
+        db.commit()  # persist newly cached pair scores
+        users_by_id = {u.id: u for u in complete_users}
+
+        # Format response with photos and mismatch information
+        result = []
+        for match in high_compatibility_matches:
+            matched_user = users_by_id[match["user_id"]]
+
+            # Get user's photo
+            matched_photo_url = None
+            if matched_user.photo_path:
+                matched_photo_url = photo_url(matched_user.photo_path)
+
+            match_result = {
+                "email": matched_user.email,
+                "introduction": matched_user.profile_description,
+                "expectations": matched_user.expectation_description,
+                "photo_url": matched_photo_url,
+                "compatibility_score": match["compatibility_score"],
+                "is_high_match": True  # All matches are high compatibility
+            }
+
+            # Add mismatch information if available
+            if "mismatch_info" in match:
+                match_result["mismatch_info"] = match["mismatch_info"]
+
+            result.append(match_result)
+
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
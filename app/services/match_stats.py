@@ -0,0 +1,150 @@
+"""
+Match statistics per user
+compute_match_stats aggregates the matches table in one statement; with
+settings.match_stats_rollup the user_match_stats rollup is read instead and
+kept current by the write paths (save_matches, mark_match_as_viewed).
+A user's rollup row is seeded from the matches table by whichever comes
+first, a read or a write; reconcile_match_stats (run by reconcile_stats.py)
+recounts every row and reports drift
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.bulk import insert_ignoring_conflicts_statement
+from app.models.user import Match, MatchStats
+
+
+def _stats_response(total: int, viewed: int, score_sum: float) -> Dict:
+    average = score_sum / total if total else 0.0
+    return {
+        "total_matches": total,
+        "viewed_matches": viewed,
+        "unviewed_matches": total - viewed,
+        "average_compatibility_score": round(average, 3)
+    }
+
+
+def _totals_columns():
+    return (
+        func.count(Match.id),
+        func.coalesce(func.sum(case((Match.is_viewed == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(Match.compatibility_score), 0.0),
+    )
+
+
+def aggregate_match_totals(db: Session, user_id: int) -> Tuple[int, int, float]:
+    """(total, viewed, compatibility score sum) of a user's matches, in one SELECT"""
+    total, viewed, score_sum = db.execute(select(*_totals_columns()).where(Match.user_id == user_id)).one()
+    return total, viewed, float(score_sum)
+
+
+def _seed_rollup(db: Session, user_id: int) -> bool:
+    """
+    Create a user's rollup row from the matches table in a single
+    INSERT ... SELECT, so no match can land between the aggregate and the
+    insert. Returns False when the row already existed (caller commits)
+    """
+    statement = insert_ignoring_conflicts_statement(db, MatchStats, ("user_id",)).from_select(
+        ["user_id", "total_matches", "viewed_matches", "compatibility_score_sum"],
+        select(literal(user_id), *_totals_columns()).where(Match.user_id == user_id),
+    )
+    return db.execute(statement).rowcount == 1
+
+
+def compute_match_stats(db: Session, user_id: int) -> Dict:
+    """Match statistics straight from the matches table"""
+    return _stats_response(*aggregate_match_totals(db, user_id))
+
+
+def get_match_stats(db: Session, user_id: int) -> Dict:
+    """
+    Match statistics for a user, from the rollup when enabled
+    A user without a rollup row yet is seeded from the matches table (caller commits)
+    """
+    if not settings.match_stats_rollup:
+        return compute_match_stats(db, user_id)
+
+    rollup = db.query(MatchStats).filter(MatchStats.user_id == user_id).first()
+    if not rollup:
+        _seed_rollup(db, user_id)
+        rollup = db.query(MatchStats).filter(MatchStats.user_id == user_id).one()
+    return _stats_response(rollup.total_matches, rollup.viewed_matches, rollup.compatibility_score_sum)
+
+
+def _apply_delta(db: Session, user_id: int, total: int = 0, viewed: int = 0, score_sum: float = 0.0):
+    """
+    Add to a user's rollup row. Called after the match rows were written in
+    the same transaction, so a row seeded here already includes them; if a
+    concurrent reader or writer seeded it first, the delta is applied to theirs
+    """
+    statement = update(MatchStats).where(MatchStats.user_id == user_id).values(
+        total_matches=MatchStats.total_matches + total,
+        viewed_matches=MatchStats.viewed_matches + viewed,
+        compatibility_score_sum=MatchStats.compatibility_score_sum + score_sum,
+    )
+    if db.execute(statement).rowcount == 0 and not _seed_rollup(db, user_id):
+        db.execute(statement)
+
+
+def record_matches_inserted(db: Session, inserted: Iterable[Tuple[int, float]]):
+    """Add newly inserted (user_id, compatibility_score) matches to the rollup (caller commits)"""
+    if not settings.match_stats_rollup:
+        return
+
+    totals = defaultdict(lambda: [0, 0.0])
+    for user_id, score in inserted:
+        totals[user_id][0] += 1
+        totals[user_id][1] += score
+    for user_id, (count, score_sum) in totals.items():
+        _apply_delta(db, user_id, total=count, score_sum=score_sum)
+
+
+def record_match_viewed(db: Session, user_id: int):
+    """Count a match that just turned viewed (caller commits)"""
+    if settings.match_stats_rollup:
+        _apply_delta(db, user_id, viewed=1)
+
+
+def reconcile_match_stats(db: Session) -> Dict[int, Tuple[Tuple[int, int, float], Tuple[int, int, float]]]:
+    """
+    Recount every rollup row from the matches table and overwrite rows that
+    drifted (caller commits). Returns {user_id: (stored, actual)} as
+    (total, viewed, compatibility score sum) tuples
+
+    The rollup rows are locked before the matches are aggregated: a writer
+    updates its user's rollup row before committing, so every match the
+    aggregate cannot see yet belongs to a writer that will apply its delta
+    after this transaction commits
+    """
+    stored = {
+        user_id: (total, viewed, score_sum)
+        for user_id, total, viewed, score_sum in db.execute(
+            select(MatchStats.user_id, MatchStats.total_matches, MatchStats.viewed_matches,
+                   MatchStats.compatibility_score_sum).with_for_update()
+        ).all()
+    }
+    if not stored:
+        return {}
+
+    actual = {
+        user_id: (total, viewed, float(score_sum))
+        for user_id, total, viewed, score_sum in db.execute(
+            select(Match.user_id, *_totals_columns()).group_by(Match.user_id)
+        ).all()
+    }
+
+    drift = {}
+    for user_id, stored_totals in stored.items():
+        total, viewed, score_sum = actual.get(user_id, (0, 0, 0.0))
+        # The incrementally summed scores may differ from a fresh sum in the last bits
+        if stored_totals[:2] != (total, viewed) or not math.isclose(stored_totals[2], score_sum, abs_tol=1e-6):
+            drift[user_id] = (stored_totals, (total, viewed, score_sum))
+            db.execute(update(MatchStats).where(MatchStats.user_id == user_id).values(
+                total_matches=total, viewed_matches=viewed, compatibility_score_sum=score_sum
+            ))
+    return drift
@@ -0,0 +1,81 @@
+"""
+Multiprocess sharded scoring for the batch matcher
+The CandidatePool arrays are written once to memory-mapped .npy files that
+every worker process maps read-only, so workers only receive row numbers and
+return the top candidates, never pickled User objects
+"""
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.services.batch_scoring import CandidatePool, rank_rows
+
+# Pool attached in each worker process by _attach_pool
+_worker_pool: Optional[CandidatePool] = None
+
+
+def _attach_pool(directory: str):
+    global _worker_pool
+    _worker_pool = CandidatePool.load_arrays(directory)
+
+
+def _rank_shard(rows: List[int], limit: int, shortlists: Optional[List[Optional[List[int]]]]):
+    return rank_rows(_worker_pool, rows, limit, shortlists)
+
+
+class ParallelScorer:
+    """
+    Ranks the best candidates for many pool rows, across `workers` processes
+
+    With workers <= 1 everything runs in-process. Use as a context manager so
+    the worker processes and memory-mapped files are cleaned up:
+
+        with ParallelScorer(pool, workers=4) as scorer:
+            results = scorer.rank(rows, limit=5)
+    """
+
+    # Shards per worker: small enough to balance load, large enough to amortize IPC
+    SHARDS_PER_WORKER = 4
+
+    def __init__(self, pool: CandidatePool, workers: int = 1):
+        self.pool = pool
+        self.workers = workers
+        self._directory = None
+        self._executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._directory = tempfile.mkdtemp(prefix="theone_pool_")
+            self.pool.save_arrays(self._directory)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_attach_pool,
+                initargs=(self._directory,)
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def rank(self, rows: List[int], limit: int,
+             shortlists: Optional[List[Optional[List[int]]]] = None) -> List[Tuple[int, List[Tuple[int, float, Dict[str, float]]]]]:
+        """rank_rows for every row, in the same order as `rows`"""
+        if not self._executor or len(rows) < 2:
+            return rank_rows(self.pool, rows, limit, shortlists)
+
+        n_shards = min(len(rows), self.workers * self.SHARDS_PER_WORKER)
+        shard_size = -(-len(rows) // n_shards)
+        starts = range(0, len(rows), shard_size)
+        shards = [rows[start:start + shard_size] for start in starts]
+        shard_shortlists = [shortlists[start:start + shard_size] if shortlists is not None else None for start in starts]
+
+        results = []
+        for shard_result in self._executor.map(_rank_shard, shards, [limit] * len(shards), shard_shortlists):
+            results.extend(shard_result)
+        return results
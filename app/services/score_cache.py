@@ -0,0 +1,201 @@
+"""
+Persistent pair-canonical score store for dating_match_score results
+Each unordered pair of users is scored and stored once (low id -> high id);
+the reverse direction reuses the same row by swapping the directional terms.
+A stored score stays valid while neither user's profile nor expectation
+description has changed (compared by content hash, so edits within the same
+second are caught), so repeated match requests only rescore pairs where one
+side moved; photo changes invalidate a user's pairs explicitly
+"""
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.db.bulk import BATCH_SIZE, insert_ignoring_conflicts
+from app.models.user import User, MatchScoreCache
+from app.services.candidate_queries import CandidateSnapshot
+from app.services.token_index import text_hash
+
+COMPONENT_KEYS = ("text_score_a_to_b", "text_score_b_to_a", "image_score_a_to_b", "image_score_b_to_a")
+
+
+def _row_version(row):
+    if row is None:
+        return None
+    return text_hash(row.description)
+
+
+def user_versions(user: Union[User, CandidateSnapshot]) -> Tuple:
+    """(profile version, expectation version) a score for this user depends on"""
+    if isinstance(user, CandidateSnapshot):
+        return user.profile_version, user.expectation_version
+    return _row_version(user.profile), _row_version(user.expectations)
+
+
+def flip_components(components: Dict) -> Dict:
+    """Directional terms of (B, A) from those of (A, B)"""
+    return {
+        "text_score_a_to_b": components["text_score_b_to_a"],
+        "text_score_b_to_a": components["text_score_a_to_b"],
+        "image_score_a_to_b": components["image_score_b_to_a"],
+        "image_score_b_to_a": components["image_score_a_to_b"],
+    }
+
+
+def combine_components(components: Dict) -> float:
+    """Final score from directional terms, in dating_match_score's exact order"""
+    final_score = (0.25 * components["text_score_a_to_b"] + 0.25 * components["text_score_b_to_a"] +
+                   0.25 * components["image_score_a_to_b"] + 0.25 * components["image_score_b_to_a"])
+    return round(final_score, 3)
+
+
+def flip_details(details: Dict) -> Dict:
+    """dating_match_score(B, A) details from those of (A, B)"""
+    # "missing ideal partner photos" comes from the A -> B image check, "missing profile photos" from B -> A
+    photo_issues = []
+    if "missing profile photos" in details["photo_issues"]:
+        photo_issues.append("missing ideal partner photos")
+    if "missing ideal partner photos" in details["photo_issues"]:
+        photo_issues.append("missing profile photos")
+
+    flipped = flip_components(details)
+    flipped.update({
+        "mismatches_a_to_b": details["mismatches_b_to_a"],
+        "mismatches_b_to_a": details["mismatches_a_to_b"],
+        "photo_issues": photo_issues,
+        "common_words": details["common_words"],
+    })
+    return flipped
+
+
+def _pair_query(db: Session, user_id: int, candidate_id: int):
+    low_id, high_id = sorted((user_id, candidate_id))
+    return db.query(MatchScoreCache).filter(
+        MatchScoreCache.user_low_id == low_id,
+        MatchScoreCache.user_high_id == high_id
+    )
+
+
+# What scoring reads from a pair row; details stay in the database until load_pair_details
+_SCORE_COLUMNS = (
+    MatchScoreCache.id, MatchScoreCache.user_low_id, MatchScoreCache.user_high_id,
+    MatchScoreCache.low_profile_version, MatchScoreCache.low_expectation_version,
+    MatchScoreCache.high_profile_version, MatchScoreCache.high_expectation_version,
+    MatchScoreCache.compatibility_score,
+) + tuple(getattr(MatchScoreCache, key) for key in COMPONENT_KEYS)
+
+
+def _score_rows(db: Session, user_id: int, candidate_ids: List[int]):
+    """Score columns of the stored pairs between user_id and candidate_ids, as plain rows"""
+    higher = sorted(candidate_id for candidate_id in candidate_ids if candidate_id > user_id)
+    lower = sorted(candidate_id for candidate_id in candidate_ids if candidate_id < user_id)
+    # A Core connection skips the ORM result layer, which costs as much as the query here
+    connection = db.connection()
+    for own_column, other_column, ids in ((MatchScoreCache.user_low_id, MatchScoreCache.user_high_id, higher),
+                                          (MatchScoreCache.user_high_id, MatchScoreCache.user_low_id, lower)):
+        for start in range(0, len(ids), BATCH_SIZE):
+            yield from connection.execute(
+                select(*_SCORE_COLUMNS).where(own_column == user_id, other_column.in_(ids[start:start + BATCH_SIZE]))
+            )
+
+
+def load_cached_scores(db: Session, user: User, candidates: List[User]) -> Tuple[Dict[int, Tuple[float, Dict]], List[int]]:
+    """
+    Stored scores of `user` against `candidates` that are still valid,
+    oriented from `user` to each candidate
+
+    Returns ({candidate_id: (score, components)}, ids of stale rows to be replaced)
+    """
+    own_versions = user_versions(user)
+    candidate_versions = {candidate.id: user_versions(candidate) for candidate in candidates}
+
+    cached = {}
+    stale_ids = []
+    # Rows are unpacked as plain tuples: attribute access per column dominates on large pools
+    for (row_id, low_id, high_id, low_profile, low_expectation, high_profile, high_expectation,
+         score, *values) in _score_rows(db, user.id, list(candidate_versions)):
+        user_is_low = low_id == user.id
+        candidate_id = high_id if user_is_low else low_id
+        versions = candidate_versions[candidate_id]
+
+        expected = (own_versions, versions) if user_is_low else (versions, own_versions)
+        if ((low_profile, low_expectation), (high_profile, high_expectation)) != expected:
+            stale_ids.append(row_id)
+            continue
+
+        components = dict(zip(COMPONENT_KEYS, values))
+        if user_is_low:
+            cached[candidate_id] = (score, components)
+        else:
+            components = flip_components(components)
+            cached[candidate_id] = (combine_components(components), components)
+
+    return cached, stale_ids
+
+
+def store_scores(db: Session, user: User, candidates: List[User], scores: List[float],
+                 components: Dict[str, List[float]], stale_ids: Optional[List[int]] = None):
+    """Bulk-write freshly computed user -> candidate scores as canonical pairs (caller commits)"""
+    for start in range(0, len(stale_ids or []), BATCH_SIZE):
+        db.query(MatchScoreCache).filter(
+            MatchScoreCache.id.in_(stale_ids[start:start + BATCH_SIZE])
+        ).delete(synchronize_session=False)
+
+    own_versions = user_versions(user)
+    rows = []
+    for row, candidate in enumerate(candidates):
+        pair_components = {key: components[key][row] for key in COMPONENT_KEYS}
+        score = scores[row]
+        low_versions, high_versions = own_versions, user_versions(candidate)
+        low_id, high_id = user.id, candidate.id
+
+        if candidate.id < user.id:
+            pair_components = flip_components(pair_components)
+            score = combine_components(pair_components)
+            low_versions, high_versions = high_versions, low_versions
+            low_id, high_id = high_id, low_id
+
+        entry = {
+            "user_low_id": low_id,
+            "user_high_id": high_id,
+            "low_profile_version": low_versions[0],
+            "low_expectation_version": low_versions[1],
+            "high_profile_version": high_versions[0],
+            "high_expectation_version": high_versions[1],
+            "compatibility_score": score,
+        }
+        entry.update(pair_components)
+        rows.append(entry)
+
+    # Pairs another request stored concurrently are skipped
+    insert_ignoring_conflicts(db, MatchScoreCache, rows, conflict_columns=("user_low_id", "user_high_id"))
+
+
+def load_pair_details(db: Session, user: User, candidate: User) -> Optional[Dict]:
+    """Stored reasoning details for user -> candidate, if the pair row has them"""
+    row = _pair_query(db, user.id, candidate.id).first()
+    if not row or not row.details:
+        return None
+
+    details = json.loads(row.details)
+    return details if user.id < candidate.id else flip_details(details)
+
+
+def store_pair_details(db: Session, user: User, candidate: User, details: Dict):
+    """Attach user -> candidate reasoning details to the stored pair row (caller commits)"""
+    if "error" in details:
+        return
+
+    canonical = details if user.id < candidate.id else flip_details(details)
+    _pair_query(db, user.id, candidate.id).update(
+        {MatchScoreCache.details: json.dumps(canonical)}, synchronize_session=False
+    )
+
+
+def invalidate_user_scores(db: Session, user_id: int) -> int:
+    """Drop every stored pair involving a user (caller commits)"""
+    return db.query(MatchScoreCache).filter(
+        or_(MatchScoreCache.user_low_id == user_id, MatchScoreCache.user_high_id == user_id)
+    ).delete(synchronize_session=False)
@@ -0,0 +1,78 @@
+"""
+Site-wide counters behind /api/stats
+Counts are kept in site_counters, updated by a flush hook on every user,
+profile, expectation and photo insert or delete (see app.models.user), so a
+stats poll reads a handful of rows instead of counting tables.
+reconcile_site_counters recounts from scratch, fixes and reports any drift
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.bulk import insert_ignoring_conflicts
+from app.models.user import COUNTED_MODELS, User, Photo, SiteCounter
+
+COUNTER_NAMES = tuple(COUNTED_MODELS.values())
+
+
+def count_from_scratch(db: Session) -> Dict[str, int]:
+    """Every counter computed from its table, in one SELECT"""
+    row = db.execute(select(
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.count(User.id)).where(User.profile.has()).scalar_subquery(),
+        select(func.count(User.id)).where(User.expectations.has()).scalar_subquery(),
+        select(func.count(Photo.id)).scalar_subquery(),
+    )).one()
+    return dict(zip(("total_users", "users_with_profiles", "users_with_expectations", "total_photos"), row))
+
+
+def stored_counters(db: Session) -> Dict[str, int]:
+    return dict(db.execute(select(SiteCounter.name, SiteCounter.value)).all())
+
+
+def reconcile_site_counters(db: Session) -> Dict[str, Tuple[Optional[int], int]]:
+    """
+    Recount every counter and overwrite the stored value (caller commits)
+    Returns {name: (stored, actual)} for counters that drifted; stored is None
+    for a counter that did not exist yet
+    """
+    actual = count_from_scratch(db)
+    stored = stored_counters(db)
+
+    insert_ignoring_conflicts(db, SiteCounter, [
+        {"name": name, "value": value} for name, value in actual.items() if name not in stored
+    ], conflict_columns=("name",))
+
+    drift = {}
+    for name, value in actual.items():
+        if stored.get(name) != value:
+            drift[name] = (stored.get(name), value)
+            if name in stored:
+                db.execute(update(SiteCounter).where(SiteCounter.name == name).values(value=value))
+    return drift
+
+
+def get_site_stats(db: Session) -> Dict:
+    """Counter values plus signups in the last 24 hours (caller commits)"""
+    counters = stored_counters(db)
+    if any(name not in counters for name in COUNTER_NAMES):
+        # First poll on a database that predates the counters
+        reconcile_site_counters(db)
+        counters = stored_counters(db)
+
+    # Range count on ix_users_created_at, touching only the last day's signups
+    yesterday = datetime.now() - timedelta(days=1)
+    recent_users = db.query(func.count(User.id)).filter(User.created_at >= yesterday).scalar()
+
+    total_users = counters["total_users"]
+    users_with_profiles = counters["users_with_profiles"]
+    return {
+        "total_users": total_users,
+        "users_with_profiles": users_with_profiles,
+        "users_with_expectations": counters["users_with_expectations"],
+        "total_photos": counters["total_photos"],
+        "recent_users_24h": recent_users,
+        "completion_rate": round((users_with_profiles / total_users * 100) if total_users > 0 else 0, 1),
+    }
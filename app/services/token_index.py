@@ -0,0 +1,110 @@
+"""
+Persistent per-user token index for the matching service
+Word sets are computed once when a profile or expectation is saved,
+so scoring never has to re-split descriptions on every request.
+The in-memory candidate_index is not touched here: the candidate store
+applies committed changes to it when it refreshes (see record_user_change)
+"""
+import hashlib
+from typing import FrozenSet, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User, UserTokenIndex
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Lowercase word set, exactly as dating_match_score splits text"""
+    return frozenset(text.lower().split())
+
+
+def text_hash(text: str) -> str:
+    """SHA-1 of a description, stored next to its word set to detect edits"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def serialize_tokens(tokens) -> str:
+    """Store a word set as a space-separated string (words never contain whitespace)"""
+    return " ".join(sorted(tokens))
+
+
+def deserialize_tokens(value: Optional[str]) -> FrozenSet[str]:
+    """Load a word set stored by serialize_tokens"""
+    if not value:
+        return frozenset()
+    return frozenset(value.split())
+
+
+def _get_or_create_entry(db: Session, user_id: int) -> UserTokenIndex:
+    # Sessions here run without autoflush, so check entries added in this transaction first
+    for pending in db.new:
+        if isinstance(pending, UserTokenIndex) and pending.user_id == user_id:
+            return pending
+
+    entry = db.query(UserTokenIndex).filter(UserTokenIndex.user_id == user_id).first()
+    if not entry:
+        entry = UserTokenIndex(user_id=user_id)
+        db.add(entry)
+    return entry
+
+
+def index_profile(db: Session, user_id: int, description: str) -> UserTokenIndex:
+    """Update the stored profile word set for a user (caller commits)"""
+    tokens = tokenize(description)
+    entry = _get_or_create_entry(db, user_id)
+    entry.profile_tokens = serialize_tokens(tokens)
+    entry.profile_hash = text_hash(description)
+    return entry
+
+
+def index_expectation(db: Session, user_id: int, description: str) -> UserTokenIndex:
+    """Update the stored expectation word set for a user (caller commits)"""
+    tokens = tokenize(description)
+    entry = _get_or_create_entry(db, user_id)
+    entry.expectation_tokens = serialize_tokens(tokens)
+    entry.expectation_hash = text_hash(description)
+    return entry
+
+
+def indexed_tokens(description: str, stored_tokens: Optional[str], stored_hash: Optional[str],
+                   description_hash: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Stored word set when it was computed from this text, otherwise a fresh split
+    Pass description_hash when the caller has already hashed the text
+    """
+    # A hash mismatch means the text was edited outside the indexed write paths
+    if stored_tokens is not None and stored_hash == (description_hash or text_hash(description)):
+        return deserialize_tokens(stored_tokens)
+    return tokenize(description)
+
+
+def get_profile_tokens(user: User) -> FrozenSet[str]:
+    """Profile word set for a user, falling back to the raw text when not indexed"""
+    entry = user.token_index
+    if not entry:
+        return tokenize(user.profile.description)
+    return indexed_tokens(user.profile.description, entry.profile_tokens, entry.profile_hash)
+
+
+def get_expectation_tokens(user: User) -> FrozenSet[str]:
+    """Expectation word set for a user, falling back to the raw text when not indexed"""
+    entry = user.token_index
+    if not entry:
+        return tokenize(user.expectations.description)
+    return indexed_tokens(user.expectations.description, entry.expectation_tokens, entry.expectation_hash)
+
+
+def backfill_token_index(db: Session) -> int:
+    """Index every user whose profile or expectations have no stored word set (or hash) yet"""
+    indexed = 0
+    for user in db.query(User).all():
+        entry = user.token_index
+        if user.profile and (not entry or entry.profile_tokens is None or entry.profile_hash is None):
+            index_profile(db, user.id, user.profile.description)
+            indexed += 1
+        if user.expectations and (not entry or entry.expectation_tokens is None or entry.expectation_hash is None):
+            index_expectation(db, user.id, user.expectations.description)
+            indexed += 1
+
+    db.commit()
+    return indexed
@@ -0,0 +1,80 @@
+"""
+Streaming writer for uploaded files
+Uploads are copied in fixed-size chunks instead of being read into memory
+whole: the size limit is enforced and the SHA-256 computed while copying, and
+the file only appears at its final path (via rename) once it is complete
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Iterable, NamedTuple, Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+# Bytes read from the upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """An upload exceeded the size limit; nothing was kept on disk"""
+
+    def __init__(self, filename: Optional[str], max_size: int):
+        super().__init__(f"File too large: {filename} (limit {max_size} bytes)")
+        self.filename = filename
+        self.max_size = max_size
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+async def stream_upload(upload: UploadFile, path: str, max_size: Optional[int] = None) -> StoredUpload:
+    """
+    Copy an upload to path chunk by chunk, at most max_size bytes
+    (settings.max_file_size by default); raises UploadTooLargeError
+    """
+    max_size = settings.max_file_size if max_size is None else max_size
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLargeError(upload.filename, max_size)
+
+    # Same directory as the target, so the final rename is atomic
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(upload.filename, max_size)
+                digest.update(chunk)
+                await buffer.write(chunk)
+            await buffer.flush()
+            await asyncio.to_thread(os.fsync, buffer.fileno())
+        await aiofiles.os.replace(temp_path, path)
+    except BaseException:
+        # Also on cancellation (client gone): never leave partial files behind
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return StoredUpload(path, size, digest.hexdigest())
+
+
+def remove_uploads(paths: Iterable[str]):
+    """Delete files stored for a request that was then rejected"""
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
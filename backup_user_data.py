@@ -107,6 +107,15 @@ def backup_database():
         print(f"❌ Error backing up database: {e}")
         return None
 
+def link_or_copy(source, target):
+    """Hard-link source to target, copying where links are unsupported; True if linked"""
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        shutil.copy2(source, target)
+        return False
+
 def backup_files():
     """Copy all uploaded files to backup directory"""
     print("📁 Backing up uploaded files...")
@@ -152,14 +161,34 @@ def backup_files():
                         shutil.copy2(source_file, target_file)
                         copied_count += 1
         
+        # Content-addressed photos never change, so ones already in the
+        # previous backup are hard-linked instead of copied again
+        latest_backup_dir = "backups/files_latest"
+        linked_count = 0
+        blobs_dir = os.path.join(upload_dir, 'blobs')
+        for source_root, _, filenames in os.walk(blobs_dir):
+            relative_root = os.path.relpath(source_root, upload_dir)
+            if os.path.basename(relative_root) == 'incoming':
+                continue
+            os.makedirs(os.path.join(backup_dir, relative_root), exist_ok=True)
+            for filename in filenames:
+                target_file = os.path.join(backup_dir, relative_root, filename)
+                previous_file = os.path.join(latest_backup_dir, relative_root, filename)
+                if os.path.isfile(previous_file) and link_or_copy(previous_file, target_file):
+                    linked_count += 1
+                else:
+                    shutil.copy2(os.path.join(source_root, filename), target_file)
+                    copied_count += 1
+        
         print(f"✅ Files backed up to: {backup_dir}")
         print(f"   Files copied: {copied_count}")
+        if linked_count:
+            print(f"   Unchanged photos linked: {linked_count}")
         
-        # Also create a latest backup
-        latest_backup_dir = "backups/files_latest"
+        # Also create a latest backup (hard links to the backup just made)
         if os.path.exists(latest_backup_dir):
             shutil.rmtree(latest_backup_dir)
-        shutil.copytree(backup_dir, latest_backup_dir)
+        shutil.copytree(backup_dir, latest_backup_dir, copy_function=link_or_copy)
         print(f"✅ Latest files backup: {latest_backup_dir}")
         
         return backup_dir
@@ -302,6 +331,15 @@ def restore_files(backup_dir):
                     shutil.copy2(source_file, target_file)
                     copied_count += 1
     
+    # Content-addressed photos (blobs/<xx>/<sha256>.<ext>)
+    source_blobs = os.path.join(backup_dir, 'blobs')
+    for source_root, _, filenames in os.walk(source_blobs):
+        target_root = os.path.join(target_dir, os.path.relpath(source_root, backup_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in filenames:
+            shutil.copy2(os.path.join(source_root, filename), os.path.join(target_root, filename))
+            copied_count += 1
+    
     print(f"✅ Restored {copied_count} files to {target_dir}")
 
 if __name__ == "__main__":
@@ -127,7 +127,7 @@ systemctl enable nginx
 print_status "Step 9: Setting up Supervisor configuration"
 cat > /etc/supervisor/conf.d/theone.conf << EOF
 [program:theone]
-command=$APP_DIR/venv/bin/python -m uvicorn main:app --host 127.0.0.1 --port 8000 --workers 2
+command=/bin/sh -c "$APP_DIR/venv/bin/python migrate.py && exec $APP_DIR/venv/bin/python -m uvicorn main:app --host 127.0.0.1 --port 8000 --workers 2"
 directory=$APP_DIR
 user=$APP_USER
 autostart=true
@@ -161,7 +161,7 @@ echo "2. Update the OpenAI API key in $APP_DIR/.env"
 echo "3. Update the domain name in /etc/nginx/sites-available/theone"
 echo "4. Initialize the database:"
 echo "   cd $APP_DIR && source venv/bin/activate"
-echo "   python3 -c \"from app.db.database import engine; from app.models.user import Base; Base.metadata.create_all(bind=engine)\""
+echo "   python3 migrate.py"
 echo "5. Start the application:"
 echo "   supervisorctl start theone"
 echo "6. Check status:"
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Garbage-collect the content-addressed photo store
+Run from cron (e.g. daily `python3 gc_blobs.py`): reconciles blob rows and
+reference counts with the photo tables, then deletes blobs no photo has
+referenced for longer than the grace period
+"""
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.database import SessionLocal
+from app.db.migrations import require_current_schema
+from app.services.blob_store import GC_GRACE, collect_garbage
+
+
+def main():
+    """Recount references and collect orphaned blobs"""
+    parser = argparse.ArgumentParser(description="Delete unreferenced photo blobs")
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE.total_seconds() / 3600,
+                        help=f"keep orphans used within this many hours (default: {GC_GRACE.total_seconds() / 3600:g})")
+    args = parser.parse_args()
+
+    print("🧹 theOne - Photo Blob Garbage Collection")
+    print("=" * 40)
+
+    if not require_current_schema():
+        return 1
+    db = SessionLocal()
+    try:
+        result = collect_garbage(db, grace=timedelta(hours=args.grace_hours))
+    finally:
+        db.close()
+
+    if result.registered:
+        print(f"⚠️ Registered {result.registered} referenced blobs that had no row")
+    if result.recounted:
+        print(f"⚠️ Corrected the reference count of {result.recounted} blobs")
+    print(f"✅ Removed {result.removed} blobs, freed {result.freed / 1024 / 1024:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Nightly batch job: generate daily matches for every complete user
+Run from cron (e.g. `python3 generate_daily_matches.py`); re-running after an
+interruption resumes the same day's run where it stopped. Also prunes the
+candidate change log down to settings.candidate_change_retention_days
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.migrations import require_current_schema
+from app.services.candidate_index import candidate_index
+from app.services.candidate_store import prune_candidate_changes
+from app.services.match_generation import generate_all_daily_matches
+
+
+def main():
+    """Run the daily match generation job"""
+    parser = argparse.ArgumentParser(description="Generate daily matches for all complete users")
+    parser.add_argument("--limit", type=int, default=5, help="matches per user (default: 5)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="users per commit (default: 200)")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="run date YYYY-MM-DD (default: today, UTC)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"scoring processes (default: 1, this machine has {os.cpu_count()} cores)")
+    parser.add_argument("--restart", action="store_true", help="start the run over instead of resuming")
+    args = parser.parse_args()
+
+    print("💘 theOne - Daily Match Generation")
+    print("=" * 40)
+
+    if not require_current_schema():
+        return 1
+    db = SessionLocal()
+    started = time.time()
+
+    def report(run):
+        print(f"   ✅ {run.users_processed} users processed, {run.matches_created} matches created "
+              f"(last user id {run.last_user_id})")
+
+    try:
+        # The same word shortlist as the request path
+        candidate_index.load(db)
+
+        run = generate_all_daily_matches(
+            db, limit=args.limit, chunk_size=args.chunk_size,
+            run_date=args.date, restart=args.restart, workers=args.workers, progress=report
+        )
+        print("=" * 40)
+        print(f"🏁 Run {run.run_date}: {run.status} - {run.users_processed} users, "
+              f"{run.matches_created} matches in {time.time() - started:.1f}s")
+
+        pruned = prune_candidate_changes(db, timedelta(days=settings.candidate_change_retention_days))
+        db.commit()
+        print(f"🧹 Pruned {pruned} candidate change log rows")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
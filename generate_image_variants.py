@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Generate resized variants for photos stored before variants existed
+Safe to re-run: photos whose variants are already there are skipped unless
+--force is given (e.g. after changing the variant format or quality)
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+
+from app.db.database import SessionLocal
+from app.db.migrations import require_current_schema
+from app.models.user import BLOB_REFERENCING_MODELS
+from app.services.image_variants import generate_variants
+
+
+def main():
+    """Generate the missing variants of every referenced photo"""
+    parser = argparse.ArgumentParser(description="Generate resized photo variants")
+    parser.add_argument("--force", action="store_true", help="regenerate variants that already exist")
+    args = parser.parse_args()
+
+    print("🖼️ theOne - Photo Variant Generation")
+    print("=" * 40)
+
+    if not require_current_schema():
+        return 1
+    db = SessionLocal()
+    try:
+        paths = set()
+        for model in BLOB_REFERENCING_MODELS:
+            paths.update(db.execute(select(model.file_path)).scalars())
+    finally:
+        db.close()
+
+    generated, missing, failed = 0, 0, 0
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            missing += 1
+            continue
+        try:
+            generated += len(generate_variants(path, force=args.force))
+        except Exception as e:
+            print(f"⚠️ {path}: {e}")
+            failed += 1
+
+    print(f"✅ Generated {generated} variants for {len(paths)} photos")
+    if missing:
+        print(f"⚠️ {missing} photo files not found")
+    if failed:
+        print(f"❌ {failed} photos could not be processed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
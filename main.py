@@ -1,22 +1,33 @@
 """
 Main FastAPI application for theOne dating app
 """
-from typing import List
-from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from functools import partial
+from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 
 from app.core.config import settings
-from app.db.database import create_tables
+from app.core.startup import prepare_worker
 from app.api import auth, profiles, expectations, matches
+from app.services.admin_users import PAGE_SIZE, MAX_PAGE_SIZE, MAX_JSON_LIMIT, STATUS_PATTERN
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the candidate pool and counters once per worker, not on import"""
+    prepare_worker()
+    yield
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-Powered Dating App with Multimodal Matching",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -47,13 +58,28 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 if os.path.exists(upload_dir):
     app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
 
-def get_photo_url(file_path: str) -> str:
-    """Generate proper photo URL for both development and production"""
+def get_photo_url(file_path: str, variant: Optional[str] = None) -> str:
+    """
+    Generate proper photo URL for both development and production; with a
+    variant (see VARIANT_WIDTHS) the pre-generated resized copy is used, or
+    the /images endpoint resizes it on demand until that exists
+    """
     if not file_path:
         return None
 
     from urllib.parse import quote
 
+    if variant:
+        from app.services.image_variants import VARIANT_WIDTHS, existing_variant
+        variant_file = existing_variant(file_path, variant)
+        if variant_file:
+            file_path = variant_file
+        else:
+            url = get_photo_url(file_path)
+            if url.startswith("/uploads/"):
+                return f"/images/{url[len('/uploads/'):]}?w={VARIANT_WIDTHS[variant]}"
+            return url
+
     # Debug logging
     print(f"DEBUG: Converting file_path '{file_path}' to URL")
 
@@ -88,15 +114,6 @@ app.include_router(expectations.router, prefix="/api")
 app.include_router(matches.router, prefix="/api")
 
 
-# Initialize database on startup (only if it doesn't exist)
-import os
-if not os.path.exists("theone_production.db"):
-    print("🗄️ Creating new database...")
-    create_tables()
-else:
-    print("🗄️ Using existing database...")
-
-
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Simple dating app - upload photo, intro, expectations, find matches"""
@@ -123,105 +140,116 @@ async def health_check():
             "file_count": len(os.listdir(subdir_path)) if os.path.exists(subdir_path) else 0
         }
 
+    # Check the database through the async engine (asyncpg / aiosqlite)
+    from sqlalchemy import text
+    from app.db.database import new_async_session
+    database_status = {"backend": settings.database_url.split("://")[0]}
+    try:
+        async with new_async_session() as db:
+            await db.execute(text("SELECT 1"))
+        database_status["reachable"] = True
+    except Exception as e:
+        database_status["reachable"] = False
+        database_status["error"] = str(e)
+
     return {
         "status": "healthy",
         "uploads": upload_status,
         "subdirectories": subdirs,
+        "database": database_status,
         "debug_mode": settings.debug
     }
 
 
 @app.get("/profiles/{filename:path}")
-async def redirect_profiles_to_uploads(filename: str):
-    """Redirect /profiles/ requests to /uploads/ (fix for browser URL interpretation)"""
-    print(f"DEBUG: Redirecting /profiles/{filename} to /uploads/{filename}")
+async def redirect_profiles_to_uploads(filename: str, w: Optional[int] = Query(None, ge=1)):
+    """Redirect /profiles/ requests to /uploads/ (fix for browser URL interpretation), or to /images/ with a width"""
     from fastapi.responses import RedirectResponse
+    if w:
+        print(f"DEBUG: Redirecting /profiles/{filename} to /images/{filename}?w={w}")
+        return RedirectResponse(url=f"/images/{filename}?w={w}", status_code=301)
+    print(f"DEBUG: Redirecting /profiles/{filename} to /uploads/{filename}")
     return RedirectResponse(url=f"/uploads/{filename}", status_code=301)
 
 
-@app.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard(request: Request):
-    """Admin dashboard to monitor user registrations"""
-    from app.db.database import SessionLocal
-    from app.models.user import User, Profile, Expectation, Photo
-
-    db = SessionLocal()
+@app.get("/images/{path:path}")
+async def resized_image(
+    request: Request,
+    path: str,
+    w: int = Query(..., ge=1),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$")
+):
+    """
+    An uploaded photo (same path as under /uploads/) resized to width w,
+    rounded up to one of RESIZE_WIDTHS; rendered once, then served from the
+    disk cache, with ETag/Last-Modified for conditional requests
+    """
+    from fastapi.responses import FileResponse, Response
+    from app.core.executor import image_resize_executor
+    from app.services.image_cache import image_cache, resolve_upload, snap_width
+
+    source = resolve_upload(path)
+    if not source:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    image = image_cache.describe(source, snap_width(w), format or settings.image_variant_format)
+    if image.not_modified(request.headers):
+        return Response(status_code=304, headers=image.headers())
 
     try:
-        # Get all users with their data
-        users = db.query(User).all()
-
-        user_data = []
-        for user in users:
-            # Get profile info
-            profile_desc = ""
-            photo_count = 0
-            photo_urls = []
-
-            if hasattr(user, 'profile') and user.profile:
-                profile_desc = user.profile.description
-                photo_count = len(user.profile.photos)
-                # Generate proper photo URLs
-                photo_urls = []
-                for photo in user.profile.photos:
-                    photo_url = get_photo_url(photo.file_path)
-                    if photo_url:
-                        photo_urls.append(photo_url)
-
-                # Debug: print photo paths to help diagnose
-                print(f"DEBUG: User {user.email} photos: {[photo.file_path for photo in user.profile.photos]}")
-                print(f"DEBUG: Photo URLs: {photo_urls}")
-
-            # Get expectations and ideal partner photos
-            expectations_desc = ""
-            ideal_partner_photos = []
-            if hasattr(user, 'expectations') and user.expectations:
-                expectations_desc = user.expectations.description
-                # Get ideal partner photos
-                for photo in user.expectations.ideal_partner_photos:
-                    photo_url = get_photo_url(photo.file_path)
-                    if photo_url:
-                        ideal_partner_photos.append(photo_url)
-
-            # Check completeness
-            has_profile = bool(profile_desc)
-            has_expectations = bool(expectations_desc)
-            has_photo = photo_count > 0
-            is_complete = has_profile and has_expectations and has_photo
-
-            user_data.append({
-                'id': user.id,
-                'email': user.email,
-                'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_active': user.is_active,
-                'profile_description': profile_desc,
-                'expectations_description': expectations_desc,
-                'photo_count': photo_count,
-                'photo_urls': photo_urls,
-                'ideal_partner_photos': ideal_partner_photos,
-                'ideal_partner_count': len(ideal_partner_photos),
-                'has_profile': has_profile,
-                'has_expectations': has_expectations,
-                'has_photo': has_photo,
-                'has_ideal_photos': len(ideal_partner_photos) > 0,
-                'is_complete': is_complete
-            })
+        cached_path = await image_resize_executor.run(image_cache.get, image)
+    except Exception as e:
+        raise HTTPException(status_code=415, detail=f"Could not resize image: {str(e)}")
+    return FileResponse(cached_path, media_type=image.media_type, headers=image.headers())
 
-        # Sort by creation date (newest first)
-        user_data.sort(key=lambda x: x['created_at'], reverse=True)
 
-        return templates.TemplateResponse("admin_dashboard.html", {
-            "request": request,
-            "users": user_data,
-            "total_users": len(user_data),
-            "complete_profiles": sum(1 for u in user_data if u['is_complete'])
-        })
+@app.get("/admin", response_class=HTMLResponse)
+async def admin_dashboard(
+    request: Request,
+    before: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = Query(None, pattern=STATUS_PATTERN),
+    has_photos: Optional[bool] = None
+):
+    """Admin dashboard to monitor user registrations, one page of newest users at a time"""
+    from app.core.executor import db_executor
+    from app.db.database import ReadSessionLocal
+    from app.services.admin_users import dashboard_context
+
+    def load_page():
+        db = ReadSessionLocal()
+        try:
+            return dashboard_context(db, request, before, limit, status, has_photos,
+                                     partial(get_photo_url, variant="thumb"))
+        finally:
+            db.close()
 
+    try:
+        context = await db_executor.run(load_page)
     except Exception as e:
         return HTMLResponse(f"<h1>Admin Error</h1><p>{str(e)}</p>")
 
-    finally:
-        db.close()
+    # Rendered chunk by chunk (in the threadpool) instead of into one string
+    template = templates.get_template("admin_dashboard.html")
+    return StreamingResponse(template.generate(context), media_type="text/html")
+
+
+@app.get("/admin/users.json")
+async def admin_users_json(
+    before: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_JSON_LIMIT),
+    status: Optional[str] = Query(None, pattern=STATUS_PATTERN),
+    has_photos: Optional[bool] = None
+):
+    """Dashboard rows as streamed JSON; pass next_before as before to continue"""
+    from app.db.database import ReadSessionLocal
+    from app.services.admin_users import stream_users_json
+
+    return StreamingResponse(
+        stream_users_json(ReadSessionLocal, before, limit, status, has_photos,
+                          partial(get_photo_url, variant="thumb")),
+        media_type="application/json"
+    )
 
 
 @app.get("/admin/user/{user_id}", response_class=HTMLResponse)
@@ -246,7 +274,8 @@ async def view_user_detail(request: Request, user_id: int):
             for photo in user.profile.photos:
                 photo_url = get_photo_url(photo.file_path)
                 if photo_url:
-                    photos.append({'path': photo.file_path, 'url': photo_url})
+                    photos.append({'path': photo.file_path, 'url': photo_url,
+                                   'display_url': get_photo_url(photo.file_path, "small")})
 
             profile_data = {
                 'description': user.profile.description,
@@ -261,7 +290,8 @@ async def view_user_detail(request: Request, user_id: int):
             for photo in user.expectations.ideal_partner_photos:
                 photo_url = get_photo_url(photo.file_path)
                 if photo_url:
-                    ideal_partner_photos.append({'path': photo.file_path, 'url': photo_url})
+                    ideal_partner_photos.append({'path': photo.file_path, 'url': photo_url,
+                                                 'display_url': get_photo_url(photo.file_path, "small")})
 
             expectations_data = {
                 'description': user.expectations.description,
@@ -291,34 +321,24 @@ async def view_user_detail(request: Request, user_id: int):
 @app.get("/api/stats")
 async def get_user_stats():
     """API endpoint for user statistics - useful for monitoring"""
+    from app.core.executor import db_executor
     from app.db.database import SessionLocal
-    from app.models.user import User, Profile, Expectation, Photo
+    from app.services.site_counters import get_site_stats
     from datetime import datetime
 
-    db = SessionLocal()
+    def read_stats():
+        db = SessionLocal()
+        try:
+            stats = get_site_stats(db)
+            db.commit()  # persists counters seeded on the first poll
+            return stats
+        finally:
+            db.close()
 
     try:
-        total_users = db.query(User).count()
-
-        # Count users with complete data
-        users_with_profiles = db.query(User).filter(User.profile.has()).count()
-        users_with_expectations = db.query(User).filter(User.expectations.has()).count()
-
-        # Count photos
-        total_photos = db.query(Photo).count()
-
-        # Get recent users (last 24 hours)
-        from datetime import datetime, timedelta
-        yesterday = datetime.now() - timedelta(days=1)
-        recent_users = db.query(User).filter(User.created_at >= yesterday).count()
-
+        stats = await db_executor.run(read_stats)
         return {
-            "total_users": total_users,
-            "users_with_profiles": users_with_profiles,
-            "users_with_expectations": users_with_expectations,
-            "total_photos": total_photos,
-            "recent_users_24h": recent_users,
-            "completion_rate": round((users_with_profiles / total_users * 100) if total_users > 0 else 0, 1),
+            **stats,
             "timestamp": datetime.now().isoformat(),
             "status": "healthy"
         }
@@ -330,9 +350,6 @@ async def get_user_stats():
             "status": "error"
         }
 
-    finally:
-        db.close()
-
 
 @app.post("/api/find-matches")
 async def find_matches(
@@ -340,165 +357,99 @@ async def find_matches(
     introduction: str = Form(...),
     expectations: str = Form(...),
     photo: UploadFile = File(None),
-    ideal_partner_photos: List[UploadFile] = File(default=[])
+    ideal_partner_photos: List[UploadFile] = File(default=[]),
+    background: bool = Form(False)
 ):
-    """Simple endpoint: upload photo + intro + expectations, get matches"""
-    from app.db.database import SessionLocal
-    from app.models.user import User, Profile, Expectation
-    from app.services.ai_matching import ai_matching_service
-    from passlib.context import CryptContext
-    import uuid
-
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    db = SessionLocal()
+    """
+    Simple endpoint: upload photo + intro + expectations, get matches
+
+    With background=true the submission is saved, matching is queued and a job
+    id is returned at once; poll /api/find-matches/jobs/{job_id} for the result.
+    """
+    from app.core.executor import db_executor, matching_executor
+    from app.services.match_requests import get_or_create_user_id, save_submission, find_matches_for_user
+    from app.services.match_jobs import match_job_queue, QueueFullError
+    from app.services.blob_store import write_blob
+    from app.services.image_ingest import InvalidImageError
+    from app.services.image_variants import schedule_variants
+    from app.services.uploads import UploadTooLargeError
+
+    # Reject before storing anything when the job queue is saturated
+    if background and await db_executor.run(match_job_queue.is_full):
+        raise HTTPException(status_code=503, detail="Matching is busy, please try again shortly")
+
+    # Photos go to the content-addressed store: a resubmitted photo is not stored again
+    blobs = []
+
+    async def write_upload(upload: UploadFile) -> str:
+        # Chunked copy, limited to settings.max_file_size
+        stored = await write_blob(upload)
+        blobs.append(stored)
+        return stored.path
 
     try:
         # Create or get user
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            # Create new user
-            user = User(
-                email=email,
-                hashed_password=pwd_context.hash(str(uuid.uuid4())),  # Random password
-                is_active=True
-            )
-            db.add(user)
-            db.flush()
+        user_id = await db_executor.run(get_or_create_user_id, email)
 
         # Handle photo upload
         photo_path = None
         if photo:
-            import os
-            # Use the configured upload directory
-            upload_base = settings.get_upload_dir()
-            profiles_dir = f"{upload_base}/profiles"
-            os.makedirs(profiles_dir, exist_ok=True)
-            photo_path = f"{profiles_dir}/{user.id}_{photo.filename}"
-            with open(photo_path, "wb") as buffer:
-                content = await photo.read()
-                buffer.write(content)
-
-        # Update or create profile
-        if hasattr(user, 'profile') and user.profile:
-            user.profile.description = introduction
-        else:
-            profile = Profile(user_id=user.id, description=introduction)
-            db.add(profile)
-            db.flush()
-
-        # Add photo to profile if uploaded
-        if photo_path and hasattr(user, 'profile') and user.profile:
-            from app.models.user import Photo
-            # Remove old photos
-            for old_photo in user.profile.photos:
-                db.delete(old_photo)
-            # Add new photo
-            new_photo = Photo(profile_id=user.profile.id, file_path=photo_path, order_index=0)
-            db.add(new_photo)
-
-        # Update or create expectations
-        if hasattr(user, 'expectations') and user.expectations:
-            user.expectations.description = expectations
-        else:
-            expectation = Expectation(user_id=user.id, description=expectations)
-            db.add(expectation)
-            db.flush()
+            photo_path = await write_upload(photo)
 
         # Handle ideal partner photos
-        if ideal_partner_photos and hasattr(user, 'expectations') and user.expectations:
-            from app.models.user import IdealPartnerPhoto
-            import os
-
-            # Create directory for ideal partner photos
-            upload_base = settings.get_upload_dir()
-            ideal_partners_dir = f"{upload_base}/ideal_partners"
-            os.makedirs(ideal_partners_dir, exist_ok=True)
-
-            # Remove old ideal partner photos
-            for old_photo in user.expectations.ideal_partner_photos:
-                db.delete(old_photo)
-
-            # Add new ideal partner photos
-            for i, photo in enumerate(ideal_partner_photos):
-                if photo.filename:  # Check if file was actually uploaded
-                    photo_path = f"{ideal_partners_dir}/{user.id}_{i}_{photo.filename}"
-                    with open(photo_path, "wb") as buffer:
-                        content = await photo.read()
-                        buffer.write(content)
-
-                    new_ideal_photo = IdealPartnerPhoto(
-                        expectation_id=user.expectations.id,
-                        file_path=photo_path,
-                        order_index=i
-                    )
-                    db.add(new_ideal_photo)
-
-        db.commit()
-
-        # Auto-save user data after successful upload
-        try:
-            print(f"📦 Auto-saving data for user: {user.email}")
-            # Create a simple backup entry
-            from datetime import datetime
-            backup_info = {
-                "user_id": user.id,
-                "email": user.email,
-                "timestamp": datetime.now().isoformat(),
-                "action": "profile_updated",
-                "has_profile": bool(user.profile),
-                "has_expectations": bool(user.expectations),
-                "photo_count": len(user.profile.photos) if user.profile else 0,
-                "ideal_photo_count": len(user.expectations.ideal_partner_photos) if user.expectations else 0
-            }
-            print(f"✅ Data saved: {backup_info}")
-        except Exception as backup_error:
-            print(f"⚠️ Backup failed: {backup_error}")
-
-        # Find matches
-        all_users = db.query(User).filter(User.id != user.id).all()
-        complete_users = [u for u in all_users if hasattr(u, 'profile') and u.profile and hasattr(u, 'expectations') and u.expectations]
+        ideal_photo_paths = None
+        if ideal_partner_photos:
+            ideal_photo_paths = []
+            for i, ideal_photo in enumerate(ideal_partner_photos):
+                if ideal_photo.filename:  # Check if file was actually uploaded
+                    ideal_photo_paths.append((i, await write_upload(ideal_photo)))
+
+        # Update profile, expectations and photos
+        await db_executor.run(save_submission, user_id, introduction, expectations, photo_path,
+                              ideal_photo_paths, blobs)
+        schedule_variants(stored.path for stored in blobs)
+
+        # Match cards show the small variant of each photo
+        card_photo_url = partial(get_photo_url, variant="small")
+        if background:
+            job_id = await db_executor.run(match_job_queue.submit, find_matches_for_user, user_id, card_photo_url)
+            return JSONResponse(status_code=202, content={
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/find-matches/jobs/{job_id}"
+            })
 
-        if not complete_users:
-            return []
+        # Find matches off the event loop (bounded by settings.matching_concurrency)
+        return await matching_executor.run(find_matches_for_user, user_id, card_photo_url)
 
-        # Get AI matches using dating_match_score function with detailed reasoning
-        matches = await ai_matching_service.find_daily_matches(
-            user, complete_users, limit=len(complete_users), include_reasoning=True
-        )
-        high_compatibility_matches = matches  # Return all matches
-
-        # Format response with photos and mismatch information
-        result = []
-        for match in high_compatibility_matches[:5]:  # Max 5 high-quality matches
-            matched_user = next(u for u in complete_users if u.id == match["user_id"])
-
-            # Get user's photo
-            photo_url = None
-            if hasattr(matched_user, 'profile') and matched_user.profile and matched_user.profile.photos:
-                photo_url = get_photo_url(matched_user.profile.photos[0].file_path)
-
-            match_result = {
-                "email": matched_user.email,
-                "introduction": matched_user.profile.description,
-                "expectations": matched_user.expectations.description,
-                "photo_url": photo_url,
-                "compatibility_score": match["compatibility_score"],
-                "is_high_match": True  # All matches are high compatibility
-            }
+    except UploadTooLargeError as e:
+        # Blobs already written for this request are collected as unreferenced
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Matching is busy, please try again shortly")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding matches: {str(e)}")
 
-            # Add mismatch information if available
-            if "mismatch_info" in match:
-                match_result["mismatch_info"] = match["mismatch_info"]
 
-            result.append(match_result)
+@app.get("/api/find-matches/jobs/{job_id}")
+async def get_match_job(job_id: str):
+    """Status of a background match job, with the matches once completed"""
+    from app.core.executor import db_executor
+    from app.services.match_jobs import match_job_queue
 
-        return result
+    # Job state is in the database, so any worker can answer
+    job = await db_executor.run(match_job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Match job not found or expired")
 
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error finding matches: {str(e)}")
-    finally:
-        db.close()
+    response = {"job_id": job_id, "status": job["status"]}
+    if job["status"] == "completed":
+        response["matches"] = job["result"]
+    elif job["status"] == "failed":
+        response["error"] = f"Error finding matches: {job['error']}"
+    return response
 
 
 @app.get("/api/debug/file-paths")
@@ -551,6 +502,10 @@ async def fix_image_paths():
         for photo in photos:
             old_path = photo.file_path
 
+            # Content-addressed blobs have no per-type folder to move to
+            if '/blobs/' in old_path:
+                continue
+
             # Extract filename
             if '/' in old_path:
                 filename = old_path.split('/')[-1]
@@ -569,6 +524,10 @@ async def fix_image_paths():
         for photo in ideal_photos:
             old_path = photo.file_path
 
+            # Content-addressed blobs have no per-type folder to move to
+            if '/blobs/' in old_path:
+                continue
+
             # Extract filename
             if '/' in old_path:
                 filename = old_path.split('/')[-1]
@@ -799,7 +758,7 @@ async def get_user_data(email: str):
         # Get user's current data
         photo_url = None
         if hasattr(user, 'profile') and user.profile and user.profile.photos:
-            photo_url = get_photo_url(user.profile.photos[0].file_path)
+            photo_url = get_photo_url(user.profile.photos[0].file_path, "small")
 
         return {
             "exists": True,
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Bring the database schema up to date (alembic upgrade head)
+Run once per deploy, before the app workers start (see deploy.sh and the
+Dockerfile), so workers never race each other on schema changes
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.migrations import upgrade_database
+
+
+def main():
+    print("🗄️ theOne - Database Migrations")
+    print("=" * 40)
+
+    try:
+        upgrade_database()
+    except Exception as e:
+        print(f"❌ Database migrations failed: {e}")
+        return 1
+
+    print("✅ Database schema is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
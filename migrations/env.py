@@ -0,0 +1,58 @@
+"""
+Alembic environment for theOne
+Uses the application's engine settings, so migrations run against the same
+database (SQLite or PostgreSQL) the app is configured for
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.config import settings
+from app.db.database import Base, build_engine
+import app.models.user  # registers the tables on Base.metadata
+
+config = context.config
+
+# Only configure logging when run from the alembic CLI, not from app startup
+if config.config_file_name is not None and not config.attributes.get("from_app"):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout instead of running it (alembic upgrade --sql)"""
+    context.configure(
+        url=config.attributes.get("database_url", settings.database_url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations on a connection from the app's engine configuration"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = build_engine(config.attributes.get("database_url", settings.database_url), pool_size=1)
+    with engine.connect() as connection:
+        _run(connection)
+    engine.dispose()
+
+
+def _run(connection):
+    # render_as_batch lets ALTER-style operations work on SQLite
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,146 @@
+"""Baseline schema: the tables as they were before the first revision
+
+Later revisions alter these tables and add new ones. Databases created by
+create_tables() (create_all) without Alembic already have some or all of
+them, so each table is only created when it is missing.
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamp(**kwargs):
+    return sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), **kwargs)
+
+
+def _updated_at():
+    return sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True)
+
+
+TABLES = {
+    "users": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("email", sa.String(), unique=True, index=True, nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        _timestamp(),
+        _updated_at(),
+    ),
+    "profiles": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True, nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("audio_clip_path", sa.String(), nullable=True),
+        _timestamp(),
+        _updated_at(),
+    ),
+    "photos": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("profile_id", sa.Integer(), sa.ForeignKey("profiles.id"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("order_index", sa.Integer(), nullable=True),
+        _timestamp(),
+    ),
+    "expectations": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True, nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        _timestamp(),
+        _updated_at(),
+    ),
+    "example_images": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("expectation_id", sa.Integer(), sa.ForeignKey("expectations.id"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        _timestamp(),
+    ),
+    "ideal_partner_photos": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("expectation_id", sa.Integer(), sa.ForeignKey("expectations.id"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("order_index", sa.Integer(), nullable=True),
+        _timestamp(),
+    ),
+    "user_token_index": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True, nullable=False),
+        sa.Column("profile_tokens", sa.Text(), nullable=True),
+        sa.Column("profile_length", sa.Integer(), nullable=True),
+        sa.Column("expectation_tokens", sa.Text(), nullable=True),
+        sa.Column("expectation_length", sa.Integer(), nullable=True),
+        _timestamp(),
+        _updated_at(),
+    ),
+    "matches": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("matched_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("compatibility_score", sa.Float(), nullable=False),
+        sa.Column("text_similarity_score", sa.Float(), nullable=False),
+        sa.Column("visual_similarity_score", sa.Float(), nullable=False),
+        sa.Column("basic_text_similarity", sa.Float(), nullable=True),
+        sa.Column("llm_text_score", sa.Float(), nullable=True),
+        sa.Column("personality_score", sa.Float(), nullable=True),
+        sa.Column("lifestyle_score", sa.Float(), nullable=True),
+        sa.Column("emotional_score", sa.Float(), nullable=True),
+        sa.Column("longterm_score", sa.Float(), nullable=True),
+        sa.Column("ideal_partner_score", sa.Float(), nullable=True),
+        sa.Column("expectation_visual_score", sa.Float(), nullable=True),
+        sa.Column("is_viewed", sa.Boolean(), nullable=True),
+        _timestamp(),
+    ),
+    "pair_score_cache": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_low_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, index=True),
+        sa.Column("user_high_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, index=True),
+        sa.Column("low_profile_version", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("low_expectation_version", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("high_profile_version", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("high_expectation_version", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("compatibility_score", sa.Float(), nullable=False),
+        sa.Column("text_score_a_to_b", sa.Float(), nullable=False),
+        sa.Column("text_score_b_to_a", sa.Float(), nullable=False),
+        sa.Column("image_score_a_to_b", sa.Float(), nullable=False),
+        sa.Column("image_score_b_to_a", sa.Float(), nullable=False),
+        sa.Column("details", sa.Text(), nullable=True),
+        _timestamp(),
+        sa.UniqueConstraint("user_low_id", "user_high_id", name="uq_pair_score_cache_pair"),
+    ),
+    "match_generation_runs": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("run_date", sa.Date(), unique=True, nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("last_user_id", sa.Integer(), nullable=False),
+        sa.Column("users_processed", sa.Integer(), nullable=False),
+        sa.Column("matches_created", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    ),
+    "candidate_changes": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, index=True),
+        _timestamp(),
+    ),
+}
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, columns in TABLES.items():
+        if name not in existing:
+            op.create_table(name, *columns())
+
+
+def downgrade():
+    for name in reversed(list(TABLES)):
+        op.drop_table(name)
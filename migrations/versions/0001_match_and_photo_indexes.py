@@ -0,0 +1,46 @@
+"""Indexes for hot match/photo queries and a unique match pair
+
+Databases created by create_tables() (create_all) already have these
+indexes, so every step is idempotent.
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # (name, table, columns, unique)
+    ("uq_matches_user_pair", "matches", ["user_id", "matched_user_id"], True),
+    ("ix_matches_user_score", "matches", ["user_id", "compatibility_score"], False),
+    ("ix_matches_user_created", "matches", ["user_id", "created_at"], False),
+    ("ix_matches_matched_user_id", "matches", ["matched_user_id"], False),
+    ("ix_photos_profile_first", "photos", ["profile_id", "id", "file_path"], False),
+    ("ix_ideal_partner_photos_expectation_first", "ideal_partner_photos", ["expectation_id", "id", "file_path"], False),
+    ("ix_example_images_expectation_id", "example_images", ["expectation_id"], False),
+]
+
+
+def upgrade():
+    # Older code could store the same pair twice; keep the first row of each pair
+    op.execute(sa.text(
+        "DELETE FROM matches WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM matches GROUP BY user_id, matched_user_id) AS first_rows"
+        ")"
+    ))
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,22 @@
+"""Index users.created_at for the /api/stats recent signups count
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_users_created_at", "users", ["created_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_users_created_at", table_name="users", if_exists=True)
@@ -0,0 +1,46 @@
+"""Store description hashes instead of lengths in user_token_index
+
+A word set is only used while the SHA-1 of the description matches; rows
+indexed before this revision have no hash and are re-indexed by
+backfill_token_index on startup. Steps are idempotent, since databases
+created by create_tables() (create_all) already have the new columns.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("user_token_index")}
+
+
+def upgrade():
+    columns = _columns()
+    with op.batch_alter_table("user_token_index") as batch:
+        for name in ("profile_hash", "expectation_hash"):
+            if name not in columns:
+                batch.add_column(sa.Column(name, sa.String(40), nullable=True))
+        for name in ("profile_length", "expectation_length"):
+            if name in columns:
+                batch.drop_column(name)
+
+
+def downgrade():
+    columns = _columns()
+    with op.batch_alter_table("user_token_index") as batch:
+        for name in ("profile_length", "expectation_length"):
+            if name not in columns:
+                batch.add_column(sa.Column(name, sa.Integer(), nullable=True))
+        for name in ("profile_hash", "expectation_hash"):
+            if name in columns:
+                batch.drop_column(name)
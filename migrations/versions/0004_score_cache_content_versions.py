@@ -0,0 +1,40 @@
+"""Version cached pair scores by description hash instead of updated_at
+
+updated_at has one-second resolution, so two edits within a second looked
+unchanged. The cache is rebuilt on demand, so existing rows are dropped
+rather than converted. Idempotent, like the other revisions.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+VERSION_COLUMNS = ("low_profile_version", "low_expectation_version", "high_profile_version", "high_expectation_version")
+
+
+def _convert(column_type):
+    columns = {column["name"]: column["type"] for column in sa.inspect(op.get_bind()).get_columns("pair_score_cache")}
+    if all(isinstance(columns[name], type(column_type)) for name in VERSION_COLUMNS):
+        return
+
+    op.execute(sa.text("DELETE FROM pair_score_cache"))
+    with op.batch_alter_table("pair_score_cache") as batch:
+        for name in VERSION_COLUMNS:
+            batch.alter_column(name, type_=column_type, existing_nullable=True)
+
+
+def upgrade():
+    _convert(sa.String(40))
+
+
+def downgrade():
+    _convert(sa.DateTime(timezone=True))
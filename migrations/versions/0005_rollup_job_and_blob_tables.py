@@ -0,0 +1,63 @@
+"""Tables for the match stats rollup, site counters, photo blobs and match jobs
+
+Databases created by create_tables() may already have them, so each table
+is only created when it is missing.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "user_match_stats": lambda: (
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), unique=True, nullable=False),
+        sa.Column("total_matches", sa.Integer(), nullable=False),
+        sa.Column("viewed_matches", sa.Integer(), nullable=False),
+        sa.Column("compatibility_score_sum", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    ),
+    "site_counters": lambda: (
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    ),
+    "blobs": lambda: (
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("file_path", sa.String(), unique=True, nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False, index=True),
+    ),
+    "match_jobs": lambda: (
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False, index=True),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True, index=True),
+    ),
+}
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, columns in TABLES.items():
+        if name not in existing:
+            op.create_table(name, *columns())
+
+
+def downgrade():
+    for name in reversed(list(TABLES)):
+        op.drop_table(name)
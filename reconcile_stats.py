@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Reconcile the /api/stats counters and the per-user match statistics rollup
+with the tables they count
+Run from cron (e.g. hourly `python3 reconcile_stats.py`); prints any drift
+found and corrects it. Exits with status 1 when drift was found, so cron
+mail or monitoring can pick it up, and 2 when the schema needs migrating
+"""
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.migrations import require_current_schema
+from app.services.match_stats import reconcile_match_stats
+from app.services.site_counters import reconcile_site_counters
+
+
+def main():
+    """Recount every counter and report drift"""
+    print("📊 theOne - Stats Counter Reconciliation")
+    print("=" * 40)
+
+    if not require_current_schema():
+        return 2
+    db = SessionLocal()
+    try:
+        drift = reconcile_site_counters(db)
+        db.commit()
+        match_drift = reconcile_match_stats(db) if settings.match_stats_rollup else {}
+        db.commit()
+    finally:
+        db.close()
+
+    if not drift and not match_drift:
+        print("✅ All counters match")
+        return 0
+
+    for name, (stored, actual) in drift.items():
+        stored_text = "missing" if stored is None else stored
+        print(f"⚠️ {name}: stored {stored_text}, actual {actual} (corrected)")
+    for user_id, (stored, actual) in match_drift.items():
+        print(f"⚠️ match stats of user {user_id}: stored {stored}, actual {actual} (corrected)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
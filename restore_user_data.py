@@ -130,6 +130,15 @@ def restore_files(backup_dir):
                     shutil.copy2(source_file, target_file)
                     copied_count += 1
     
+    # Content-addressed photos (blobs/<xx>/<sha256>.<ext>)
+    source_blobs = os.path.join(backup_dir, 'blobs')
+    for source_root, _, filenames in os.walk(source_blobs):
+        target_root = os.path.join(target_dir, os.path.relpath(source_root, backup_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in filenames:
+            shutil.copy2(os.path.join(source_root, filename), os.path.join(target_root, filename))
+            copied_count += 1
+    
     print(f"✅ Restored {copied_count} files to {target_dir}")
 
 if __name__ == "__main__":
@@ -34,6 +34,7 @@ def start_backend():
     """Start the FastAPI backend"""
     print("Starting FastAPI backend...")
     try:
+        subprocess.check_call([sys.executable, "migrate.py"])
         subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--reload", "--host", "0.0.0.0", "--port", "8000"])
         print("✅ Backend started at http://localhost:8000")
         return True
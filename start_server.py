@@ -50,7 +50,8 @@ def main():
     open_browser_delayed(docs_url, delay=3)
     
     try:
-        # Start the server
+        # Bring the database schema up to date, then start the server
+        subprocess.run([sys.executable, "migrate.py"], check=True)
         subprocess.run([
             sys.executable, "-m", "uvicorn",
             "main:app",
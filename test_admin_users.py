@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test the paginated admin user listing
+"""
+import sys
+import os
+import json
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto
+from app.services import admin_users
+from app.services.admin_users import count_admin_users, load_admin_page, page_url, stream_users_json
+
+
+def make_session_factory(users=23):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    for i in range(users):
+        user = User(email=f"admin{i}@example.com", hashed_password="x")
+        if i % 3 != 0:
+            user.profile = Profile(description=("profile text " * 20) if i % 2 else "short profile",
+                                   photos=[Photo(file_path=f"static/uploads/{i}_{n}.jpg") for n in range(i % 4)])
+        if i % 5 != 0:
+            user.expectations = Expectation(
+                description="expectations",
+                ideal_partner_photos=[IdealPartnerPhoto(file_path=f"static/uploads/ideal_{i}.jpg")] if i % 2 else []
+            )
+        db.add(user)
+    db.commit()
+    db.close()
+    return factory
+
+
+def python_rows(db):
+    """Dashboard rows as the endpoint used to build them, newest first"""
+    rows = []
+    for user in db.query(User).all():
+        profile_desc = user.profile.description if user.profile else ""
+        photo_count = len(user.profile.photos) if user.profile else 0
+        expectations_desc = user.expectations.description if user.expectations else ""
+        ideal = [f"/{photo.file_path}" for photo in user.expectations.ideal_partner_photos] if user.expectations else []
+        rows.append({
+            'id': user.id,
+            'profile_preview': profile_desc[:100],
+            'photo_urls': [f"/{photo.file_path}" for photo in user.profile.photos] if user.profile else [],
+            'ideal_partner_photos': ideal,
+            'is_complete': bool(profile_desc) and bool(expectations_desc) and photo_count > 0,
+        })
+    return sorted(rows, key=lambda row: row['id'], reverse=True)
+
+
+def comparable(row):
+    return {
+        'id': row['id'],
+        'profile_preview': row['profile_description'][:100],
+        'photo_urls': row['photo_urls'],
+        'ideal_partner_photos': row['ideal_partner_photos'],
+        'is_complete': row['is_complete'],
+    }
+
+
+def all_pages(db, limit, **filters):
+    rows, before_id, pages = [], None, 0
+    while True:
+        page, before_id = load_admin_page(db, before_id, limit, **filters)
+        rows.extend(page)
+        pages += 1
+        if before_id is None:
+            return rows, pages
+
+
+def test_pages_match_full_listing():
+    """Walking the pages gives every user once, newest first, as the old listing did"""
+    db = make_session_factory()()
+    rows, pages = all_pages(db, 5)
+    assert pages == 5
+    assert [comparable(row) for row in rows] == python_rows(db)
+    # Only a preview of long descriptions is read (one character more marks the cut)
+    assert max(len(row['profile_description']) for row in rows) == 101
+
+
+def test_filters_run_in_sql():
+    """complete/incomplete and photo filters agree with the per-row flags"""
+    db = make_session_factory()()
+    everyone = python_rows(db)
+
+    complete, _ = all_pages(db, 4, status="complete")
+    incomplete, _ = all_pages(db, 4, status="incomplete")
+    assert [row['id'] for row in complete] == [row['id'] for row in everyone if row['is_complete']]
+    assert [row['id'] for row in incomplete] == [row['id'] for row in everyone if not row['is_complete']]
+
+    with_photos, _ = all_pages(db, 4, has_photos=True)
+    without_photos, _ = all_pages(db, 4, has_photos=False)
+    assert all(row['photo_count'] > 0 for row in with_photos)
+    assert all(row['photo_count'] == 0 for row in without_photos)
+    assert len(with_photos) + len(without_photos) == len(everyone)
+
+    assert count_admin_users(db) == (len(everyone), len(complete))
+    assert count_admin_users(db, status="complete") == (len(complete), len(complete))
+
+
+def test_page_query_count_is_constant():
+    """A page costs three queries whatever its size"""
+    factory = make_session_factory(users=60)
+    db = factory()
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    for limit in (5, 50):
+        statements.clear()
+        load_admin_page(db, None, limit)
+        assert len(statements) == 3, statements
+
+
+def test_streamed_json():
+    """The JSON stream holds the same rows as the pages and a continuation id"""
+    factory = make_session_factory()
+    original_batch = admin_users.STREAM_BATCH_SIZE
+    admin_users.STREAM_BATCH_SIZE = 4
+    try:
+        body = json.loads("".join(stream_users_json(factory, limit=10)))
+        rest = json.loads("".join(stream_users_json(factory, before_id=body["next_before"], limit=100)))
+    finally:
+        admin_users.STREAM_BATCH_SIZE = original_batch
+
+    db = factory()
+    expected, _ = all_pages(db, 7)
+    assert len(body["users"]) == 10
+    assert body["users"] + rest["users"] == expected
+    assert rest["next_before"] is None
+
+
+def test_page_urls():
+    """Default parameters are left out of dashboard links"""
+    assert page_url("/admin") == "/admin"
+    assert page_url("/admin", 41, 50, "complete", False) == "/admin?before=41&status=complete&has_photos=false"
+    assert page_url("/admin", limit=10, has_photos=True) == "/admin?limit=10&has_photos=true"
+
+
+if __name__ == "__main__":
+    test_pages_match_full_listing()
+    test_filters_run_in_sql()
+    test_page_query_count_is_constant()
+    test_streamed_json()
+    test_page_urls()
+    print("✅ Admin user listing tests passed")
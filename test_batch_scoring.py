@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test that the NumPy batch scorer matches dating_match_score exactly
+"""
+import asyncio
+import random
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation
+from app.services.ai_matching import dating_match_score, ai_matching_service
+from app.services.batch_scoring import CandidatePool
+
+WORDS = [
+    "kind", "funny", "intelligent", "adventurous", "travel", "music", "hiking",
+    "reading", "cooking", "art", "and", "the", "someone", "who", "loves", "Hiking",
+    "MUSIC", "gaming", "calm", "creative", "dancing", "sports", "movies",
+]
+
+
+def random_person(rng):
+    """Random profile; occasionally long enough to saturate the text score"""
+    size = rng.choice([0, 1, 3, 8, 25, 60])
+    return {
+        'profile_text': " ".join(rng.choice(WORDS) + str(rng.randint(0, 3)) * rng.randint(0, 1) for _ in range(size)),
+        'expectation_text': " ".join(rng.choice(WORDS) for _ in range(rng.choice([0, 2, 10, 40]))),
+        'self_image_url': rng.choice([None, "", "http://localhost:8000/uploads/profiles/x.jpg"]),
+        'ideal_partner_image_url': rng.choice([None, "http://localhost:8000/uploads/ideal_partners/y.jpg"]),
+    }
+
+
+def test_batch_scores_match_pairwise():
+    """Every batch score equals the per-pair score, in both directions"""
+    rng = random.Random(42)
+    people = [random_person(rng) for _ in range(300)]
+    pool = CandidatePool(people)
+
+    for person_a in people[:40]:
+        expected = [dating_match_score(person_a, person_b) for person_b in people]
+        assert pool.score(person_a) == expected
+
+
+def test_batch_components_match_details():
+    """Directional components equal the per-pair details"""
+    rng = random.Random(7)
+    people = [random_person(rng) for _ in range(50)]
+    pool = CandidatePool(people)
+
+    person_a = people[0]
+    parts = pool.components(person_a)
+    for row, person_b in enumerate(people):
+        _, details = dating_match_score(person_a, person_b, return_details=True)
+        for key in ("text_score_a_to_b", "text_score_b_to_a", "image_score_a_to_b", "image_score_b_to_a"):
+            assert parts[key][row] == details[key]
+
+
+def test_empty_pool():
+    """Scoring against no candidates returns no scores"""
+    pool = CandidatePool([])
+    assert pool.score(random_person(random.Random(1))) == []
+
+
+def test_find_daily_matches_keeps_top_k():
+    """Top-k selection returns the same head as a full stable sort of pairwise scores"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = random.Random(3)
+    users = []
+    for i in range(60):
+        person = random_person(rng)
+        user = User(email=f"user{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Profile(user_id=user.id, description=person['profile_text']))
+        db.add(Expectation(user_id=user.id, description=person['expectation_text']))
+        users.append(user)
+    db.commit()
+
+    user, candidates = users[0], users[1:]
+    person_a = ai_matching_service.build_person(user)
+    expected = sorted(
+        ((c.id, dating_match_score(person_a, ai_matching_service.build_person(c))) for c in candidates),
+        key=lambda item: item[1], reverse=True
+    )[:5]
+
+    matches = asyncio.run(ai_matching_service.find_daily_matches(user, candidates, limit=5, include_reasoning=True))
+
+    assert [(m["user_id"], m["compatibility_score"]) for m in matches] == expected
+    assert all("mismatch_info" in m and "details" in m for m in matches)
+
+
+if __name__ == "__main__":
+    test_batch_scores_match_pairwise()
+    test_batch_components_match_details()
+    test_empty_pool()
+    test_find_daily_matches_keeps_top_k()
+    print("✅ Batch scoring tests passed")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed photo store: deduplication, reference counts and
+garbage collection
+"""
+import sys
+import os
+import asyncio
+import hashlib
+import io
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import UploadFile
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto, Blob
+from app.services.blob_store import blob_root, collect_garbage, register_blob, write_blob
+
+
+@contextmanager
+def upload_dir():
+    previous = os.environ.get("UPLOADS_PATH")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["UPLOADS_PATH"] = directory
+        try:
+            yield directory
+        finally:
+            if previous is None:
+                del os.environ["UPLOADS_PATH"]
+            else:
+                os.environ["UPLOADS_PATH"] = previous
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="blobs@example.com", hashed_password="x")
+    user.profile = Profile(description="profile")
+    user.expectations = Expectation(description="expectations")
+    db.add(user)
+    db.commit()
+    return db, user
+
+
+def photo(color):
+    """Small clean PNG bytes, stored as they are"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def store(data, filename="photo.PNG"):
+    return asyncio.run(write_blob(UploadFile(file=io.BytesIO(data), filename=filename)))
+
+
+def stored_files():
+    return sorted(
+        os.path.relpath(os.path.join(root, name), blob_root())
+        for root, _, names in os.walk(blob_root()) for name in names
+    )
+
+
+def ref_count(db, path):
+    db.expire_all()
+    return db.query(Blob.ref_count).filter(Blob.file_path == path).scalar()
+
+
+def test_identical_uploads_are_stored_once():
+    """The same bytes under any name land in one file named by their hash"""
+    with upload_dir():
+        data = photo("red")
+        sha = hashlib.sha256(data).hexdigest()
+
+        first = store(data, "a.PNG")
+        second = store(data, "b.png")
+        other = store(photo("blue"), "c.png")
+
+        assert first.path == second.path == os.path.join(blob_root(), sha[:2], f"{sha}.png")
+        assert first.sha256 == sha and first.size == len(data)
+        assert other.path != first.path
+        assert stored_files() == sorted([f"{sha[:2]}/{sha}.png", os.path.relpath(other.path, blob_root())])
+
+
+def test_store_does_not_block_the_event_loop():
+    """Listing, renaming and removing files in the store happen on executor threads"""
+    calls = []
+    originals = {name: getattr(os, name) for name in ("listdir", "replace", "remove")}
+
+    def recording(name):
+        def call(*args, **kwargs):
+            calls.append((name, threading.current_thread() is threading.main_thread()))
+            return originals[name](*args, **kwargs)
+        return call
+
+    with upload_dir():
+        for name in originals:
+            setattr(os, name, recording(name))
+        try:
+            first = store(photo("red"))
+            assert store(photo("red")).path == first.path
+        finally:
+            for name, original in originals.items():
+                setattr(os, name, original)
+
+    assert {"listdir", "replace", "remove"} <= {name for name, _ in calls}
+    assert not [name for name, on_loop in calls if on_loop]
+
+
+def test_reference_counts_follow_rows():
+    """Inserts, deletes (including orphan removal) and path changes adjust ref_count"""
+    with upload_dir():
+        db, user = make_db()
+        shared = store(photo("red"))
+        single = store(photo("blue"))
+        path = register_blob(db, shared)
+        assert register_blob(db, store(photo("red"))) == path
+        single_path = register_blob(db, single)
+
+        user.profile.photos.append(Photo(file_path=path))
+        user.expectations.ideal_partner_photos.append(IdealPartnerPhoto(file_path=path))
+        db.commit()
+        assert ref_count(db, path) == 2
+        assert db.query(Blob).count() == 2
+
+        user.profile.photos.pop()
+        db.commit()
+        assert ref_count(db, path) == 1
+
+        user.expectations.ideal_partner_photos[0].file_path = single_path
+        db.commit()
+        assert (ref_count(db, path), ref_count(db, single_path)) == (0, 1)
+
+        db.delete(user.expectations.ideal_partner_photos[0])
+        user.profile.photos.append(Photo(file_path="static/uploads/profiles/legacy.jpg"))
+        db.commit()
+        assert ref_count(db, single_path) == 0
+
+
+def test_garbage_collection():
+    """Only blobs unreferenced for longer than the grace period are deleted"""
+    with upload_dir():
+        db, user = make_db()
+        kept = register_blob(db, store(photo("red")))
+        orphan = register_blob(db, store(photo("blue")))
+        recent_orphan = register_blob(db, store(photo("green")))
+        user.profile.photos.append(Photo(file_path=kept))
+        db.commit()
+
+        # An upload whose request failed before its rows were written, and a restored photo without a row
+        never_registered = store(photo("white")).path
+        restored = register_blob(db, store(photo("black")))
+        user.expectations.ideal_partner_photos.append(IdealPartnerPhoto(file_path=restored))
+        db.commit()
+        db.query(Blob).filter(Blob.file_path == restored).delete()
+        db.commit()
+
+        two_hours_ago = datetime.utcnow() - timedelta(hours=2)
+        db.query(Blob).filter(Blob.file_path != recent_orphan).update({Blob.last_used_at: two_hours_ago})
+        db.commit()
+        old = two_hours_ago.timestamp()
+        for path in (kept, orphan, never_registered, restored):
+            os.utime(path, (old, old))
+
+        result = collect_garbage(db)
+        assert (result.registered, result.removed) == (1, 2)
+        assert result.freed == len(photo("blue")) + len(photo("white"))
+        for path in (kept, recent_orphan, restored):
+            assert os.path.exists(path)
+        for path in (orphan, never_registered):
+            assert not os.path.exists(path)
+        assert ref_count(db, restored) == 1
+        assert db.query(Blob).count() == 3
+
+        # A removed photo's blob is collected once the grace period has passed
+        user.profile.photos.pop()
+        db.commit()
+        result = collect_garbage(db, now=datetime.utcnow() + timedelta(hours=2))
+        assert result.removed == 2 and not os.path.exists(kept) and not os.path.exists(recent_orphan)
+
+
+if __name__ == "__main__":
+    test_identical_uploads_are_stored_once()
+    test_store_does_not_block_the_event_loop()
+    test_reference_counts_follow_rows()
+    test_garbage_collection()
+    print("✅ Blob store tests passed")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test inverted-index candidate retrieval
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.candidate_index import InvertedTokenIndex
+from app.services.token_index import tokenize
+
+
+def test_candidates_share_a_meaningful_word():
+    """Only users whose words cross-match (ignoring stop words) are retrieved"""
+    index = InvertedTokenIndex()
+    index.update_profile(1, tokenize("I love hiking and music"))
+    index.update_expectation(1, tokenize("someone who is kind"))
+    index.update_profile(2, tokenize("I am a chef and I love cooking"))
+    index.update_expectation(2, tokenize("a partner who enjoys travel"))
+    index.update_profile(3, tokenize("and the of a"))
+    index.update_expectation(3, tokenize("who is a"))
+
+    # Wants hiking -> user 1 profile; profile mentions travel -> user 2 expectations
+    candidates = index.candidates_for(tokenize("I like travel"), tokenize("Looking for hiking"))
+    assert candidates == {1, 2}
+
+    # Stop words alone never retrieve anyone
+    assert index.candidates_for(tokenize("the and a"), tokenize("who is")) == set()
+
+
+def test_updates_replace_old_postings():
+    """Editing a description removes the old words from the index"""
+    index = InvertedTokenIndex()
+    index.update_profile(1, tokenize("hiking"))
+    index.update_profile(1, tokenize("painting"))
+
+    assert index.candidates_for(set(), {"hiking"}) == set()
+    assert index.candidates_for(set(), {"painting"}) == {1}
+
+    index.remove_user(1)
+    assert index.candidates_for(set(), {"painting"}) == set()
+
+
+if __name__ == "__main__":
+    test_candidates_share_a_meaningful_word()
+    test_updates_replace_old_postings()
+    print("✅ Candidate index tests passed")
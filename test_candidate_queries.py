@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test eager candidate loading for the matchers
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, Photo, IdealPartnerPhoto
+from app.services.ai_matching import ai_matching_service
+from app.services.candidate_queries import load_candidates, load_candidate_snapshots
+from app.services.score_cache import user_versions
+from app.services.token_index import index_profile, index_expectation
+
+
+def make_db(n_users):
+    """In-memory database with complete users (with photos) and a few incomplete ones"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    for i in range(n_users):
+        user = User(email=f"cand{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        if i % 5 == 4:
+            # Profile only: not a candidate
+            db.add(Profile(user_id=user.id, description="half finished"))
+            continue
+        profile = Profile(user_id=user.id, description=f"I like hiking and music number {i}")
+        expectation = Expectation(user_id=user.id, description="someone kind who likes music")
+        db.add_all([profile, expectation])
+        db.flush()
+        db.add(Photo(profile_id=profile.id, file_path=f"static/uploads/profiles/{i}.jpg"))
+        db.add(IdealPartnerPhoto(expectation_id=expectation.id, file_path=f"static/uploads/ideal/{i}.jpg"))
+        index_profile(db, user.id, profile.description)
+        index_expectation(db, user.id, expectation.description)
+    db.commit()
+    db.expunge_all()
+    return db, engine
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_candidates_are_complete_and_exclude_user():
+    """Only users with profile and expectations are returned, without the requester"""
+    db, _ = make_db(20)
+    candidates = load_candidates(db, exclude_user_id=1)
+
+    assert [u.id for u in candidates] == [i + 1 for i in range(1, 20) if i % 5 != 4]
+    assert all(u.profile and u.expectations for u in candidates)
+
+
+def test_query_count_does_not_grow_with_candidates():
+    """Loading and preparing candidates takes the same few queries for 10 or 100 users"""
+    counts = []
+    for n_users in (10, 100):
+        db, engine = make_db(n_users)
+        statements = count_statements(engine)
+
+        candidates = load_candidates(db)
+        for user in candidates:
+            person = ai_matching_service.build_person(user)
+            assert person['self_image_url'] and person['ideal_partner_image_url']
+            user_versions(user)
+            user.email
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 3
+
+
+def test_snapshots_match_orm_candidates():
+    """Snapshots give the same scoring inputs, versions and matches as ORM users"""
+    db, engine = make_db(30)
+    # Edited outside the indexed write paths: the stored word set must be ignored
+    db.query(Profile).filter(Profile.user_id == 2).update({Profile.description: "brand new text"})
+    db.add(Photo(profile_id=db.query(Profile.id).filter(Profile.user_id == 3).scalar(), file_path="second.jpg"))
+    db.commit()
+
+    statements = count_statements(engine)
+    snapshots = load_candidate_snapshots(db)
+    assert len(statements) == 1
+
+    users = load_candidates(db)
+    assert [s.id for s in snapshots] == [u.id for u in users]
+    for snapshot, user in zip(snapshots, users):
+        assert ai_matching_service.build_person(snapshot) == ai_matching_service.build_person(user)
+        assert user_versions(snapshot) == user_versions(user)
+        assert snapshot.email == user.email
+
+    requester = users[0]
+    from_users = ai_matching_service.match_candidates(requester, users, limit=5)
+    from_snapshots = ai_matching_service.match_candidates(requester, snapshots, limit=5)
+    assert from_users == from_snapshots
+
+    # Scores stored from snapshots are valid cache hits for ORM users and vice versa
+    assert ai_matching_service.match_candidates(requester, snapshots, limit=5, db=db) == from_users
+    assert ai_matching_service.match_candidates(requester, users, limit=5, db=db) == from_users
+    assert requester.id not in [match["user_id"] for match in from_snapshots]
+
+
+if __name__ == "__main__":
+    test_candidates_are_complete_and_exclude_user()
+    test_query_count_does_not_grow_with_candidates()
+    test_snapshots_match_orm_candidates()
+    print("✅ Candidate query tests passed")
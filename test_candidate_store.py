@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory candidate pool and its change-log refresh
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.models.user import CandidateChange, Profile, Expectation
+from app.services.ai_matching import ai_matching_service
+from app.services.batch_scoring import CandidatePool
+from app.services.candidate_index import candidate_index
+from app.services.candidate_queries import load_candidate_snapshots, load_candidates
+from app.services.candidate_store import CandidateStore, prune_candidate_changes, record_user_change, latest_version
+from app.core import startup
+from app.db import database
+from app.services import candidate_store as candidate_store_module
+from app.services.token_index import index_profile
+from test_candidate_queries import make_db, count_statements
+
+
+def test_load_matches_database():
+    """A loaded pool returns the same candidates, in the same order, as the query"""
+    db, _ = make_db(20)
+    store = CandidateStore()
+    store.load(db)
+
+    assert store.is_loaded
+    assert store.candidates() == load_candidate_snapshots(db)
+    assert store.candidates(exclude_user_id=2) == load_candidate_snapshots(db, exclude_user_id=2)
+
+
+def test_workers_reload_only_changed_users():
+    """A second worker picks up another worker's writes through the version counter"""
+    db, engine = make_db(20)
+    writer, reader = CandidateStore(), CandidateStore()
+    writer.load(db)
+    reader.load(db)
+    assert reader.version == latest_version(db) == 0
+
+    # Worker 1 edits a profile and completes a half-finished user
+    profile = db.query(Profile).filter(Profile.user_id == 1).first()
+    profile.description = "I only talk about chess"
+    index_profile(db, 1, profile.description)
+    record_user_change(db, 1)
+    db.add(Expectation(user_id=5, description="anyone who plays chess"))
+    record_user_change(db, 5)
+    db.commit()
+
+    statements = count_statements(engine)
+    assert reader.refresh(db) == 2
+    # Version check, change log read and one reload of just the changed users
+    assert len(statements) == 3
+    assert reader.version == latest_version(db) == 2
+
+    assert reader.candidates() == load_candidate_snapshots(db)
+    assert 5 in [snapshot.id for snapshot in reader.candidates()]
+
+    # Already current: a single version check, nothing reloaded
+    del statements[:]
+    assert reader.refresh(db) == 0
+    assert len(statements) == 1
+
+
+def test_users_that_become_incomplete_are_dropped():
+    """A changed user missing from the reload leaves the pool"""
+    db, _ = make_db(10)
+    store = CandidateStore()
+    store.load(db)
+
+    db.query(Expectation).filter(Expectation.user_id == 3).delete()
+    record_user_change(db, 3)
+    db.commit()
+
+    store.refresh(db)
+    assert 3 not in [snapshot.id for snapshot in store.candidates()]
+    assert store.candidates() == load_candidate_snapshots(db)
+
+
+def test_pruned_log_forces_a_full_reload():
+    """Old change rows are pruned (never the latest); a worker behind the pruned rows reloads everything"""
+    db, _ = make_db(10)
+    current, behind = CandidateStore(), CandidateStore()
+    behind.load(db)
+
+    for user_id in (1, 2, 3):
+        profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+        profile.description = f"new text {user_id}"
+        index_profile(db, user_id, profile.description)
+        record_user_change(db, user_id)
+        db.commit()
+    current.load(db)
+
+    # Nothing is old enough yet, and the latest row survives any cutoff
+    assert prune_candidate_changes(db, timedelta(days=7)) == 0
+    assert prune_candidate_changes(db, timedelta(0), now=datetime.utcnow() + timedelta(days=1)) == 2
+    db.commit()
+    assert db.query(CandidateChange).count() == 1
+    assert latest_version(db) == 3
+
+    # The current worker sees nothing new; the one still at version 0 missed pruned changes
+    assert current.refresh(db) == 0
+    assert behind.refresh(db) == len(load_candidate_snapshots(db))
+    assert behind.version == 3
+    assert behind.candidates() == load_candidate_snapshots(db)
+
+
+def test_postings_follow_committed_changes_only():
+    """Indexing a profile leaves the in-memory postings alone until the change commits and is refreshed"""
+    db, _ = make_db(10)
+    store = CandidateStore()
+    store.load(db)
+
+    profile = db.query(Profile).filter(Profile.user_id == 1).first()
+    profile.description = "xylophone collector"
+    index_profile(db, 1, profile.description)
+    record_user_change(db, 1)
+    assert 1 not in candidate_index.candidates_for(set(), {"xylophone"})
+
+    db.rollback()
+    store.refresh(db)
+    assert 1 not in candidate_index.candidates_for(set(), {"xylophone"})
+
+    profile = db.query(Profile).filter(Profile.user_id == 1).first()
+    profile.description = "xylophone collector"
+    index_profile(db, 1, profile.description)
+    record_user_change(db, 1)
+    db.commit()
+    store.refresh(db)
+    assert 1 in candidate_index.candidates_for(set(), {"xylophone"})
+
+
+def test_word_sets_come_from_pooled_snapshots():
+    """ORM users reuse the pooled word sets until their descriptions change"""
+    db, _ = make_db(10)
+    store = CandidateStore()
+    store.load(db)
+    user = load_candidates(db)[0]
+    snapshot = store.candidates()[0]
+
+    profile_tokens, expectation_tokens = store.word_sets(user)
+    assert profile_tokens is snapshot.profile_tokens
+    assert expectation_tokens is snapshot.expectation_tokens
+
+    user.profile.description = "Edited but not yet refreshed"
+    profile_tokens, expectation_tokens = store.word_sets(user)
+    assert profile_tokens == {"edited", "but", "not", "yet", "refreshed"}
+    assert expectation_tokens is snapshot.expectation_tokens
+
+
+def built_pool_scores(snapshots, person):
+    return CandidatePool([ai_matching_service.build_person(snapshot) for snapshot in snapshots]).score_with_components(person)
+
+
+def test_encoded_pool_slices_match_built_pools():
+    """Slices of the encoded pool score exactly like pools built from the candidates"""
+    db, _ = make_db(20)
+    store = CandidateStore()
+    store.load(db)
+    person = ai_matching_service.build_person(store.candidates()[0])
+
+    subset = store.candidates()[3:12:2]
+    pool = store.encoded_pool(subset)
+    assert pool.ids == [snapshot.id for snapshot in subset]
+    assert pool.score_with_components(person) == built_pool_scores(subset, person)
+
+    # After a refresh only the changed user is re-encoded; stale snapshots are refused
+    stale = store.candidates()
+    profile = db.query(Profile).filter(Profile.user_id == 2).first()
+    profile.description = "chess chess and more chess, also music"
+    index_profile(db, 2, profile.description)
+    record_user_change(db, 2)
+    db.commit()
+    store.refresh(db)
+    assert store.encoded_pool(stale) is None
+    current = store.candidates()
+    assert store.encoded_pool(current).score_with_components(person) == built_pool_scores(current, person)
+
+    # ORM users are not in the store
+    assert store.encoded_pool(load_candidates(db)[:3]) is None
+
+
+def test_failed_store_load_leaves_index_unloaded():
+    """Without a loaded store nothing keeps the postings current, so shortlists must fall back"""
+    db, _ = make_db(5)
+    store = candidate_store_module.candidate_store
+
+    def failing_load(session):
+        raise RuntimeError("database went away")
+
+    # Postings left over from an earlier load are dropped too
+    candidate_index.update_profile(1, ["music"])
+    candidate_index.is_loaded = True
+    original_session_local, original_load = database.SessionLocal, store.load
+    database.SessionLocal, store.load = (lambda: db), failing_load
+    try:
+        startup.load_candidates()
+    finally:
+        database.SessionLocal, store.load = original_session_local, original_load
+
+    assert not candidate_index.is_loaded
+    assert candidate_index.shortlist(["music"], ["music"], {1, 2, 3}, 1) is None
+    assert candidate_index.candidates_for(["music"], ["music"]) == set()
+
+
+if __name__ == "__main__":
+    test_load_matches_database()
+    test_workers_reload_only_changed_users()
+    test_users_that_become_incomplete_are_dropped()
+    test_pruned_log_forces_a_full_reload()
+    test_postings_follow_committed_changes_only()
+    test_word_sets_come_from_pooled_snapshots()
+    test_encoded_pool_slices_match_built_pools()
+    test_failed_store_load_leaves_index_unloaded()
+    print("✅ Candidate store tests passed")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite performance profile and read-only engine
+"""
+import sys
+import os
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db.database import Base, build_engine
+import app.models.user  # registers the tables on Base.metadata
+
+
+def make_engines(directory):
+    url = f"sqlite:///{directory}/profile_test.db"
+    write_engine = build_engine(url, pool_size=2)
+    read_engine = build_engine(url, pool_size=2, read_only=True)
+    Base.metadata.create_all(bind=write_engine)
+    return write_engine, read_engine
+
+
+def pragma(connection, name):
+    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_performance_pragmas_on_every_connection():
+    """WAL, synchronous, mmap, cache and busy timeout follow the settings"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_engine, read_engine = make_engines(directory)
+        with write_engine.connect() as connection:
+            assert pragma(connection, "journal_mode") == "wal"
+            assert pragma(connection, "synchronous") == 1  # NORMAL
+            assert pragma(connection, "mmap_size") == settings.sqlite_mmap_size
+            assert pragma(connection, "cache_size") == settings.sqlite_cache_size
+            assert pragma(connection, "busy_timeout") == settings.sqlite_busy_timeout_ms
+            assert pragma(connection, "query_only") == 0
+        with read_engine.connect() as connection:
+            assert pragma(connection, "busy_timeout") == settings.sqlite_busy_timeout_ms
+            assert pragma(connection, "query_only") == 1
+        write_engine.dispose()
+        read_engine.dispose()
+
+
+def test_reads_proceed_during_a_write_transaction():
+    """With WAL the read-only pool sees committed data while a writer holds its lock"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_engine, read_engine = make_engines(directory)
+        with write_engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (email, hashed_password) VALUES ('a@example.com', 'x')"))
+
+        with write_engine.connect() as writer:
+            writer.execute(text("BEGIN IMMEDIATE"))
+            writer.execute(text("INSERT INTO users (email, hashed_password) VALUES ('b@example.com', 'x')"))
+
+            with read_engine.connect() as reader:
+                assert reader.execute(text("SELECT count(*) FROM users")).scalar() == 1
+                try:
+                    reader.execute(text("DELETE FROM users"))
+                    assert False, "read-only engine accepted a write"
+                except OperationalError:
+                    pass
+
+            writer.execute(text("COMMIT"))
+
+        with read_engine.connect() as reader:
+            assert reader.execute(text("SELECT count(*) FROM users")).scalar() == 2
+        write_engine.dispose()
+        read_engine.dispose()
+
+
+if __name__ == "__main__":
+    test_performance_pragmas_on_every_connection()
+    test_reads_proceed_during_a_write_transaction()
+    print("✅ Database profile tests passed")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the on-demand image resizing cache
+"""
+import sys
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import formatdate
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from app.services import image_cache as image_cache_module
+from app.services.image_cache import ImageCache, resolve_upload, snap_width
+
+
+@contextmanager
+def upload_dir():
+    previous = os.environ.get("UPLOADS_PATH")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["UPLOADS_PATH"] = directory
+        try:
+            yield directory
+        finally:
+            if previous is None:
+                del os.environ["UPLOADS_PATH"]
+            else:
+                os.environ["UPLOADS_PATH"] = previous
+
+
+def save_photo(directory, name, size=(1200, 900)):
+    path = os.path.join(directory, "profiles", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.effect_noise(size, 64).convert("RGB").save(path, format="JPEG")
+    return path
+
+
+@contextmanager
+def counting_renders():
+    """Count how often images are decoded for resizing"""
+    original = image_cache_module.open_upright
+    calls = []
+
+    def open_upright(*args):
+        calls.append(args)
+        return original(*args)
+
+    image_cache_module.open_upright = open_upright
+    try:
+        yield calls
+    finally:
+        image_cache_module.open_upright = original
+
+
+def test_width_snapping_and_paths():
+    """Widths round up to the fixed set; only image files inside the upload directory resolve"""
+    assert snap_width(1) == 80
+    assert snap_width(160) == 160
+    assert snap_width(161) == 240
+    assert snap_width(10000) == 1600
+
+    with upload_dir() as directory:
+        photo = save_photo(directory, "a.jpg")
+        with open(os.path.join(directory, "notes.txt"), "w") as notes:
+            notes.write("not an image")
+        assert resolve_upload("profiles/a.jpg") == os.path.realpath(photo)
+        assert resolve_upload("profiles/missing.jpg") is None
+        assert resolve_upload("notes.txt") is None
+        assert resolve_upload("../" * 10 + "etc/passwd") is None
+
+
+def test_renders_once_then_serves_from_disk():
+    """The first request resizes; later and concurrent ones reuse the cached file"""
+    with upload_dir() as directory, tempfile.TemporaryDirectory() as cache_dir:
+        photo = save_photo(directory, "a.jpg")
+        cache = ImageCache(cache_dir, 10 * 1024 * 1024)
+        image = cache.describe(photo, 320, "webp")
+
+        with counting_renders() as renders:
+            with ThreadPoolExecutor(4) as pool:
+                paths = set(pool.map(cache.get, [image] * 8))
+            assert len(renders) == 1
+            assert paths == {cache.path_for(image)}
+
+        with Image.open(cache.get(image)) as resized:
+            assert resized.format == "WEBP" and resized.size == (320, 240)
+        assert cache.size() == os.path.getsize(cache.path_for(image))
+
+        # A replaced source gets a new key, so the old copy is never served
+        time.sleep(0.01)
+        save_photo(directory, "a.jpg", size=(800, 800))
+        assert cache.describe(photo, 320, "webp").key != image.key
+        assert cache.describe(photo, 320, "jpeg").media_type == "image/jpeg"
+
+
+def test_least_recently_used_entries_are_evicted():
+    """Past the size limit the least recently used images go first, also after a restart"""
+    with upload_dir() as directory, tempfile.TemporaryDirectory() as cache_dir:
+        cache = ImageCache(cache_dir, 10 * 1024 * 1024)
+        images = [cache.describe(save_photo(directory, f"{i}.jpg"), 640, "jpeg") for i in range(4)]
+        sizes = []
+        for image in images:
+            cache.get(image)
+            sizes.append(os.path.getsize(cache.path_for(image)))
+            time.sleep(0.01)
+        cache.get(images[0])  # now the most recently used
+
+        # Room for about three of them: the oldest unused one is evicted
+        limited = ImageCache(cache_dir, sum(sizes) - min(sizes) // 2)
+        extra = limited.describe(save_photo(directory, "extra.jpg"), 80, "jpeg")
+        limited.get(extra)
+        assert not os.path.exists(limited.path_for(images[1]))
+        for image in (images[0], images[2], images[3], extra):
+            assert os.path.exists(limited.path_for(image))
+        assert limited.size() <= limited.max_bytes
+
+
+def test_conditional_requests():
+    """If-None-Match and If-Modified-Since are answered from the key alone"""
+    with upload_dir() as directory, tempfile.TemporaryDirectory() as cache_dir:
+        cache = ImageCache(cache_dir, 1024 * 1024)
+        image = cache.describe(save_photo(directory, "a.jpg"), 320, "webp")
+        headers = image.headers()
+
+        assert image.not_modified({"if-none-match": headers["ETag"]})
+        assert image.not_modified({"if-none-match": f'"other", {headers["ETag"]}'})
+        assert not image.not_modified({"if-none-match": '"other"'})
+        assert image.not_modified({"if-modified-since": headers["Last-Modified"]})
+        assert not image.not_modified({"if-modified-since": formatdate(image.last_modified - 60, usegmt=True)})
+        # An ETag that no longer matches wins over a still-valid date
+        assert not image.not_modified({"if-none-match": '"other"', "if-modified-since": headers["Last-Modified"]})
+        assert not image.not_modified({"if-modified-since": "yesterday"})
+        assert not image.not_modified({})
+
+
+if __name__ == "__main__":
+    test_width_snapping_and_paths()
+    test_renders_once_then_serves_from_disk()
+    test_least_recently_used_entries_are_evicted()
+    test_conditional_requests()
+    print("✅ Image cache tests passed")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the normalization of uploaded photos
+"""
+import sys
+import os
+import asyncio
+import hashlib
+import io
+import subprocess
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.db.migrations import upgrade_database
+from app.services.blob_store import write_blob
+from app.services.image_ingest import InvalidImageError, normalize_image
+
+
+def phone_photo(size=(4000, 3000), orientation=6):
+    """Noisy JPEG with the EXIF a phone adds: orientation, GPS, camera"""
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = "PhoneMaker"
+    exif[0x8825] = {1: "N", 2: (52.0, 22.0, 0.0)}
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(buffer, format="JPEG", quality=98, exif=exif)
+    return buffer.getvalue()
+
+
+def write(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as saved:
+        saved.write(data)
+    return path
+
+
+def test_phone_photo_is_bounded_upright_and_stripped():
+    """Large photos come out within max_dimension, rotated, without EXIF and much smaller"""
+    with tempfile.TemporaryDirectory() as directory:
+        data = phone_photo()
+        source = write(directory, "upload.jpg", data)
+
+        path, size, sha256 = normalize_image(source, 1024, 85)
+        with open(path, "rb") as normalized:
+            assert hashlib.sha256(normalized.read()).hexdigest() == sha256
+        assert size == os.path.getsize(path) < len(data) / 5
+        with Image.open(path) as image:
+            assert image.format == "JPEG"
+            assert image.size == (768, 1024)  # portrait once the orientation is applied
+            assert not image.getexif()
+            assert "exif" not in image.info
+        assert os.path.exists(source)  # the caller replaces it
+
+
+def test_clean_small_images_are_kept():
+    """An image with nothing to strip or shrink is not re-encoded"""
+    with tempfile.TemporaryDirectory() as directory:
+        buffer = io.BytesIO()
+        Image.effect_noise((300, 200), 40).convert("RGB").save(buffer, format="JPEG", quality=60)
+        source = write(directory, "small.jpg", buffer.getvalue())
+        assert normalize_image(source, 1024, 85) is None
+        assert os.listdir(directory) == ["small.jpg"]
+
+        # Transparency is kept as PNG, and EXIF alone is reason to rewrite
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Editor"
+        Image.new("RGBA", (300, 200), (0, 0, 255, 100)).save(buffer, format="PNG", exif=exif)
+        path, _, _ = normalize_image(write(directory, "logo.png", buffer.getvalue()), 1024, 85)
+        with Image.open(path) as image:
+            assert (image.format, image.mode, image.size) == ("PNG", "RGBA", (300, 200))
+            assert not image.getexif()
+
+
+def test_invalid_images_are_rejected():
+    """Bytes that are not an image raise InvalidImageError and leave nothing behind"""
+    with tempfile.TemporaryDirectory() as directory:
+        source = write(directory, "fake.jpg", b"not really a jpeg")
+        try:
+            normalize_image(source, 1024, 85)
+            assert False, "invalid image was accepted"
+        except InvalidImageError:
+            pass
+        assert os.listdir(directory) == ["fake.jpg"]
+
+
+def test_uploads_are_normalized_in_the_process_pool():
+    """write_blob stores the normalized photo, deduplicated by its normalized content"""
+    previous = os.environ.get("UPLOADS_PATH")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["UPLOADS_PATH"] = directory
+        try:
+            data = phone_photo(size=(3000, 2000))
+            first = asyncio.run(write_blob(UploadFile(file=io.BytesIO(data), filename="IMG_0001.JPG")))
+            second = asyncio.run(write_blob(UploadFile(file=io.BytesIO(data), filename="IMG_0001.JPG")))
+            assert first.path == second.path
+            assert first.path.endswith(f"{first.sha256}.jpg")
+            with Image.open(first.path) as image:
+                assert max(image.size) == settings.image_ingest_max_dimension
+                assert not image.getexif()
+
+            try:
+                asyncio.run(write_blob(UploadFile(file=io.BytesIO(b"garbage"), filename="x.jpg")))
+                assert False, "invalid image was accepted"
+            except InvalidImageError:
+                pass
+            assert os.listdir(os.path.join(directory, "blobs", "incoming")) == []
+        finally:
+            if previous is None:
+                del os.environ["UPLOADS_PATH"]
+            else:
+                os.environ["UPLOADS_PATH"] = previous
+
+
+def test_importing_main_skips_worker_startup():
+    """Spawned ingest processes re-import __main__; only the app lifespan loads the candidate pool"""
+    code = ("import main\n"
+            "from app.services.candidate_index import candidate_index\n"
+            "print(candidate_index.is_loaded)")
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{directory}/startup.db"
+        upgrade_database(database_url)
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=dict(os.environ, UPLOADS_PATH=directory, DATABASE_URL=database_url))
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+
+if __name__ == "__main__":
+    test_phone_photo_is_bounded_upright_and_stripped()
+    test_clean_small_images_are_kept()
+    test_invalid_images_are_rejected()
+    test_uploads_are_normalized_in_the_process_pool()
+    test_importing_main_skips_worker_startup()
+    print("✅ Image ingest tests passed")
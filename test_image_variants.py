@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the resized photo variants
+"""
+import sys
+import os
+import asyncio
+import io
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import UploadFile
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.services.blob_store import collect_garbage, register_blob, write_blob
+from app.services.image_variants import (
+    VARIANT_WIDTHS, existing_variant, generate_variants, schedule_variants, variant_path
+)
+
+
+@contextmanager
+def upload_dir():
+    previous = os.environ.get("UPLOADS_PATH")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["UPLOADS_PATH"] = directory
+        try:
+            yield directory
+        finally:
+            if previous is None:
+                del os.environ["UPLOADS_PATH"]
+            else:
+                os.environ["UPLOADS_PATH"] = previous
+
+
+def save_image(path, size, mode="RGB", image_format="JPEG", orientation=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image = Image.new(mode, size, (255, 0, 0, 128) if mode == "RGBA" else "red")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(path, format=image_format, exif=exif)
+    return path
+
+
+def test_variant_paths():
+    """Variants mirror the original's place under the upload directory"""
+    with upload_dir() as directory:
+        original = os.path.join(directory, "blobs", "ab", "abcdef.jpg")
+        assert variant_path(original, "thumb") == os.path.join(directory, "variants", "thumb", "blobs", "ab", "abcdef.webp")
+        assert variant_path("/elsewhere/photo.jpg", "thumb") is None
+        assert variant_path(variant_path(original, "small"), "thumb") is None
+        assert existing_variant(original, "thumb") is None
+
+
+def test_generates_width_bounded_variants():
+    """A large photo gets every variant, upright, at the variant widths"""
+    with upload_dir() as directory:
+        # Stored landscape but tagged to be displayed rotated (portrait)
+        original = save_image(os.path.join(directory, "profiles", "phone.jpg"), (3000, 2000), orientation=6)
+
+        written = generate_variants(original)
+        assert len(written) == len(VARIANT_WIDTHS)
+        for variant, width in VARIANT_WIDTHS.items():
+            with Image.open(existing_variant(original, variant)) as image:
+                assert image.format == "WEBP"
+                assert image.width == width
+                assert abs(image.height - width * 3 / 2) <= 1
+
+        # Existing variants are kept unless forced
+        assert generate_variants(original) == []
+        assert len(generate_variants(original, force=True)) == len(VARIANT_WIDTHS)
+
+
+def test_small_images_are_not_enlarged():
+    """Photos narrower than a variant keep their size; transparency survives"""
+    with upload_dir() as directory:
+        original = save_image(os.path.join(directory, "profiles", "icon.png"), (120, 90), "RGBA", "PNG")
+        generate_variants(original)
+        for variant in VARIANT_WIDTHS:
+            with Image.open(existing_variant(original, variant)) as image:
+                assert image.size == (120, 90)
+                assert image.mode == "RGBA"
+
+
+def test_background_generation_and_cleanup():
+    """Scheduled variants appear without blocking, and go with their blob"""
+    with upload_dir():
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 500), "blue").save(buffer, format="JPEG")
+        buffer.seek(0)
+        stored = asyncio.run(write_blob(UploadFile(file=buffer, filename="photo.jpg")))
+
+        schedule_variants([stored.path])
+        deadline = time.time() + 10
+        while not all(existing_variant(stored.path, variant) for variant in VARIANT_WIDTHS):
+            assert time.time() < deadline, "variants were not generated"
+            time.sleep(0.05)
+        variants = [existing_variant(stored.path, variant) for variant in VARIANT_WIDTHS]
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        register_blob(db, stored)
+        db.commit()
+        assert collect_garbage(db, now=datetime.utcnow() + timedelta(hours=2)).removed == 1
+        assert not any(os.path.exists(path) for path in variants + [stored.path])
+
+
+if __name__ == "__main__":
+    test_variant_paths()
+    test_generates_width_bounded_variants()
+    test_small_images_are_not_enlarged()
+    test_background_generation_and_cleanup()
+    print("✅ Image variant tests passed")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test the nightly batch match generation job
+"""
+import asyncio
+import random
+import sys
+import os
+from datetime import date
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, Match, MatchGenerationRun
+from app.services import ai_matching
+from app.services.ai_matching import ai_matching_service
+from app.services.batch_scoring import CandidatePool
+from app.services.candidate_index import InvertedTokenIndex
+from app.services.candidate_queries import load_candidates
+from app.services.match_generation import (
+    generate_all_daily_matches, save_matches, build_match_row, shortlist_rows
+)
+from app.services.token_index import tokenize
+from test_batch_scoring import random_person
+
+
+def make_db(n_users=25):
+    """In-memory database with random complete users"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = random.Random(11)
+    for i in range(n_users):
+        person = random_person(rng)
+        user = User(email=f"job{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Profile(user_id=user.id, description=person['profile_text']))
+        db.add(Expectation(user_id=user.id, description=person['expectation_text']))
+    db.commit()
+    return db
+
+
+def stored_matches(db):
+    return sorted((m.user_id, m.matched_user_id, m.compatibility_score) for m in db.query(Match).all())
+
+
+def test_job_matches_on_demand_results():
+    """The job stores the same top matches the request path would compute"""
+    db = make_db()
+    run = generate_all_daily_matches(db, limit=5, chunk_size=7, run_date=date(2025, 1, 1))
+    assert run.status == "completed"
+
+    users = load_candidates(db)
+    expected = []
+    for user in users:
+        for match in asyncio.run(ai_matching_service.find_daily_matches(user, users, limit=5)):
+            expected.append((user.id, match["user_id"], match["compatibility_score"]))
+
+    assert stored_matches(db) == sorted(expected)
+    assert run.matches_created == len(expected)
+
+
+def test_interrupted_run_resumes():
+    """A run stopped after the first chunk continues without duplicating work"""
+    db = make_db()
+
+    class Interrupted(Exception):
+        pass
+
+    def stop_after_first_chunk(run):
+        raise Interrupted()
+
+    try:
+        generate_all_daily_matches(db, chunk_size=10, run_date=date(2025, 1, 2), progress=stop_after_first_chunk)
+    except Interrupted:
+        pass
+
+    run = db.query(MatchGenerationRun).one()
+    assert run.status == "running" and run.users_processed == 10
+
+    run = generate_all_daily_matches(db, chunk_size=10, run_date=date(2025, 1, 2))
+    assert run.status == "completed" and run.users_processed == 25
+    assert len(stored_matches(db)) == 25 * 5
+
+    # Completed runs are not repeated
+    assert generate_all_daily_matches(db, run_date=date(2025, 1, 2)).matches_created == 25 * 5
+    assert len(stored_matches(db)) == 25 * 5
+
+
+def test_parallel_workers_match_serial():
+    """Scoring across worker processes stores exactly what the serial run stores"""
+    serial_db = make_db()
+    generate_all_daily_matches(serial_db, chunk_size=9, run_date=date(2025, 1, 3))
+
+    parallel_db = make_db()
+    generate_all_daily_matches(parallel_db, chunk_size=9, run_date=date(2025, 1, 3), workers=2)
+
+    assert stored_matches(parallel_db) == stored_matches(serial_db)
+
+
+def populated_index(users):
+    """A loaded inverted index over the users' word sets"""
+    index = InvertedTokenIndex()
+    for user in users:
+        index.update_profile(user.id, tokenize(user.profile.description))
+        index.update_expectation(user.id, tokenize(user.expectations.description))
+    index.is_loaded = True
+    return index
+
+
+def test_job_uses_the_request_path_shortlist():
+    """With a loaded index the job scores each user's shortlist, like find_daily_matches"""
+    db = make_db(40)
+    users = load_candidates(db)
+    index = populated_index(users)
+
+    # The shortlist really narrows some users' candidates
+    people = [ai_matching_service.build_person(user) for user in users]
+    pool = CandidatePool(people, ids=[user.id for user in users])
+    shortlists = shortlist_rows(index, pool, people, list(range(len(users))), 3)
+    assert any(rows is not None and len(rows) < len(users) - 1 for rows in shortlists)
+
+    run = generate_all_daily_matches(db, limit=3, chunk_size=9, run_date=date(2025, 1, 4), index=index)
+    assert run.status == "completed"
+
+    previous = ai_matching.candidate_index
+    ai_matching.candidate_index = index
+    try:
+        expected = []
+        for user in users:
+            for match in asyncio.run(ai_matching_service.find_daily_matches(user, users, limit=3)):
+                expected.append((user.id, match["user_id"], match["compatibility_score"]))
+    finally:
+        ai_matching.candidate_index = previous
+    assert stored_matches(db) == sorted(expected)
+
+    parallel_db = make_db(40)
+    generate_all_daily_matches(parallel_db, limit=3, chunk_size=9, run_date=date(2025, 1, 4), workers=2, index=index)
+    assert stored_matches(parallel_db) == stored_matches(db)
+
+
+def test_own_words_do_not_fill_the_shortlist():
+    """A user whose profile matches their own expectations still gets `limit` matches, as on request"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    descriptions = [
+        ("hiking climbing", "hiking climbing"),
+        ("hiking", "cooking"),
+        ("climbing", "painting"),
+        ("chess", "music"),
+        ("reading", "gardening"),
+    ]
+    for i, (profile, expectations) in enumerate(descriptions):
+        user = User(email=f"self{i}@example.com", hashed_password="x")
+        user.profile = Profile(description=profile)
+        user.expectations = Expectation(description=expectations)
+        db.add(user)
+    db.commit()
+
+    users = load_candidates(db)
+    index = populated_index(users)
+    generate_all_daily_matches(db, limit=3, run_date=date(2025, 1, 5), index=index)
+
+    previous = ai_matching.candidate_index
+    ai_matching.candidate_index = index
+    try:
+        requested = asyncio.run(ai_matching_service.find_daily_matches(users[0], users, limit=3))
+    finally:
+        ai_matching.candidate_index = previous
+    stored = [match for match in stored_matches(db) if match[0] == users[0].id]
+    assert len(stored) == 3
+    assert stored == sorted((users[0].id, match["user_id"], match["compatibility_score"]) for match in requested)
+
+
+def test_save_matches_upserts_in_bulk():
+    """One INSERT per batch; existing pairs are skipped and only new ids returned"""
+    db = make_db(5)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def row(user_id, matched_user_id, score=0.4):
+        return build_match_row(user_id, {"user_id": matched_user_id, "compatibility_score": score,
+                                         "text_similarity": 0.1, "visual_similarity": 0.55})
+
+    first_ids = save_matches(db, [row(1, 2), row(1, 3), row(2, 1)])
+    db.commit()
+    assert len(first_ids) == 3
+    assert len([sql for sql in statements if sql.startswith("INSERT INTO matches")]) == 1
+
+    # (1, 2) exists already and keeps its original score
+    second_ids = save_matches(db, [row(1, 2, score=0.9), row(1, 4)])
+    db.commit()
+    assert len(second_ids) == 1 and second_ids[0] not in first_ids
+    assert db.query(Match).count() == 4
+    assert db.query(Match).filter(Match.user_id == 1, Match.matched_user_id == 2).one().compatibility_score == 0.4
+    assert save_matches(db, []) == []
+
+
+if __name__ == "__main__":
+    test_job_matches_on_demand_results()
+    test_interrupted_run_resumes()
+    test_parallel_workers_match_serial()
+    test_job_uses_the_request_path_shortlist()
+    test_own_words_do_not_fill_the_shortlist()
+    test_save_matches_upserts_in_bulk()
+    print("✅ Match generation tests passed")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the background match job queue
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.executor import BlockingExecutor
+from app.db.database import Base
+from app.services.match_jobs import MatchJobQueue, QueueFullError
+
+
+# Job rows are written from the executor thread, so each test gets its own database file
+DATABASE_DIR = tempfile.TemporaryDirectory()
+
+
+def make_session_factory():
+    engine = create_engine(f"sqlite:///{os.path.join(DATABASE_DIR.name, uuid.uuid4().hex)}.db")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def make_queue(max_pending=5, result_ttl=60, session_factory=None):
+    return MatchJobQueue(BlockingExecutor(1, "test-jobs"), session_factory or make_session_factory(),
+                         max_pending=max_pending, result_ttl=result_ttl)
+
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_results_and_failures():
+    """Completed jobs expose their result, failing jobs their error"""
+    queue = make_queue()
+
+    job = wait_for(queue, queue.submit(lambda n: [{"user_id": n}], 7))
+    assert job["status"] == "completed"
+    assert job["result"] == [{"user_id": 7}]
+
+    def broken():
+        raise ValueError("no candidates")
+
+    job = wait_for(queue, queue.submit(broken))
+    assert job["status"] == "failed"
+    assert job["error"] == "no candidates"
+
+    assert queue.get("unknown") is None
+
+
+def test_queue_rejects_when_full():
+    """Unfinished jobs are bounded; slots free up once jobs finish"""
+    queue = make_queue(max_pending=2)
+    release = threading.Event()
+
+    first = queue.submit(release.wait)
+    queue.submit(release.wait)
+    assert queue.is_full()
+    try:
+        queue.submit(release.wait)
+        assert False, "expected QueueFullError"
+    except QueueFullError:
+        pass
+
+    release.set()
+    wait_for(queue, first)
+    queue.submit(lambda: [])
+
+
+def test_finished_jobs_expire():
+    """Results are dropped after the TTL"""
+    queue = make_queue(max_pending=2, result_ttl=0.05)
+    job_id = queue.submit(lambda: [])
+    wait_for(queue, job_id)
+    time.sleep(0.1)
+    assert queue.get(job_id) is None
+
+
+def test_jobs_are_shared_between_workers():
+    """A job submitted by one worker is visible to, and counted by, another"""
+    session_factory = make_session_factory()
+    first_worker = make_queue(max_pending=2, session_factory=session_factory)
+    second_worker = make_queue(max_pending=2, session_factory=session_factory)
+    release = threading.Event()
+
+    job_id = first_worker.submit(lambda: (release.wait(), [{"user_id": 3}])[1])
+    assert second_worker.get(job_id)["status"] in ("queued", "running")
+    second_worker.submit(release.wait)
+    assert first_worker.is_full() and second_worker.is_full()
+
+    release.set()
+    assert wait_for(second_worker, job_id)["result"] == [{"user_id": 3}]
+
+
+if __name__ == "__main__":
+    test_job_results_and_failures()
+    test_queue_rejects_when_full()
+    test_finished_jobs_expire()
+    test_jobs_are_shared_between_workers()
+    print("✅ Match job queue tests passed")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test the match statistics aggregate and per-user rollup
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.matches import mark_match_as_viewed, get_match_stats as match_stats_endpoint
+from app.db.database import Base
+from app.models.user import User, Match, MatchStats
+from app.services.match_generation import save_matches, build_match_row
+from app.services.match_stats import compute_match_stats, get_match_stats, reconcile_match_stats
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    for i in range(6):
+        db.add(User(email=f"stats{i}@example.com", hashed_password="x"))
+    db.commit()
+    return db
+
+
+def match_row(user_id, matched_user_id, score):
+    return build_match_row(user_id, {"user_id": matched_user_id, "compatibility_score": score,
+                                     "text_similarity": 0.1, "visual_similarity": 0.55})
+
+
+def python_stats(db, user_id):
+    """The statistics as the endpoint used to compute them"""
+    matches = db.query(Match).filter(Match.user_id == user_id).all()
+    total = len(matches)
+    viewed = sum(1 for match in matches if match.is_viewed)
+    average = sum(match.compatibility_score for match in matches) / total if total else 0.0
+    return {"total_matches": total, "viewed_matches": viewed,
+            "unviewed_matches": total - viewed, "average_compatibility_score": round(average, 3)}
+
+
+def test_aggregate_is_one_statement():
+    """Totals, viewed count and average come from a single SELECT"""
+    db = make_db()
+    save_matches(db, [match_row(1, other, 0.1 * other) for other in range(2, 7)])
+    db.query(Match).filter(Match.matched_user_id.in_([2, 3])).update({Match.is_viewed: True})
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    stats = compute_match_stats(db, 1)
+    assert len(statements) == 1
+    assert stats == python_stats(db, 1)
+    assert compute_match_stats(db, 2) == python_stats(db, 2)
+
+
+def test_rollup_follows_inserts_and_views():
+    """The rollup is seeded on first read and kept equal to the aggregate afterwards"""
+    db = make_db()
+    save_matches(db, [match_row(1, 2, 0.31), match_row(1, 3, 0.42)])
+    db.commit()
+
+    # First read seeds the rollup from the matches table
+    assert get_match_stats(db, 1) == python_stats(db, 1)
+    db.commit()
+    assert db.query(MatchStats).filter(MatchStats.user_id == 1).one().total_matches == 2
+
+    # New matches (and re-sent existing pairs) update it incrementally
+    save_matches(db, [match_row(1, 2, 0.99), match_row(1, 4, 0.57), match_row(1, 5, 0.6)])
+    db.commit()
+    user = db.query(User).filter(User.id == 1).one()
+    match_id = db.query(Match.id).filter(Match.user_id == 1, Match.matched_user_id == 4).scalar()
+    mark_match_as_viewed(match_id, current_user=user, db=db)
+    mark_match_as_viewed(match_id, current_user=user, db=db)
+    try:
+        mark_match_as_viewed(10**6, current_user=user, db=db)
+        assert False, "unknown match was marked"
+    except HTTPException as e:
+        assert e.status_code == 404
+
+    rollup = db.query(MatchStats).filter(MatchStats.user_id == 1).one()
+    assert (rollup.total_matches, rollup.viewed_matches) == (4, 1)
+    assert get_match_stats(db, 1) == python_stats(db, 1) == compute_match_stats(db, 1)
+    assert match_stats_endpoint(current_user=user, db=db) == python_stats(db, 1)
+
+
+def test_writes_seed_missing_rollup_rows():
+    """A write for a user without a rollup row seeds it, including the rows just written"""
+    db = make_db()
+    save_matches(db, [match_row(1, 2, 0.31)])
+    db.commit()
+    db.query(MatchStats).delete()
+    db.commit()
+
+    save_matches(db, [match_row(1, 3, 0.42), match_row(2, 1, 0.5)])
+    db.commit()
+    rollup = db.query(MatchStats).filter(MatchStats.user_id == 1).one()
+    assert (rollup.total_matches, rollup.compatibility_score_sum) == (2, 0.31 + 0.42)
+    assert get_match_stats(db, 2) == python_stats(db, 2)
+
+    # A user without matches reads zeros from a freshly seeded row
+    assert get_match_stats(db, 6) == python_stats(db, 6)
+    assert db.query(MatchStats).filter(MatchStats.user_id == 6).one().total_matches == 0
+
+
+def test_reconcile_fixes_drift():
+    """Reconciling corrects and reports rows that differ from the aggregate"""
+    db = make_db()
+    save_matches(db, [match_row(user_id, other, (user_id + other) / 20)
+                      for user_id in range(1, 5) for other in range(1, 7) if other != user_id])
+    db.commit()
+    assert reconcile_match_stats(db) == {}
+
+    db.query(MatchStats).filter(MatchStats.user_id == 1).update({MatchStats.total_matches: 99})
+    db.query(MatchStats).filter(MatchStats.user_id == 3).update({MatchStats.viewed_matches: 2})
+    db.add(MatchStats(user_id=6, total_matches=1, viewed_matches=0, compatibility_score_sum=0.5))
+    db.commit()
+
+    drift = reconcile_match_stats(db)
+    db.commit()
+    assert sorted(drift) == [1, 3, 6]
+    assert drift[1][0][0] == 99 and drift[1][1][0] == 5
+    assert drift[6] == ((1, 0, 0.5), (0, 0, 0.0))
+    for user_id in range(1, 7):
+        assert get_match_stats(db, user_id) == python_stats(db, user_id)
+    assert reconcile_match_stats(db) == {}
+
+
+if __name__ == "__main__":
+    test_aggregate_is_one_statement()
+    test_rollup_follows_inserts_and_views()
+    test_writes_seed_missing_rollup_rows()
+    test_reconcile_fixes_drift()
+    print("✅ Match stats tests passed")
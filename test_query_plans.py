@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the hot match and photo queries
+Each query must be answered from an index (SEARCH ... USING INDEX), never a
+full table SCAN or a temporary sort; the migration must add those indexes to
+a database created before they existed
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import String, create_engine, inspect, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateTable
+
+from app.db.database import Base
+from app.db.migrations import upgrade_database
+from app.models.user import Match, MatchScoreCache, Photo
+from app.services.candidate_queries import candidate_snapshots_statement
+
+NEW_INDEXES = {
+    "matches": {"uq_matches_user_pair", "ix_matches_user_score", "ix_matches_user_created", "ix_matches_matched_user_id"},
+    "photos": {"ix_photos_profile_first"},
+    "ideal_partner_photos": {"ix_ideal_partner_photos_expectation_first"},
+    "example_images": {"ix_example_images_expectation_id"},
+    "users": {"ix_users_created_at"},
+}
+
+
+def make_pre_migration_db(directory):
+    """
+    A database shaped like one created before the indexes, token index hashes
+    and hash-versioned score cache existed, with a duplicate match pair and a
+    cached score
+    """
+    url = f"sqlite:///{directory}/plans.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for names in NEW_INDEXES.values():
+            for name in names:
+                connection.execute(text(f"DROP INDEX {name}"))
+        connection.execute(text("DROP TABLE user_token_index"))
+        connection.execute(text(
+            "CREATE TABLE user_token_index (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL UNIQUE REFERENCES users (id), "
+            "profile_tokens TEXT, profile_length INTEGER, expectation_tokens TEXT, expectation_length INTEGER, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        old_cache = str(CreateTable(MatchScoreCache.__table__).compile(engine))
+        for column in ("low_profile_version", "low_expectation_version", "high_profile_version", "high_expectation_version"):
+            old_cache = old_cache.replace(f"{column} VARCHAR(40)", f"{column} DATETIME")
+        connection.execute(text("DROP TABLE pair_score_cache"))
+        connection.execute(text(old_cache))
+        connection.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (1, 'a@example.com', 'x'), (2, 'b@example.com', 'x')"))
+        for _ in range(2):
+            connection.execute(text(
+                "INSERT INTO matches (user_id, matched_user_id, compatibility_score, text_similarity_score, visual_similarity_score) "
+                "VALUES (1, 2, 0.5, 0.5, 0.5)"
+            ))
+        connection.execute(text(
+            "INSERT INTO pair_score_cache (user_low_id, user_high_id, low_profile_version, compatibility_score, "
+            "text_score_a_to_b, text_score_b_to_a, image_score_a_to_b, image_score_b_to_a) "
+            "VALUES (1, 2, '2026-10-17 10:00:00', 0.5, 0.5, 0.5, 0.5, 0.5)"
+        ))
+    return url, engine
+
+
+def query_plan(connection, statement):
+    compiled = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def assert_indexed(plan, table, index):
+    """Every access to `table` is an index search through `index`, with no temp sort"""
+    steps = [step for step in plan if f" {table} " in f" {step} "]
+    assert steps, plan
+    for step in steps:
+        assert step.startswith("SEARCH") and index in step, plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_migration_adds_indexes_and_dedupes_pairs():
+    """
+    Upgrading an old database removes duplicate pairs, creates every index and
+    swaps the token index lengths and score cache timestamps for hashes;
+    re-running is a no-op
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        url, engine = make_pre_migration_db(directory)
+        upgrade_database(url)
+        upgrade_database(url)
+
+        inspector = inspect(engine)
+        for table, names in NEW_INDEXES.items():
+            assert names <= {index["name"] for index in inspector.get_indexes(table)}, table
+        columns = {column["name"] for column in inspector.get_columns("user_token_index")}
+        assert {"profile_hash", "expectation_hash"} <= columns
+        assert not {"profile_length", "expectation_length"} & columns
+        cache_columns = {column["name"]: column["type"] for column in inspector.get_columns("pair_score_cache")}
+        assert isinstance(cache_columns["low_profile_version"], String)
+
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM matches")).scalar() == 1
+            assert connection.execute(text("SELECT count(*) FROM pair_score_cache")).scalar() == 0
+            assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0005"
+        engine.dispose()
+
+
+def schema(engine):
+    """Tables with their columns, indexes and unique constraints, as SQLite reports them"""
+    inspector = inspect(engine)
+    return {
+        table: (
+            {(column["name"], str(column["type"]), column["nullable"]) for column in inspector.get_columns(table)},
+            {(index["name"], tuple(index["column_names"]), bool(index["unique"])) for index in inspector.get_indexes(table)},
+            {tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table)},
+        )
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+
+
+def test_migrations_build_the_model_schema():
+    """Upgrading an empty database from the 0000 baseline gives exactly the create_all schema"""
+    with tempfile.TemporaryDirectory() as directory:
+        migrated = create_engine(f"sqlite:///{directory}/migrated.db")
+        upgrade_database(f"sqlite:///{directory}/migrated.db")
+        created = create_engine(f"sqlite:///{directory}/created.db")
+        Base.metadata.create_all(bind=created)
+
+        assert schema(migrated) == schema(created)
+        migrated.dispose()
+        created.dispose()
+
+
+def test_hot_query_plans():
+    """Pair lookups, best-first listings, day checks and first-photo lookups use their indexes"""
+    with tempfile.TemporaryDirectory() as directory:
+        url, engine = make_pre_migration_db(directory)
+        upgrade_database(url)
+
+        with engine.connect() as connection:
+            connection.execute(text("ANALYZE"))
+
+            # generate_daily_matches: does this pair already exist?
+            pair = select(Match.id).where(Match.user_id == 1, Match.matched_user_id == 2)
+            assert_indexed(query_plan(connection, pair), "matches", "uq_matches_user_pair")
+
+            # get_daily_matches: a user's best matches
+            best = select(Match).where(Match.user_id == 1).order_by(Match.compatibility_score.desc()).limit(10)
+            assert_indexed(query_plan(connection, best), "matches", "ix_matches_user_score")
+
+            # has_matches_for_day
+            today = select(Match.id).where(Match.user_id == 1, Match.created_at >= datetime(2026, 1, 1)).limit(1)
+            plan = query_plan(connection, today)
+            assert all(step.startswith("SEARCH") for step in plan if " matches " in f" {step} "), plan
+
+            # Eager loading of photos by profile
+            photos = select(Photo.id, Photo.file_path).where(Photo.profile_id.in_([1, 2, 3]))
+            assert_indexed(query_plan(connection, photos), "photos", "ix_photos_profile_first")
+
+            # Candidate snapshots: first photo of each side from covering indexes
+            plan = query_plan(connection, candidate_snapshots_statement())
+            photo_steps = [step for step in plan if "photos" in step]
+            assert any("COVERING INDEX ix_photos_profile_first" in step for step in photo_steps), plan
+            assert any("COVERING INDEX ix_ideal_partner_photos_expectation_first" in step for step in photo_steps), plan
+            assert not any(step.startswith("SCAN") for step in photo_steps), plan
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_migration_adds_indexes_and_dedupes_pairs()
+    test_migrations_build_the_model_schema()
+    test_hot_query_plans()
+    print("✅ Query plan tests passed")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test the persistent pairwise score cache
+"""
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, MatchScoreCache
+from app.services.ai_matching import ai_matching_service, dating_match_score
+from app.services.score_cache import invalidate_user_scores, load_cached_scores, load_pair_details, flip_details
+
+PROFILES = [
+    ("Kind hiker who loves music and travel", "Someone creative and funny who loves hiking"),
+    ("Creative painter, funny and calm", "A kind person who loves music"),
+    ("Gamer and cook who loves movies", "Someone adventurous"),
+]
+
+
+def make_users():
+    """In-memory database with a few complete users"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    users = []
+    for i, (profile, expectation) in enumerate(PROFILES):
+        user = User(email=f"cache{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Profile(user_id=user.id, description=profile))
+        db.add(Expectation(user_id=user.id, description=expectation))
+        users.append(user)
+    db.commit()
+    return db, users
+
+
+def find(db, user, candidates):
+    matches = asyncio.run(ai_matching_service.find_daily_matches(user, candidates, limit=5, db=db))
+    db.commit()
+    return {m["user_id"]: m["compatibility_score"] for m in matches}
+
+
+def test_scores_are_cached_and_reused():
+    """Second request reads cached scores instead of rescoring"""
+    db, users = make_users()
+    user, candidates = users[0], users[1:]
+
+    first = find(db, user, candidates)
+    assert db.query(MatchScoreCache).count() == len(candidates)
+
+    # Tamper with a cached score: an unchanged pair must be served from the cache
+    row = db.query(MatchScoreCache).filter(MatchScoreCache.user_high_id == candidates[0].id).first()
+    row.compatibility_score = 0.999
+    db.commit()
+    assert find(db, user, candidates)[candidates[0].id] == 0.999
+
+    # Editing the profile makes the cached entry stale, also twice within one second
+    original = candidates[0].profile.description
+    candidates[0].profile.description = original + " and chess"
+    db.commit()
+    find(db, user, candidates)
+    candidates[0].profile.description = original
+    db.commit()
+    assert find(db, user, candidates) == first
+    assert db.query(MatchScoreCache).count() == len(candidates)
+
+
+def test_cached_scores_read_only_the_candidates_score_columns():
+    """Reading cached scores skips the details JSON and pairs outside the candidate list"""
+    db, users = make_users()
+    asyncio.run(ai_matching_service.find_daily_matches(users[1], users, limit=5, db=db, include_reasoning=True))
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    cached, stale_ids = load_cached_scores(db, users[1], [users[0]])
+    assert list(cached) == [users[0].id] and stale_ids == []
+    assert statements and not any("details" in sql for sql in statements)
+
+
+def test_invalidation_drops_both_roles():
+    """Bulk invalidation removes pairs where the user is either side"""
+    db, users = make_users()
+    find(db, users[0], users[1:])
+    find(db, users[1], [users[0], users[2]])
+
+    # The (0, 1) pair was reused by the second request, not stored twice
+    assert db.query(MatchScoreCache).count() == 3
+
+    assert invalidate_user_scores(db, users[0].id) == 2
+    db.commit()
+    assert db.query(MatchScoreCache).count() == 1
+
+
+def test_clearing_ideal_photos_invalidates_scores():
+    """A submission that removes every ideal partner photo drops the user's cached pairs"""
+    from app.services import match_requests
+
+    db, users = make_users()
+    find(db, users[0], users[1:])
+    user_id = users[0].id
+
+    original = match_requests.SessionLocal
+    match_requests.SessionLocal = sessionmaker(bind=db.get_bind())
+    try:
+        # Same texts and no photo changes: cached pairs stay valid
+        match_requests.save_submission(user_id, PROFILES[0][0], PROFILES[0][1])
+        assert db.query(MatchScoreCache).count() == 2
+
+        match_requests.save_submission(user_id, PROFILES[0][0], PROFILES[0][1], ideal_photo_paths=[])
+        assert db.query(MatchScoreCache).count() == 0
+    finally:
+        match_requests.SessionLocal = original
+
+
+def test_reverse_direction_reuses_pair_exactly():
+    """(B, A) served from the (A, B) row equals dating_match_score(B, A), details included"""
+    import random
+    from test_batch_scoring import random_person
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    rng = random.Random(5)
+    users = []
+    for i in range(30):
+        person = random_person(rng)
+        user = User(email=f"pair{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Profile(user_id=user.id, description=person['profile_text']))
+        db.add(Expectation(user_id=user.id, description=person['expectation_text']))
+        users.append(user)
+    db.commit()
+
+    # Low ids score everyone first, so high ids are served flipped rows
+    for user in users:
+        asyncio.run(ai_matching_service.find_daily_matches(user, users, limit=3, include_reasoning=True, db=db))
+        db.commit()
+    assert db.query(MatchScoreCache).count() == 30 * 29 // 2
+
+    for user in users:
+        matches = asyncio.run(ai_matching_service.find_daily_matches(user, users, limit=29, db=db))
+        person_a = ai_matching_service.build_person(user)
+        for match in matches:
+            candidate = next(u for u in users if u.id == match["user_id"])
+            person_b = ai_matching_service.build_person(candidate)
+            assert match["compatibility_score"] == dating_match_score(person_a, person_b)
+
+            details = load_pair_details(db, user, candidate)
+            if details is not None:
+                _, expected = dating_match_score(person_a, person_b, return_details=True)
+                for key in ("text_score_a_to_b", "text_score_b_to_a", "image_score_a_to_b",
+                            "image_score_b_to_a", "photo_issues"):
+                    assert details[key] == expected[key]
+                assert sorted(details["common_words"]) == sorted(expected["common_words"])
+                assert len(details["mismatches_a_to_b"]) == len(expected["mismatches_a_to_b"])
+
+
+def test_flip_details_round_trips():
+    """Flipping twice gives the original details back"""
+    details = {
+        "text_score_a_to_b": 0.1, "text_score_b_to_a": 0.15,
+        "image_score_a_to_b": 0.5, "image_score_b_to_a": 0.6,
+        "mismatches_a_to_b": ["their profile is very brief"], "mismatches_b_to_a": [],
+        "photo_issues": ["missing ideal partner photos"], "common_words": ["music"],
+    }
+    assert flip_details(details)["photo_issues"] == ["missing profile photos"]
+    assert flip_details(flip_details(details)) == details
+
+
+if __name__ == "__main__":
+    test_scores_are_cached_and_reused()
+    test_cached_scores_read_only_the_candidates_score_columns()
+    test_invalidation_drops_both_roles()
+    test_clearing_ideal_photos_invalidates_scores()
+    test_reverse_direction_reuses_pair_exactly()
+    test_flip_details_round_trips()
+    print("✅ Score cache tests passed")
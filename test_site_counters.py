@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the /api/stats counters and their reconciliation
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation, Photo, SiteCounter
+from app.services.site_counters import count_from_scratch, get_site_stats, reconcile_site_counters, stored_counters
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def add_user(db, index, profile=True, expectation=True, photos=1):
+    user = User(email=f"counter{index}@example.com", hashed_password="x")
+    if profile:
+        user.profile = Profile(description="likes hiking",
+                               photos=[Photo(file_path=f"/p/{index}_{n}.jpg") for n in range(photos)])
+    if expectation:
+        user.expectations = Expectation(description="someone outdoorsy")
+    db.add(user)
+    return user
+
+
+def test_counters_follow_orm_writes():
+    """Inserts and deletes through the ORM keep every counter equal to a recount"""
+    db = make_db()
+    assert reconcile_site_counters(db) == {
+        "total_users": (None, 0), "users_with_profiles": (None, 0),
+        "users_with_expectations": (None, 0), "total_photos": (None, 0),
+    }
+    db.commit()
+
+    add_user(db, 1, photos=3)
+    add_user(db, 2, expectation=False)
+    add_user(db, 3, profile=False)
+    db.commit()
+    assert stored_counters(db) == count_from_scratch(db) == {
+        "total_users": 3, "users_with_profiles": 2, "users_with_expectations": 2, "total_photos": 4,
+    }
+
+    # Removing photos (directly and through delete-orphan) and a profile with its photos
+    user = db.query(User).filter(User.email == "counter1@example.com").one()
+    db.delete(user.profile.photos[0])
+    user.profile.photos.pop()
+    db.commit()
+    db.delete(db.query(User).filter(User.email == "counter2@example.com").one().profile)
+    db.commit()
+    assert stored_counters(db) == count_from_scratch(db)
+    assert stored_counters(db)["total_photos"] == 1
+
+    # Rolled back writes leave the counters alone
+    add_user(db, 4)
+    db.flush()
+    db.rollback()
+    assert stored_counters(db) == count_from_scratch(db)
+
+    # So do flushes that fail part way
+    add_user(db, 5, photos=2)
+    db.add(User(email="counter1@example.com", hashed_password="x"))
+    try:
+        db.commit()
+        assert False, "duplicate email was accepted"
+    except IntegrityError:
+        db.rollback()
+    add_user(db, 6)
+    db.commit()
+    assert stored_counters(db) == count_from_scratch(db)
+
+
+def test_reconciliation_reports_and_fixes_drift():
+    """Writes that bypass the ORM show up as drift and are corrected"""
+    db = make_db()
+    add_user(db, 1)
+    db.commit()
+    assert get_site_stats(db)["total_users"] == 1  # seeds the counters
+    db.commit()
+
+    db.execute(User.__table__.insert().values(email="raw@example.com", hashed_password="x"))
+    db.query(SiteCounter).filter(SiteCounter.name == "total_photos").update({SiteCounter.value: 7})
+    db.commit()
+
+    assert reconcile_site_counters(db) == {"total_users": (1, 2), "total_photos": (7, 1)}
+    db.commit()
+    assert reconcile_site_counters(db) == {}
+
+
+def test_stats_read_counters():
+    """A stats poll reads the counter rows and one recent-signups count"""
+    db = make_db()
+    for index in range(5):
+        add_user(db, index, expectation=index % 2 == 0)
+    add_user(db, 9, profile=False)
+    db.commit()
+    get_site_stats(db)
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    stats = get_site_stats(db)
+    assert len(statements) == 2
+    assert not any("profiles" in statement or "photos" in statement for statement in statements)
+    assert stats == {
+        "total_users": 6, "users_with_profiles": 5, "users_with_expectations": 4, "total_photos": 5,
+        "recent_users_24h": 6, "completion_rate": 83.3,
+    }
+
+
+if __name__ == "__main__":
+    test_counters_follow_orm_writes()
+    test_reconciliation_reports_and_fixes_drift()
+    test_stats_read_counters()
+    print("✅ Site counter tests passed")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test the persistent token index used by dating_match_score
+"""
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.user import User, Profile, Expectation
+from app.services.ai_matching import dating_match_score, ai_matching_service
+from app.services.token_index import (
+    tokenize, text_hash, index_profile, index_expectation, get_profile_tokens, backfill_token_index
+)
+
+
+def make_session():
+    """In-memory database so the test never touches the real one"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_tokens_give_same_score_as_raw_text():
+    """Precomputed word sets must not change the score or details"""
+    person_a = {
+        'profile_text': 'I love Hiking and reading, I am kind and funny',
+        'expectation_text': 'Looking for someone kind, creative and into music',
+        'self_image_url': 'http://localhost:8000/uploads/profiles/a.jpg',
+        'ideal_partner_image_url': None
+    }
+    person_b = {
+        'profile_text': 'Creative musician who loves music and travel',
+        'expectation_text': 'Someone kind who loves hiking and reading',
+        'self_image_url': None,
+        'ideal_partner_image_url': 'http://localhost:8000/uploads/ideal_partners/b.jpg'
+    }
+
+    raw_score, raw_details = dating_match_score(person_a, person_b, return_details=True)
+
+    for person in (person_a, person_b):
+        person['profile_tokens'] = tokenize(person['profile_text'])
+        person['expectation_tokens'] = tokenize(person['expectation_text'])
+
+    score, details = dating_match_score(person_a, person_b, return_details=True)
+
+    assert score == raw_score
+    assert sorted(details["common_words"]) == sorted(raw_details["common_words"])
+    assert details["text_score_a_to_b"] == raw_details["text_score_a_to_b"]
+    assert details["text_score_b_to_a"] == raw_details["text_score_b_to_a"]
+
+
+def test_index_is_written_and_read():
+    """Saved word sets are used, and edits outside the indexed paths fall back to the text"""
+    db = make_session()
+
+    user = User(email="tokens@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(Profile(user_id=user.id, description="Kind hiker who loves music"))
+    db.add(Expectation(user_id=user.id, description="Someone funny"))
+    index_profile(db, user.id, "Kind hiker who loves music")
+    index_expectation(db, user.id, "Someone funny")
+    db.commit()
+    db.refresh(user)
+
+    assert get_profile_tokens(user) == {"kind", "hiker", "who", "loves", "music"}
+
+    person = ai_matching_service.build_person(user)
+    assert person['expectation_tokens'] == {"someone", "funny"}
+
+    # Description changed without re-indexing: stale entry must be ignored
+    user.profile.description = "Completely different text"
+    assert get_profile_tokens(user) == {"completely", "different", "text"}
+
+    # Same length, different text: the hash still tells them apart
+    assert user.token_index.profile_hash == text_hash("Kind hiker who loves music")
+    user.profile.description = "Kind hiker who loves jazz!"
+    assert get_profile_tokens(user) == {"kind", "hiker", "who", "loves", "jazz!"}
+
+
+def test_backfill_indexes_existing_users():
+    """Users saved before the index existed get indexed once"""
+    db = make_session()
+
+    user = User(email="legacy@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(Profile(user_id=user.id, description="Legacy profile"))
+    db.add(Expectation(user_id=user.id, description="Legacy expectations"))
+    db.commit()
+
+    assert backfill_token_index(db) == 2
+    assert backfill_token_index(db) == 0
+
+    db.refresh(user)
+    assert user.token_index.profile_tokens == "legacy profile"
+
+
+if __name__ == "__main__":
+    test_tokens_give_same_score_as_raw_text()
+    test_index_is_written_and_read()
+    test_backfill_indexes_existing_users()
+    print("✅ Token index tests passed")
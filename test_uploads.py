@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the streaming upload writer
+"""
+import sys
+import os
+import asyncio
+import hashlib
+import io
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import UploadFile
+
+from app.services.uploads import UPLOAD_CHUNK_SIZE, UploadTooLargeError, stream_upload
+
+
+class RecordingFile(io.BytesIO):
+    """In-memory upload body that remembers how much each read asked for"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+def make_upload(data, size=None):
+    body = RecordingFile(data)
+    return UploadFile(file=body, filename="photo.jpg", size=size), body
+
+
+def test_streams_in_chunks_with_hash():
+    """The upload is copied chunk by chunk and hashed on the way"""
+    data = os.urandom(UPLOAD_CHUNK_SIZE * 3 + 123)
+    upload, body = make_upload(data)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+        stored = asyncio.run(stream_upload(upload, path, max_size=len(data)))
+
+        assert stored == (path, len(data), hashlib.sha256(data).hexdigest())
+        with open(path, "rb") as saved:
+            assert saved.read() == data
+        assert os.listdir(directory) == ["photo.jpg"]
+    assert body.read_sizes and all(size == UPLOAD_CHUNK_SIZE for size in body.read_sizes)
+
+
+def test_size_limit_keeps_nothing():
+    """Oversized uploads are cut off while streaming and leave no file behind"""
+    data = os.urandom(UPLOAD_CHUNK_SIZE * 2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+
+        upload, body = make_upload(data)
+        try:
+            asyncio.run(stream_upload(upload, path, max_size=UPLOAD_CHUNK_SIZE + 1))
+            assert False, "oversized upload was accepted"
+        except UploadTooLargeError as e:
+            assert e.max_size == UPLOAD_CHUNK_SIZE + 1
+        assert os.listdir(directory) == []
+        assert len(body.read_sizes) == 2  # stopped at the chunk crossing the limit
+
+        # A declared size over the limit is rejected before reading anything
+        upload, body = make_upload(data, size=len(data))
+        try:
+            asyncio.run(stream_upload(upload, path, max_size=len(data) - 1))
+            assert False, "oversized upload was accepted"
+        except UploadTooLargeError:
+            pass
+        assert body.read_sizes == []
+
+
+def test_replacing_is_atomic():
+    """An existing file is only replaced by a complete upload"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+        with open(path, "wb") as existing:
+            existing.write(b"previous photo")
+
+        upload, _ = make_upload(b"x" * 100)
+        try:
+            asyncio.run(stream_upload(upload, path, max_size=10))
+        except UploadTooLargeError:
+            pass
+        with open(path, "rb") as saved:
+            assert saved.read() == b"previous photo"
+
+        upload, _ = make_upload(b"new photo")
+        asyncio.run(stream_upload(upload, path, max_size=100))
+        with open(path, "rb") as saved:
+            assert saved.read() == b"new photo"
+        assert os.listdir(directory) == ["photo.jpg"]
+
+
+if __name__ == "__main__":
+    test_streams_in_chunks_with_hash()
+    test_size_limit_keeps_nothing()
+    test_replacing_is_atomic()
+    print("✅ Upload tests passed")